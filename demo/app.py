@@ -1,5 +1,4 @@
 import autorootcwd
-import cv2
 import time
 import os
 import numpy as np
@@ -7,12 +6,14 @@ import threading
 from flask import Flask, Response, render_template, jsonify, request
 from flask_socketio import SocketIO
 from demo.core.stream import StreamManager
+from demo.core.encoder import JpegEncoder
+from demo.core.pyramid import as_pyramid
 from src.detector import DetectionProcessor   
 from demo.services.cada import CADAService
 from demo.services.mqtt import MQTTService
 from demo.services.ptz import PTZService
 from demo.utils.alerts import AlertManager, AlertCodes
-from demo.config.settings import HOST, PORT, DEBUG
+from demo.config.settings import HOST, PORT, DEBUG, ALERT_KEEPALIVE_INTERVAL
 
 # ----- YOLO AND GATE ADDITION START -----
 from demo.utils.yolo_validationcamera import Yolo_ValidationCamera
@@ -27,6 +28,7 @@ class HumanDetectionApp:
         self.socketio = SocketIO(async_mode="threading")
         self.socketio.init_app(self.app)
         self.stream_manager = StreamManager()
+        self.jpeg_encoder = JpegEncoder()
         self.detection_processor = DetectionProcessor()
         self.cada_service = CADAService(self.socketio)
         self.mqtt_service = MQTTService(self.stream_manager)
@@ -80,21 +82,46 @@ class HumanDetectionApp:
             )
         @self.app.route('/alerts')
         def alerts():
-            def event_stream():
-                self.detection_processor.alert_manager.send_alert(AlertCodes.SYSTEM_STARTED, "SYSTEM_STARTED: waiting for human")
+            alert_manager = self.detection_processor.alert_manager
+            # 재연결한 브라우저는 Last-Event-ID 이후부터, 새 클라이언트는 현재 시점부터 받음
+            try:
+                cursor = int(request.headers.get('Last-Event-ID'))
+            except (TypeError, ValueError):
+                cursor = None
+            if cursor is not None and cursor > alert_manager.latest_id():
+                # 알림 id 는 프로세스마다 1 부터 시작하므로, 서버 재시작 전의 id 로 재연결한 클라이언트는 현재 시점부터 받음
+                cursor = None
+
+            def event_stream(cursor):
+                yield "retry: 3000\n\n"
+                if cursor is None:
+                    cursor = alert_manager.latest_id()
+                    # 시작 알림은 새로 연결한 클라이언트에게만 (다른 클라이언트로 브로드캐스트하지 않음)
+                    payload = alert_manager.make_payload(AlertCodes.SYSTEM_STARTED, "SYSTEM_STARTED: waiting for human")
+                    yield f"data: {payload}\n\n"
                 while True:
-                    data = self.detection_processor.alert_manager.get_next_alert()
-                    if data:
-                        yield f"data: {data}\n\n"
-                    else:
-                        yield "data: \n\n"
-            return Response(event_stream(), mimetype='text/event-stream')
+                    new_alerts = alert_manager.wait_alerts(cursor, timeout=ALERT_KEEPALIVE_INTERVAL)
+                    if not new_alerts:
+                        # SSE 주석 줄: 연결 유지용, onmessage 는 발생하지 않음
+                        yield ": keep-alive\n\n"
+                        continue
+                    for alert_id, payload in new_alerts:
+                        yield f"id: {alert_id}\ndata: {payload}\n\n"
+                    cursor = new_alerts[-1][0]
+            return Response(event_stream(cursor), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
         @self.app.route('/redetect', methods=['POST'])
         def redetect():
             success = self.force_redetection()
             if success:
                 self.detection_processor.alert_manager.send_alert(AlertCodes.SYSTEM_STARTED, "SYSTEM_STARTED: waiting for human")
             return jsonify({'success': success})
+        @self.app.route('/stream_stats')
+        def stream_stats():
+            return jsonify(self.jpeg_encoder.get_stats())
+        @self.app.route('/capture_stats')
+        def capture_stats():
+            return jsonify(self.stream_manager.get_capture_stats())
         @self.app.route('/timestamp')
         def timestamp():
             return jsonify({'timestamp': self.get_last_timestamp()})
@@ -148,40 +175,42 @@ class HumanDetectionApp:
     def process_frame(self, frame):
         if frame is None:
             return None
-        self._initialize_ptz_if_needed(frame)
-        processed_frame, bbox_for_ptz = self.detection_processor.process_frame(frame)
+        # PTZ 는 원본 해상도 기준, 검출기는 축소 레벨들을 공유
+        pyramid = as_pyramid(frame)
+        self._initialize_ptz_if_needed(pyramid.full)
+        processed_frame, bbox_for_ptz = self.detection_processor.process_frame(pyramid)
         if self.ptz_initialized:
             self.ptz_service.update(bbox_for_ptz)
         return processed_frame
         
     def gen_frames(self):
-        while True:
-            if not self.stream_manager.is_active():
-                # 스트림이 비활성화되었을 때 PTZ 서비스도 멈춤 (필요시)
-                if self.ptz_initialized:
-                    self.ptz_service.stop()
-                    self.ptz_initialized = False # 재초기화를 위해 플래그 리셋
-                
-                blank = self.stream_manager.get_blank_frame()
-                ok, buf = cv2.imencode('.jpg', blank)
-                yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' +
-                       buf.tobytes() + b'\r\n')
-                time.sleep(0.1)
-                continue
-            
-            frame = self.stream_manager.get_frame()
-            if frame is None:
-                time.sleep(0.01)
-                continue
-            
-            processed_frame = self.process_frame(frame)
-            if processed_frame is not None:
-                ok, buf = cv2.imencode('.jpg', processed_frame,
-                                       [int(cv2.IMWRITE_JPEG_QUALITY), 60])
-                if ok:
-                    yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' +
-                           buf.tobytes() + b'\r\n')
-                           
+        # 인코딩은 워커 풀에서 병렬로, 클라이언트 처리량에 맞춰 품질/해상도 조절
+        stream = self.jpeg_encoder.open_stream()
+        try:
+            while True:
+                if not self.stream_manager.is_active():
+                    # 스트림이 비활성화되었을 때 PTZ 서비스도 멈춤 (필요시)
+                    if self.ptz_initialized:
+                        self.ptz_service.stop()
+                        self.ptz_initialized = False # 재초기화를 위해 플래그 리셋
+
+                    yield from stream.flush()
+                    # 대기 화면은 한 번만 인코딩
+                    yield self.jpeg_encoder.encode_cached('blank', self.stream_manager.get_blank_frame)
+                    time.sleep(0.1)
+                    continue
+
+                frame = self.stream_manager.get_pyramid()
+                if frame is None:
+                    time.sleep(0.01)
+                    continue
+
+                processed_frame = self.process_frame(frame)
+                if processed_frame is not None:
+                    yield from stream.push(processed_frame)
+        finally:
+            stream.close()
+
     def get_stream_generator(self):
         return self.gen_frames()
         
@@ -201,6 +230,7 @@ class HumanDetectionApp:
                 self.yolo_validation_camera.join()
             self.detection_processor.stop()
             self.detection_processor.join()
+            self.jpeg_encoder.shutdown()
 
 if __name__ == "__main__":
     app = HumanDetectionApp()
@@ -25,6 +25,42 @@ STATIONARY_THRESHOLD = 5  # pixels
 STATIONARY_TIME_THRESHOLD = 3.0  # seconds
 MASK_THRESHOLD = 0.5  # confidence threshold for mask generation
 
+# Capture backend for the stream: "opencv" (cv2.VideoCapture) or "pyav" (low-latency PyAV/FFmpeg demux)
+STREAM_BACKEND = "opencv"
+# FFmpeg demuxer options of the PyAV backend (no input buffering, minimal probing)
+PYAV_OPTIONS = {
+    "fflags": "nobuffer",
+    "flags": "low_delay",
+    "probesize": "32",
+    "analyzeduration": "0",
+    "max_delay": "0",
+}
+PYAV_OPEN_TIMEOUT = 5.0  # seconds
+PYAV_READ_TIMEOUT = 5.0  # seconds without data before reconnecting
+PYAV_RECONNECT_MIN_DELAY = 0.5  # reconnect backoff, doubled per failed attempt
+PYAV_RECONNECT_MAX_DELAY = 10.0
+
+# Pre-scaled frames built once per captured frame and shared by the consumers: name => (width, height),
+# a height of None keeps the aspect ratio (never upscaled)
+CAPTURE_PYRAMID_LEVELS = {
+    "sam": (1024, 1024),  # SAM2 image_size
+    "yolo": (640, None),  # YOLO imgsz
+    "preview": (640, None),  # /video_feed display frame
+}
+
+# /alerts settings
+ALERT_LOG_SIZE = 1000  # alerts kept for clients resuming with Last-Event-ID
+ALERT_KEEPALIVE_INTERVAL = 15.0  # seconds between SSE keep-alive comments on an idle connection
+
+# /video_feed JPEG encoding settings
+STREAM_JPEG_WORKERS = 2  # parallel encoder threads
+STREAM_JPEG_QUALITY = 60  # initial quality
+STREAM_JPEG_MIN_QUALITY = 35
+STREAM_JPEG_MAX_QUALITY = 80
+STREAM_TARGET_FPS = 15  # quality/resolution adapt to keep this rate for the measured client throughput
+STREAM_SCALES = (1.0, 0.75, 0.5)  # resolution steps, used once quality is at its minimum
+STREAM_REPORT_INTERVAL = 10.0  # seconds between bytes/frame and encode time reports
+
 # Camera settings``
 CAMERA_INDEX = 0
 CAMERA_BACKEND = cv2.CAP_DSHOW
@@ -0,0 +1,199 @@
+import cv2
+import itertools
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Sequence, Tuple
+from demo.config.settings import (
+    STREAM_JPEG_WORKERS, STREAM_JPEG_QUALITY, STREAM_JPEG_MIN_QUALITY, STREAM_JPEG_MAX_QUALITY,
+    STREAM_TARGET_FPS, STREAM_SCALES, STREAM_REPORT_INTERVAL
+)
+
+MULTIPART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+
+
+def multipart_chunk(jpeg: bytes) -> bytes:
+    return MULTIPART_HEADER + jpeg + b'\r\n'
+
+
+class JpegEncoder:
+    """
+    /video_feed 스트림들이 공유하는 JPEG 인코딩 워커 풀
+    cv2.imencode 는 GIL 을 해제하므로 스레드 풀로 여러 프레임을 병렬 인코딩
+    대기 화면처럼 변하지 않는 프레임은 한 번만 인코딩해서 캐시
+    """
+
+    def __init__(self, workers: int = STREAM_JPEG_WORKERS):
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jpeg')
+        self.static_cache: Dict[str, bytes] = {}
+        self.stats: Dict[int, Dict] = {}  # stream id => 최근 통계
+        self._ids = itertools.count()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def encode(frame: np.ndarray, quality: int, scale: float = 1.0) -> Tuple[bytes, float]:
+        start = time.perf_counter()
+        if scale != 1.0:
+            h, w = frame.shape[:2]
+            frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        return buf.tobytes(), (time.perf_counter() - start) * 1000
+
+    def submit(self, frame: np.ndarray, quality: int, scale: float = 1.0) -> Future:
+        """(jpeg bytes, encode ms) 를 돌려주는 Future"""
+        return self.pool.submit(self.encode, frame, quality, scale)
+
+    def encode_cached(self, key: str, make_frame: Callable[[], np.ndarray], quality: int = 80) -> bytes:
+        """key 별로 한 번만 인코딩한 정적 프레임의 multipart 청크"""
+        chunk = self.static_cache.get(key)
+        if chunk is None:
+            jpeg, _ = self.encode(make_frame(), quality)
+            chunk = multipart_chunk(jpeg)
+            self.static_cache[key] = chunk
+        return chunk
+
+    def open_stream(self) -> 'AdaptiveJpegStream':
+        with self.lock:
+            stream_id = next(self._ids)
+        return AdaptiveJpegStream(self, stream_id)
+
+    def report(self, stream_id: int, stats: Dict):
+        with self.lock:
+            self.stats[stream_id] = stats
+
+    def close_stream(self, stream_id: int):
+        with self.lock:
+            self.stats.pop(stream_id, None)
+
+    def get_stats(self) -> Dict[int, Dict]:
+        with self.lock:
+            return {stream_id: dict(stats) for stream_id, stats in self.stats.items()}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
+
+
+class AdaptiveJpegStream:
+    """
+    클라이언트 하나의 JPEG 스트림
+    프레임을 워커 풀에 넘기고 (최대 workers 개 동시 인코딩) 완료된 순서가 아니라 입력 순서대로 내보냄
+    청크를 yield 한 뒤 재개될 때까지의 시간 (서버가 소켓에 쓰는 시간) 으로 클라이언트 처리량을 측정하고,
+    목표 FPS 에서 프레임당 허용 바이트를 넘으면 품질 → 해상도 순으로 낮추고, 여유가 있으면 다시 올림
+    """
+
+    def __init__(self,
+                 encoder: JpegEncoder,
+                 stream_id: int,
+                 target_fps: float = STREAM_TARGET_FPS,
+                 quality: int = STREAM_JPEG_QUALITY,
+                 min_quality: int = STREAM_JPEG_MIN_QUALITY,
+                 max_quality: int = STREAM_JPEG_MAX_QUALITY,
+                 scales: Sequence[float] = STREAM_SCALES,
+                 quality_step: int = 5,
+                 adapt_interval: int = 15,
+                 ema: float = 0.2):
+        self.encoder = encoder
+        self.stream_id = stream_id
+        self.target_fps = target_fps
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.scales = tuple(scales)
+        self.scale_idx = 0
+        self.quality_step = quality_step
+        self.adapt_interval = adapt_interval
+        self.ema = ema
+
+        self.pending = deque()
+        self.frames = 0
+        self.bytes_per_frame = None
+        self.encode_ms = None
+        self.throughput = None  # bytes/s
+        self.fps = None
+        self.last_sent = None
+        self.last_report = time.time()
+
+    @property
+    def scale(self) -> float:
+        return self.scales[self.scale_idx]
+
+    def _smooth(self, old, new):
+        return new if old is None else old + self.ema * (new - old)
+
+    def push(self, frame: np.ndarray) -> Iterator[bytes]:
+        """프레임을 인코딩 큐에 넣고 내보낼 차례가 된 multipart 청크를 yield"""
+        self.pending.append(self.encoder.submit(frame, self.quality, self.scale))
+        while len(self.pending) > self.encoder.workers or (self.pending and self.pending[0].done()):
+            yield from self._send(self.pending.popleft())
+
+    def flush(self) -> Iterator[bytes]:
+        """남은 인코딩 결과를 모두 내보냄 (스트림 중단 시)"""
+        while self.pending:
+            yield from self._send(self.pending.popleft())
+
+    def _send(self, future: Future) -> Iterator[bytes]:
+        try:
+            jpeg, encode_ms = future.result()
+        except Exception as e:
+            print(f"[STREAM] JPEG encoding error: {e}")
+            return
+
+        start = time.perf_counter()
+        yield multipart_chunk(jpeg)
+        send_time = max(time.perf_counter() - start, 1e-4)
+
+        now = time.time()
+        if self.last_sent is not None:
+            self.fps = self._smooth(self.fps, 1.0 / max(now - self.last_sent, 1e-3))
+        self.last_sent = now
+        self.frames += 1
+        self.bytes_per_frame = self._smooth(self.bytes_per_frame, len(jpeg))
+        self.encode_ms = self._smooth(self.encode_ms, encode_ms)
+        self.throughput = self._smooth(self.throughput, len(jpeg) / send_time)
+
+        if self.frames % self.adapt_interval == 0:
+            self._adapt()
+        if now - self.last_report >= STREAM_REPORT_INTERVAL:
+            self.last_report = now
+            self._report()
+
+    def _adapt(self):
+        budget = self.throughput / self.target_fps  # 목표 FPS 에서 클라이언트가 받을 수 있는 프레임당 바이트
+        encode_budget_ms = 1000.0 * self.encoder.workers / self.target_fps
+
+        if self.bytes_per_frame > budget or self.encode_ms > encode_budget_ms:
+            if self.quality > self.min_quality and self.encode_ms <= encode_budget_ms:
+                self.quality = max(self.min_quality, self.quality - self.quality_step)
+            elif self.scale_idx < len(self.scales) - 1:
+                self.scale_idx += 1
+        elif self.bytes_per_frame < 0.5 * budget and self.encode_ms < 0.5 * encode_budget_ms:
+            if self.scale_idx > 0:
+                self.scale_idx -= 1
+            elif self.quality < self.max_quality:
+                self.quality = min(self.max_quality, self.quality + self.quality_step)
+
+    def stats(self) -> Dict:
+        return {'frames': self.frames,
+                'fps': round(self.fps or 0.0, 1),
+                'bytes_per_frame': int(self.bytes_per_frame or 0),
+                'encode_ms': round(self.encode_ms or 0.0, 2),
+                'throughput_kbps': round((self.throughput or 0.0) * 8 / 1000, 1),
+                'quality': self.quality,
+                'scale': self.scale}
+
+    def _report(self):
+        stats = self.stats()
+        self.encoder.report(self.stream_id, stats)
+        print(f"[STREAM {self.stream_id}] {stats['fps']:.1f} fps, {stats['bytes_per_frame'] / 1024:.1f} KB/frame, "
+              f"{stats['encode_ms']:.1f} ms encode, q={self.quality}, scale={self.scale:.2f}")
+
+    def close(self):
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.encoder.close_stream(self.stream_id)
@@ -0,0 +1,110 @@
+import cv2
+import time
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+from demo.config.settings import CAPTURE_PYRAMID_LEVELS
+
+
+def level_sizes(width: int, height: int,
+                levels: Dict[str, Tuple[int, Optional[int]]] = CAPTURE_PYRAMID_LEVELS) -> Dict[str, Tuple[int, int]]:
+    """
+    레벨 이름 => (w, h)
+    고정 크기 레벨 (모델 입력) 은 그대로, 높이가 None 인 레벨은 원본 종횡비를 유지하고 원본보다 크게 만들지 않음
+    """
+    sizes = {}
+    for name, (w, h) in levels.items():
+        if h is None:
+            w = min(w, width)
+            h = max(1, round(height * w / width))
+        sizes[name] = (w, h)
+    return sizes
+
+
+class FramePyramid:
+    """
+    디코드된 프레임 하나와 소비자별로 미리 축소한 레벨들 (sam: SAM2 입력, yolo: 검출 입력, preview: 웹 스트림)
+    캡처 스레드에서 프레임당 한 번 만들어 모든 소비자가 공유하므로 레벨 배열은 읽기 전용으로 취급
+    """
+
+    __slots__ = ('full', 'levels', 'timestamp')
+
+    def __init__(self, full: np.ndarray, levels: Optional[Dict[str, np.ndarray]] = None,
+                 timestamp: Optional[float] = None):
+        self.full = full
+        self.levels = levels or {}
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        h, w = self.full.shape[:2]
+        return w, h
+
+    def get(self, name: str) -> np.ndarray:
+        """레벨 배열, 없는 레벨은 원본"""
+        return self.levels.get(name, self.full)
+
+    def scale(self, name: str) -> Tuple[float, float]:
+        """원본 좌표 => 레벨 좌표 배율 (sx, sy)"""
+        h, w = self.get(name).shape[:2]
+        full_w, full_h = self.size
+        return w / full_w, h / full_h
+
+    def box_to_full(self, name: str, box: Sequence) -> np.ndarray:
+        """레벨 좌표의 박스 ([[x1, y1], [x2, y2]] 또는 (x1, y1, x2, y2)) 를 원본 좌표로"""
+        sx, sy = self.scale(name)
+        box = np.asarray(box, dtype=np.float64)
+        return box.reshape(-1, 2) / (sx, sy)
+
+    def box_from_full(self, name: str, box: Sequence) -> np.ndarray:
+        """원본 좌표의 박스를 레벨 좌표로"""
+        sx, sy = self.scale(name)
+        box = np.asarray(box, dtype=np.float64)
+        return box.reshape(-1, 2) * (sx, sy)
+
+
+def build_pyramid(frame: np.ndarray,
+                  levels: Dict[str, Tuple[int, Optional[int]]] = CAPTURE_PYRAMID_LEVELS,
+                  timestamp: Optional[float] = None) -> FramePyramid:
+    """
+    BGR 프레임에서 레벨들을 만듦
+    큰 레벨부터 INTER_AREA 로 축소하고, 각 레벨은 자신보다 크거나 같은 가장 작은 레벨에서 축소 (단계적 축소)
+    크기가 같은 레벨은 같은 배열을 공유
+    """
+    h, w = frame.shape[:2]
+    sizes = level_sizes(w, h, levels)
+
+    by_size = {}
+    sources = [frame]
+    for size in sorted(set(sizes.values()), key=lambda s: -s[0] * s[1]):
+        if size == (w, h):
+            by_size[size] = frame
+            continue
+        src = min((s for s in sources if s.shape[1] >= size[0] and s.shape[0] >= size[1]),
+                  key=lambda s: s.shape[0] * s.shape[1], default=frame)
+        interpolation = cv2.INTER_AREA if src.shape[1] >= size[0] and src.shape[0] >= size[1] else cv2.INTER_LINEAR
+        by_size[size] = cv2.resize(src, size, interpolation=interpolation)
+        sources.append(by_size[size])
+
+    return FramePyramid(frame, {name: by_size[size] for name, size in sizes.items()}, timestamp)
+
+
+def pyramid_from_av_frame(frm, levels: Dict[str, Tuple[int, Optional[int]]] = CAPTURE_PYRAMID_LEVELS,
+                          timestamp: Optional[float] = None) -> FramePyramid:
+    """
+    PyAV VideoFrame 에서 레벨들을 만듦
+    각 레벨은 디코더 출력 (YUV) 에서 swscale 로 목표 해상도의 BGR 로 바로 변환되어, 원본 BGR 변환 + cv2.resize 를 거치지 않음
+    """
+    full = frm.to_ndarray(format='bgr24')
+    sizes = level_sizes(frm.width, frm.height, levels)
+
+    by_size = {(frm.width, frm.height): full}
+    for size in set(sizes.values()):
+        if size not in by_size:
+            by_size[size] = frm.to_ndarray(width=size[0], height=size[1], format='bgr24')
+
+    return FramePyramid(full, {name: by_size[size] for name, size in sizes.items()}, timestamp)
+
+
+def as_pyramid(frame) -> FramePyramid:
+    """FramePyramid 는 그대로, ndarray 는 레벨을 만들어 반환"""
+    return frame if isinstance(frame, FramePyramid) else build_pyramid(frame)
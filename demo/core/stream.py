@@ -2,8 +2,12 @@ import cv2
 import threading
 import time
 import numpy as np
-from typing import Optional
-from demo.config.settings import STREAM_URL
+from typing import Dict, Optional
+from demo.config.settings import (
+    STREAM_URL, STREAM_BACKEND, PYAV_OPTIONS, PYAV_OPEN_TIMEOUT, PYAV_READ_TIMEOUT,
+    PYAV_RECONNECT_MIN_DELAY, PYAV_RECONNECT_MAX_DELAY
+)
+from demo.core.pyramid import FramePyramid, build_pyramid, pyramid_from_av_frame
 
 class FrameGrabber(threading.Thread):
     def __init__(self, url: str | int):
@@ -15,6 +19,7 @@ class FrameGrabber(threading.Thread):
             self.cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
         self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         self.frame = None
+        self.pyramid: Optional[FramePyramid] = None  # 현재 프레임의 축소 레벨, 처음 요청될 때 한 번 생성
         self.lock = threading.Lock()
         self.running = True
 
@@ -24,6 +29,7 @@ class FrameGrabber(threading.Thread):
             if ret:
                 with self.lock:
                     self.frame = frm
+                    self.pyramid = None
         self.cap.release()
 
     def read(self):
@@ -32,18 +38,164 @@ class FrameGrabber(threading.Thread):
                 return None
             return self.frame.copy()
 
+    def read_pyramid(self) -> Optional[FramePyramid]:
+        """최신 프레임의 FramePyramid (소비자끼리 공유, 복사하지 않음)"""
+        with self.lock:
+            frame, pyramid = self.frame, self.pyramid
+        if frame is None or pyramid is not None:
+            return pyramid
+
+        # 새 프레임은 캡처 스레드가 다른 배열로 교체하므로 락 밖에서 축소해도 안전
+        pyramid = build_pyramid(frame)
+        with self.lock:
+            if self.frame is frame:
+                self.pyramid = pyramid
+        return pyramid
+
+    def stop(self):
+        self.running = False
+
+class PyAVFrameGrabber(threading.Thread):
+    """
+    PyAV(FFmpeg) 기반 FrameGrabber, read() / stop() 는 FrameGrabber 와 동일
+    - 저지연 demux 옵션 (nobuffer, low_delay, 작은 probesize) 을 직접 지정
+    - 전용 스레드가 demux/decode 하면서 항상 최신 프레임 하나만 유지 (읽히기 전에 덮어쓴 프레임은 drop 으로 집계)
+    - 스트림 끊김/타임아웃 시 지수 백오프로 재연결
+    - 디코드 시간, 프레임 나이 (디코드 후 read 까지), drop 수를 get_stats() 로 제공
+    """
+
+    def __init__(self, url: str, options: Optional[Dict[str, str]] = None):
+        super().__init__(daemon=True)
+        self.url = url
+        self.options = dict(PYAV_OPTIONS if options is None else options)
+        if url.startswith('rtsp://'):
+            self.options.setdefault('rtsp_transport', 'tcp')
+        self.frame = None
+        self.pyramid: Optional[FramePyramid] = None
+        self.frame_time = None  # 최신 프레임 디코드 완료 시각
+        self.frame_consumed = True
+        self.lock = threading.Lock()
+        self.running = True
+        self.container = None
+
+        self.stats = {'decoded': 0, 'dropped': 0, 'reconnects': 0,
+                      'decode_ms': 0.0, 'frame_age_ms': 0.0, 'connected': False}
+
+    def _open(self):
+        import av
+
+        self.container = av.open(self.url, options=self.options,
+                                 timeout=(PYAV_OPEN_TIMEOUT, PYAV_READ_TIMEOUT))
+        stream = self.container.streams.video[0]
+        # 프레임 스레딩은 스레드 수만큼 출력이 지연되므로 슬라이스 스레딩만 사용
+        stream.thread_type = 'SLICE'
+        return stream
+
+    def _close(self):
+        if self.container is not None:
+            try:
+                self.container.close()
+            except Exception:
+                pass
+            self.container = None
+
+    def _decode_loop(self, stream):
+        for packet in self.container.demux(stream):
+            if not self.running:
+                return
+            # 패킷 대기 시간은 빼고 디코드 + BGR 변환 시간만 측정
+            decode_start = time.perf_counter()
+            for frm in packet.decode():
+                # 원본과 축소 레벨을 디코더 출력에서 바로 변환 (cv2.resize 없음)
+                pyramid = pyramid_from_av_frame(frm)
+                img = pyramid.full
+                now = time.perf_counter()
+                decode_ms = (now - decode_start) * 1000
+                decode_start = now
+
+                with self.lock:
+                    if not self.frame_consumed:
+                        self.stats['dropped'] += 1
+                    self.frame = img
+                    self.pyramid = pyramid
+                    self.frame_time = now
+                    self.frame_consumed = False
+                    self.stats['decoded'] += 1
+                    self.stats['decode_ms'] += 0.1 * (decode_ms - self.stats['decode_ms'])
+            if packet.size == 0:  # flush packet, end of stream
+                return
+
+    def run(self):
+        delay = PYAV_RECONNECT_MIN_DELAY
+        while self.running:
+            try:
+                stream = self._open()
+                self.stats['connected'] = True
+                decoded = self.stats['decoded']
+                self._decode_loop(stream)
+                if self.stats['decoded'] > decoded:
+                    delay = PYAV_RECONNECT_MIN_DELAY  # 프레임을 받았으면 백오프 초기화
+            except Exception as e:
+                print(f"[STREAM] PyAV capture error ({self.url}): {e}")
+            finally:
+                self.stats['connected'] = False
+                self._close()
+
+            if not self.running:
+                break
+            print(f"[STREAM] reconnecting in {delay:.1f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, PYAV_RECONNECT_MAX_DELAY)
+            self.stats['reconnects'] += 1
+
+    def _consume(self):
+        # self.lock 을 잡은 상태에서 호출
+        self.frame_consumed = True
+        age_ms = (time.perf_counter() - self.frame_time) * 1000
+        self.stats['frame_age_ms'] += 0.1 * (age_ms - self.stats['frame_age_ms'])
+
+    def read(self):
+        with self.lock:
+            if self.frame is None:
+                return None
+            self._consume()
+            return self.frame.copy()
+
+    def read_pyramid(self) -> Optional[FramePyramid]:
+        with self.lock:
+            if self.pyramid is None:
+                return None
+            self._consume()
+            return self.pyramid
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return dict(self.stats)
+
     def stop(self):
         self.running = False
 
+
+def create_frame_grabber(url: str | int, backend: str = STREAM_BACKEND):
+    """backend: 'opencv' (cv2.VideoCapture) 또는 'pyav', 카메라 인덱스나 PyAV 미설치 시 opencv 사용"""
+    if backend == 'pyav' and not isinstance(url, int):
+        try:
+            import av  # noqa: F401
+            return PyAVFrameGrabber(url)
+        except ImportError:
+            print("[STREAM] PyAV is not installed, falling back to OpenCV capture")
+    return FrameGrabber(url)
+
+
 class StreamManager:
     def __init__(self, stream_url: str | int = STREAM_URL):
         self.stream_url = stream_url
         self.stream_active = False
-        self.grabber: Optional[FrameGrabber] = None
+        self.grabber: Optional[FrameGrabber | PyAVFrameGrabber] = None
         
     def start_stream(self):
         if not self.stream_active:
-            self.grabber = FrameGrabber(self.stream_url)
+            self.grabber = create_frame_grabber(self.stream_url)
             self.grabber.start()
             self.stream_active = True
             
@@ -59,6 +211,16 @@ class StreamManager:
             return None
         return self.grabber.read()
     
+    def get_pyramid(self) -> Optional[FramePyramid]:
+        if not self.stream_active or self.grabber is None:
+            return None
+        return self.grabber.read_pyramid()
+
+    def get_capture_stats(self) -> Dict:
+        if self.grabber is None or not hasattr(self.grabber, 'get_stats'):
+            return {}
+        return self.grabber.get_stats()
+
     def is_active(self) -> bool:
         return self.stream_active
     
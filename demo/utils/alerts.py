@@ -1,30 +1,60 @@
 import json
-import queue
 import threading
+from collections import deque
+from itertools import islice
+from typing import List, Optional, Tuple
+from demo.config.settings import ALERT_LOG_SIZE
 
 class AlertManager:
-    def __init__(self):
-        self.alerts_queue = queue.Queue()
-        self._lock = threading.Lock()
-        
-    def send_alert(self, code: str, message: str):
-        payload = json.dumps({'code': code, 'message': message})
-        with self._lock:
-            self.alerts_queue.put(payload)
-            print(f'alert{code}: {message}')
-        
-    def get_alerts_queue(self):
-        return self.alerts_queue
-
-    def get_next_alert(self, timeout=0.1):
-        try:
-            return self.alerts_queue.get(timeout=timeout)
-        except queue.Empty:
-            return None
+    """
+    메모리 내 append-only 알림 로그 (pub/sub)
+    알림마다 단조 증가하는 id 를 붙여 저장하고, 각 클라이언트는 자신이 마지막으로 받은 id (커서) 이후의 알림을 읽음
+    → 모든 클라이언트가 모든 알림을 받고 (fan-out), 재연결 시 Last-Event-ID 로 이어 받을 수 있음
+    대기 중인 클라이언트는 condition variable 에서 블록되므로 CPU 를 쓰지 않음
+    """
+
+    def __init__(self, max_alerts: int = ALERT_LOG_SIZE):
+        self.log = deque(maxlen=max_alerts)  # (id, payload), 오래된 알림부터 버림
+        self.next_id = 1
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def make_payload(code: str, message: str) -> str:
+        return json.dumps({'code': code, 'message': message})
+
+    def send_alert(self, code: str, message: str) -> int:
+        payload = self.make_payload(code, message)
+        with self._cond:
+            alert_id = self.next_id
+            self.next_id += 1
+            self.log.append((alert_id, payload))
+            self._cond.notify_all()
+        print(f'alert{code}: {message}')
+        return alert_id
+
+    def latest_id(self) -> int:
+        with self._cond:
+            return self.next_id - 1
+
+    def _since(self, cursor: int) -> List[Tuple[int, str]]:
+        # self._cond 을 잡은 상태에서 호출, id 가 연속이므로 위치를 바로 계산
+        if not self.log:
+            return []
+        start = max(0, cursor + 1 - self.log[0][0])
+        return list(islice(self.log, start, None))
+
+    def wait_alerts(self, cursor: int, timeout: Optional[float] = None) -> List[Tuple[int, str]]:
+        """
+        id 가 cursor 보다 큰 알림들을 반환, 없으면 새 알림이 오거나 timeout 이 지날 때까지 대기
+        로그 크기를 넘어 밀려난 알림은 건너뜀
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.next_id - 1 > cursor, timeout=timeout)
+            return self._since(cursor)
 
 class AlertCodes:
     SYSTEM_STARTED = "00"
     PERSON_DETECTED = "01"
     PERSON_LOST = "02"
     STATIONARY_BEHAVIOR = "03"
-    INTRUSION_DETECTED = "04"
\ No newline at end of file
+    INTRUSION_DETECTED = "04"
@@ -17,34 +17,106 @@ def draw_timestamp(frame, timestamp):
         cv2.LINE_AA
     )
 
-def process_masks(m_np, disp, frame):
-    h, w = disp.shape[:2]
-    bbox_coords = None
-    
-    for i in range(m_np.shape[0]):
-        mask = (m_np[i,0] > 0.5).astype(np.uint8)
-        if mask.sum() == 0:
-            continue
-            
-        mask = cv2.resize(mask, (w, h), cv2.INTER_NEAREST)
-
-        overlay = disp.copy()
-        overlay[mask>0] = (0, 255, 0)
-        cv2.addWeighted(overlay, 0.5, disp, 0.7, 0, disp)
-        
-        ys, xs = np.where(mask>0)
-        x1, y1, x2, y2 = xs.min(), ys.min(), xs.max(), ys.max()
-        bbox_coords = (x1, y1, x2, y2)
-        cv2.rectangle(disp, (x1,y1), (x2,y2), (0, 0, 255), 2)
-        
+class MaskRenderer:
+    """
+    Draws tracker masks on the display frame at a cost independent of the frame resolution.
+
+    The bbox comes from row/column any-reductions of the low-resolution mask, scaled to frame
+    coordinates, and only the pixels inside the bbox are upsampled and blended. The blend buffer
+    is kept between frames and only grows.
+    """
+
+    def __init__(self, threshold=0.5, color=(0, 255, 0), alpha=0.7, beta=0.5):
+        self.threshold = threshold
+        # mask pixels become alpha * frame + beta * color, the mask-pixel weights of the former full-frame
+        # addWeighted; pixels outside the mask are left as they are (that blend also scaled them by alpha + beta)
+        self.alpha = alpha
+        self.tint = tuple(beta * c for c in color) + (0,)
+        self.buffer = np.empty((0, 0, 3), np.uint8)
+
+    def _blend_buffer(self, h, w):
+        if self.buffer.shape[0] < h or self.buffer.shape[1] < w:
+            self.buffer = np.empty((max(h, self.buffer.shape[0]), max(w, self.buffer.shape[1]), 3), np.uint8)
+        return self.buffer[:h, :w]
+
+    @staticmethod
+    def mask_bbox(mask):
+        """Inclusive low-res bbox (x1, y1, x2, y2) of a boolean mask, or None if empty."""
+        rows = np.flatnonzero(mask.any(axis=1))
+        if rows.size == 0:
+            return None
+        cols = np.flatnonzero(mask.any(axis=0))
+        return cols[0], rows[0], cols[-1], rows[-1]
+
+    def draw_mask(self, disp, mask, box):
+        """Blends one low-res boolean mask with its low-res bbox into disp and returns the frame bbox."""
+        h, w = disp.shape[:2]
+        mh, mw = mask.shape
+        c0, r0, c1, r1 = (int(v) for v in box)
+        c1, r1 = c1 + 1, r1 + 1
+
+        x1, x2 = c0 * w // mw, max(c1 * w // mw, c0 * w // mw + 1) - 1
+        y1, y2 = r0 * h // mh, max(r1 * h // mh, r0 * h // mh + 1) - 1
+        rh, rw = y2 - y1 + 1, x2 - x1 + 1
+
+        crop = np.ascontiguousarray(mask[r0:r1, c0:c1]).view(np.uint8)
+        roi_mask = cv2.resize(crop, (rw, rh), interpolation=cv2.INTER_NEAREST)
+        roi = disp[y1:y2 + 1, x1:x2 + 1]
+        tinted = self._blend_buffer(rh, rw)
+        cv2.convertScaleAbs(roi, dst=tinted, alpha=self.alpha)
+        cv2.add(tinted, self.tint, dst=tinted)
+        np.copyto(roi, tinted, where=roi_mask.view(bool)[..., None])
+
+        cv2.rectangle(disp, (x1, y1), (x2, y2), (0, 0, 255), 2)
+
         center_x = (x1 + x2) // 2
         center_y = (y1 + y2) // 2
         cv2.circle(disp, (center_x, center_y), 4, (0, 0, 255), -1)
 
         cv2.circle(disp, (w//2, h//2), 4, (0, 0, 255), -1)
-        
-    disp = cv2.addWeighted(disp, 0.5, frame, 0.5, 0)
-    return bbox_coords
+        return x1, y1, x2, y2
+
+    def draw(self, m_np, disp):
+        """Draws mask logits (N, 1, H, W) on disp and returns the last frame bbox."""
+        bbox_coords = None
+
+        for i in range(m_np.shape[0]):
+            mask = m_np[i, 0] > self.threshold
+            box = self.mask_bbox(mask)
+            if box is None:
+                continue
+            bbox_coords = self.draw_mask(disp, mask, box)
+
+        return bbox_coords
+
+    def draw_summary(self, summary, disp):
+        """Draws a `SAM2ObjectTracker.summarize_masks` summary on disp and returns the last frame bbox."""
+        from sam2.sam2_object_tracker import SAM2ObjectTracker
+
+        bbox_coords = None
+        if not summary["present"].any():
+            return bbox_coords
+
+        masks = SAM2ObjectTracker.unpack_masks(summary)
+        for mask, present, box in zip(masks, summary["present"], summary["boxes"]):
+            if present:
+                bbox_coords = self.draw_mask(disp, mask, box)
+
+        return bbox_coords
+
+
+_mask_renderer = MaskRenderer()
+
+
+def process_masks(m_np, disp):
+    """
+    Draws the tracker masks on disp in place and returns the last bbox.
+
+    m_np is either low-res mask logits (N, 1, H, W) or a mask summary from `HumanTracker.track`.
+    """
+    if isinstance(m_np, dict):
+        return _mask_renderer.draw_summary(m_np, disp)
+    return _mask_renderer.draw(m_np, disp)
 
 def draw_detection_boxes(frame, persons):
     for box in persons:
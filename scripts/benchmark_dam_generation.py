@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+DAM 생성 벤치마크
+기존 KeywordsStoppingCriteria (매 스텝 디코딩) 와 토큰 ID 기반 stopping criteria 의 tokens/sec 비교
+--check_prefix_cache: 길이가 다른 질의로 패딩된 배치에서 프리픽스 KV 캐시 사용/미사용 결과가 같은지 확인
+
+Example: python scripts/benchmark_dam_generation.py --batch_size 4 --repeats 3
+         python scripts/benchmark_dam_generation.py --check_prefix_cache --skip_generation
+"""
+import argparse
+
+import torch
+from PIL import Image
+from transformers import StoppingCriteria
+
+import dam.describe_anything_model as dam_module
+from dam import DescribeAnythingModel, disable_torch_init
+from dam.model.constants import IMAGE_TOKEN_INDEX
+from dam.model.conversation import SeparatorStyle
+from dam.model.mm_utils import KeywordsStoppingCriteria, tokenizer_image_token
+from benchmark_utils import timed
+
+QUERY = (
+    "Video: <image><image><image><image><image><image><image><image>\n"
+    "Return **one concise English sentence** that describes ONLY the subject's action or state change. "
+    "Do NOT mention appearance, colour, clothing, background, objects, or physical attributes."
+)
+
+
+class LegacyKeywordsStoppingCriteria(StoppingCriteria):
+    """이전 구현: 매 스텝 키워드 텐서 디바이스 이동 + 행마다 tokenizer.batch_decode"""
+
+    def __init__(self, keywords, tokenizer, input_ids):
+        self.keywords = keywords
+        self.keyword_ids = []
+        self.max_keyword_len = 0
+        for keyword in keywords:
+            cur_keyword_ids = tokenizer(keyword).input_ids
+            if len(cur_keyword_ids) > 1 and cur_keyword_ids[0] == tokenizer.bos_token_id:
+                cur_keyword_ids = cur_keyword_ids[1:]
+            self.max_keyword_len = max(self.max_keyword_len, len(cur_keyword_ids))
+            self.keyword_ids.append(torch.tensor(cur_keyword_ids))
+        self.tokenizer = tokenizer
+        self.start_len = input_ids.shape[1]
+
+    def call_for_batch(self, output_ids, scores, **kwargs):
+        offset = min(output_ids.shape[1] - self.start_len, self.max_keyword_len)
+        self.keyword_ids = [keyword_id.to(output_ids.device) for keyword_id in self.keyword_ids]
+        for keyword_id in self.keyword_ids:
+            if (output_ids[0, -keyword_id.shape[0]:] == keyword_id).all():
+                return True
+        outputs = self.tokenizer.batch_decode(output_ids[:, -offset:], skip_special_tokens=True)[0]
+        return any(keyword in outputs for keyword in self.keywords)
+
+    def __call__(self, output_ids, scores, **kwargs):
+        return all(self.call_for_batch(output_ids[i].unsqueeze(0), scores) for i in range(output_ids.shape[0]))
+
+
+def bench_criteria(criteria_cls, tokenizer, device, batch_size, steps):
+    """stopping criteria 호출 비용만 측정 (us/step)"""
+    criteria = criteria_cls(["</s>"], tokenizer, torch.zeros((batch_size, 0), dtype=torch.long))
+    output_ids = torch.randint(100, 20000, (batch_size, steps), device=device)
+    for step in range(1, 9):
+        criteria(output_ids[:, :step], None)
+
+    def run_steps():
+        for step in range(1, steps + 1):
+            done = criteria(output_ids[:, :step], None)
+            # generate() 는 매 스텝 결과를 호스트에서 확인하므로 동일하게 동기화
+            bool(torch.as_tensor(done).all())
+
+    _, seconds = timed(run_steps)
+    return seconds / steps * 1e6
+
+
+def bench_generation(dam, criteria_cls, batch_size, max_new_tokens, repeats):
+    """전체 생성 tokens/sec 측정"""
+    dam_module.KeywordsStoppingCriteria = criteria_cls
+    frames = [Image.new("RGB", (640, 480), color="gray") for _ in range(8)]
+    masks = [Image.new("L", (640, 480), color=255) for _ in range(8)]
+    images_list = [frames] * batch_size
+    masks_list = [masks] * batch_size
+
+    # 워밍업
+    dam.get_description_batch(images_list, masks_list, QUERY, temperature=0, max_new_tokens=8)
+
+    total_tokens, total_time = 0, 0.0
+    for _ in range(repeats):
+        descriptions, seconds = timed(
+            lambda: dam.get_description_batch(images_list, masks_list, QUERY, temperature=0, max_new_tokens=max_new_tokens))
+        total_time += seconds
+        total_tokens += sum(len(dam.tokenizer(d).input_ids) for d in descriptions)
+    return total_tokens / total_time
+
+
+def check_prefix_cache(dam, batch_size, max_new_tokens):
+    """
+    프리픽스 KV 캐시 사용/미사용 greedy 생성 토큰 비교
+    질의 길이를 행마다 다르게 해서 패딩된 배치 (4D 마스크 경로) 를 검사
+    """
+    frames = [Image.new("RGB", (640, 480), color="gray") for _ in range(8)]
+    masks = [Image.new("L", (640, 480), color=255) for _ in range(8)]
+    queries = [QUERY + " Be brief." * i for i in range(batch_size)]
+    prompt_ids = [tokenizer_image_token(dam.get_prompt(query)[0], dam.tokenizer, IMAGE_TOKEN_INDEX, return_tensors="pt")
+                  for query in queries]
+    conv = dam.get_prompt(queries[0])[1]
+    stop_str = conv.sep if conv.sep_style != SeparatorStyle.TWO else conv.sep2
+
+    outputs = {}
+    use_prefix_cache = dam.use_prefix_cache
+    for enabled in (False, True):
+        dam.use_prefix_cache = enabled
+        dam.clear_prefix_cache()
+        image_tensors = []
+        for _ in range(batch_size):
+            image_tensors.extend(dam.get_image_tensors(frames, masks, *dam.prompt_mode.split("+")))
+        outputs[enabled] = dam.generate_from_prompt_ids(prompt_ids, image_tensors, stop_str, temperature=0, max_new_tokens=max_new_tokens)
+    dam.use_prefix_cache = use_prefix_cache
+
+    ok = True
+    for i, (uncached, cached) in enumerate(zip(outputs[False], outputs[True])):
+        same = dam.tokenizer(uncached).input_ids == dam.tokenizer(cached).input_ids
+        ok = ok and same
+        print(f"  row {i} ({len(prompt_ids[i])} prompt tokens): {'OK' if same else 'MISMATCH'}")
+        if not same:
+            print(f"    uncached: {uncached!r}")
+            print(f"    cached:   {cached!r}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DAM generation benchmark")
+    parser.add_argument("--model_path", type=str, default="nvidia/DAM-3B-Video")
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--max_new_tokens", type=int, default=128)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--criteria_steps", type=int, default=256)
+    parser.add_argument("--skip_generation", action="store_true", help="Only benchmark the stopping criteria calls")
+    parser.add_argument("--check_prefix_cache", action="store_true",
+                        help="Check that prefix-cached and uncached greedy decoding give the same tokens for a padded batch")
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    disable_torch_init()
+    dam = DescribeAnythingModel(model_path=args.model_path, conv_mode="v1", prompt_mode="full+focal_crop").to(device)
+    dam.eval()
+
+    print(f"[criteria] batch={args.batch_size}, steps={args.criteria_steps}")
+    for name, cls in (("legacy", LegacyKeywordsStoppingCriteria), ("token-id", KeywordsStoppingCriteria)):
+        us = bench_criteria(cls, dam.tokenizer, device, args.batch_size, args.criteria_steps)
+        print(f"  {name:>8}: {us:8.1f} us/step")
+
+    if args.check_prefix_cache:
+        batch_size = max(args.batch_size, 2)
+        print(f"[prefix cache] batch={batch_size}, max_new_tokens={args.max_new_tokens}")
+        if not check_prefix_cache(dam, batch_size, args.max_new_tokens):
+            raise SystemExit("prefix-cached decoding differs from uncached decoding")
+
+    if args.skip_generation:
+        return
+
+    print(f"[generation] batch={args.batch_size}, max_new_tokens={args.max_new_tokens}")
+    for name, cls in (("legacy", LegacyKeywordsStoppingCriteria), ("token-id", KeywordsStoppingCriteria)):
+        tps = bench_generation(dam, cls, args.batch_size, args.max_new_tokens, args.repeats)
+        print(f"  {name:>8}: {tps:8.1f} tokens/s")
+    dam_module.KeywordsStoppingCriteria = KeywordsStoppingCriteria
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+프레임 샘플링 벤치마크
+프레임별 seek (CAP_PROP_POS_FRAMES) 방식과 한 번의 순차 디코딩 (sample_video_frames) 비교
+
+Example: python scripts/benchmark_frame_sampling.py --width 1280 --height 720 --fps 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from sam2.utils.misc import sample_video_frames
+
+NUM_SAMPLES = 8
+
+
+def make_clip(path, seconds, fps, width, height):
+    """녹화 파일과 같은 mp4v 코덱의 합성 클립 생성"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(int(seconds * fps)):
+        frame = background.copy()
+        x = int((i * 7) % max(width - 100, 1))
+        cv2.rectangle(frame, (x, height // 3), (x + 100, height // 3 + 200), (0, 255, 0), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def sample_with_seek(path):
+    """이전 방식: 선택한 인덱스마다 seek 후 read"""
+    cap = cv2.VideoCapture(path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for idx in np.linspace(0, frame_count - 1, NUM_SAMPLES, dtype=int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        ret, frame = cap.read()
+        if ret:
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    return frames
+
+
+def sample_sequential(path):
+    frames, _, _ = sample_video_frames(path, num_frames=NUM_SAMPLES)
+    return frames
+
+
+def timeit(fn, path, repeats):
+    fn(path)  # 워밍업 (파일 캐시)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        frames = fn(path)
+    return (time.perf_counter() - start) / repeats * 1000, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame sampling benchmark")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=10)
+    parser.add_argument("--durations", type=float, nargs="+", default=[5, 60])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for seconds in args.durations:
+            path = os.path.join(tmp_dir, f"clip_{int(seconds)}s.mp4")
+            make_clip(path, seconds, args.fps, args.width, args.height)
+
+            seek_ms, seek_frames = timeit(sample_with_seek, path, args.repeats)
+            seq_ms, seq_frames = timeit(sample_sequential, path, args.repeats)
+            max_diff = max(
+                int(np.abs(a.astype(np.int16) - b.astype(np.int16)).max())
+                for a, b in zip(seek_frames, seq_frames)
+            )
+            print(f"[{seconds:>4.0f}s @ {args.fps}fps, {args.width}x{args.height}] "
+                  f"seek: {seek_ms:7.1f} ms, sequential: {seq_ms:7.1f} ms, "
+                  f"speedup: {seek_ms / seq_ms:4.2f}x, max pixel diff: {max_diff}")
+
+
+if __name__ == "__main__":
+    main()
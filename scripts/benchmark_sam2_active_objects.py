@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+SAM2ObjectTracker 활성 객체 수별 벤치마크
+num_objects (슬롯 수) 는 고정하고 실제 추적 중인 객체 수에 따른 track_all_objects ms/frame 측정
+이전에는 활성 객체 수와 관계없이 항상 num_objects 전체 배치를 계산했으므로 active=num_objects 결과가 기존 비용
+
+Example: python scripts/benchmark_sam2_active_objects.py --num_objects 10 --active 1 2 4 10
+"""
+import argparse
+
+import numpy as np
+import torch
+
+from sam2.build_sam import build_sam2_object_tracker
+from benchmark_utils import timed
+
+
+def make_frames(num_frames, width, height, num_boxes):
+    """좌우로 움직이는 사각형 객체가 있는 합성 프레임과 초기 박스 생성"""
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    box_w, box_h = width // (num_boxes + 1), height // 3
+    frames, boxes = [], []
+    for t in range(num_frames):
+        frame = background.copy()
+        for i in range(num_boxes):
+            x = i * box_w + (t * 3) % max(box_w // 2, 1)
+            frame[height // 3:height // 3 + box_h, x:x + box_w // 2] = (0, 255, 0)
+            if t == 0:
+                boxes.append([[x, height // 3], [x + box_w // 2, height // 3 + box_h]])
+        frames.append(frame)
+    return frames, np.array(boxes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2ObjectTracker active object benchmark")
+    parser.add_argument("--config_file", type=str, default="./configs/samurai/sam2.1_hiera_t.yaml")
+    parser.add_argument("--ckpt_path", type=str, default="checkpoints/sam2.1_hiera_tiny.pt")
+    parser.add_argument("--num_objects", type=int, default=10)
+    parser.add_argument("--active", type=int, nargs="+", default=[1, 2, 4, 10])
+    parser.add_argument("--num_frames", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    tracker = build_sam2_object_tracker(num_objects=args.num_objects,
+                                        config_file=args.config_file,
+                                        ckpt_path=args.ckpt_path,
+                                        device=device,
+                                        verbose=False)
+
+    for num_active in args.active:
+        frames, boxes = make_frames(args.num_frames, args.width, args.height, num_active)
+        tracker.reset_tracker()
+        tracker.track_new_object(img=frames[0], box=boxes)
+
+        # 워밍업 (메모리 뱅크가 채워지기 전 구간 제외)
+        for frame in frames[1:10]:
+            tracker.track_all_objects(img=frame)
+
+        def track_frames():
+            for frame in frames[10:]:
+                tracker.track_all_objects(img=frame)
+
+        _, seconds = timed(track_frames)
+        ms = seconds / (len(frames) - 10) * 1000
+        print(f"active {num_active:>2}/{args.num_objects}: {ms:7.1f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+SAM2ObjectTracker 적응형 입력 해상도 벤치마크
+녹화 클립에서 고정 입력 크기 (1024/768/640/512) 와 적응형 모드의 FPS, 1024 기준 마스크 IoU 비교
+적응형 모드는 해상도별 프레임 수와 FPS 도 출력
+
+Example: python scripts/benchmark_sam2_adaptive_resolution.py --video recordings/clip.mp4 --box 400 120 620 700
+"""
+import argparse
+
+import cv2
+import numpy as np
+import torch
+
+from sam2.build_sam import build_sam2_object_tracker
+from benchmark_utils import timed, load_frames, mask_iou
+
+
+def run(tracker, frames, box, input_size):
+    """클립 전체 추적 후 (프레임 크기의 마스크 목록, FPS) 반환. input_size 가 None 이면 적응형"""
+    tracker.reset_tracker()
+    tracker.input_size_stats.clear()
+    tracker.track_new_object(img=frames[0], box=box, bgr=True)
+
+    h, w = frames[0].shape[:2]
+
+    def track_frames():
+        return [(tracker.track_all_objects(img=frame, bgr=True, input_size=input_size)["pred_masks"][:, 0] > 0).cpu().numpy()
+                for frame in frames[1:]]
+
+    masks, seconds = timed(track_frames)
+    fps = (len(frames) - 1) / seconds
+
+    # 해상도가 달라도 비교할 수 있도록 프레임 크기로 맞춤
+    masks = [np.stack([cv2.resize(m.astype(np.uint8), (w, h), interpolation=cv2.INTER_NEAREST) for m in mask])
+             for mask in masks]
+    return masks, fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2ObjectTracker adaptive input resolution benchmark")
+    parser.add_argument("--video", type=str, required=True)
+    parser.add_argument("--box", type=int, nargs=4, required=True, metavar=("X1", "Y1", "X2", "Y2"),
+                        help="Initial box of the object in the first frame")
+    parser.add_argument("--config_file", type=str, default="./configs/samurai/sam2.1_hiera_b+.yaml")
+    parser.add_argument("--ckpt_path", type=str, default="checkpoints/sam2.1_hiera_base_plus.pt")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 640, 768])
+    parser.add_argument("--min_object_size", type=int, default=128,
+                        help="Minimum object side in input pixels for the adaptive mode")
+    parser.add_argument("--max_frames", type=int, default=300)
+    args = parser.parse_args()
+
+    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    tracker = build_sam2_object_tracker(num_objects=1,
+                                        config_file=args.config_file,
+                                        ckpt_path=args.ckpt_path,
+                                        device=device,
+                                        verbose=False)
+
+    frames = load_frames(args.video, args.max_frames)
+    box = np.array([[[args.box[0], args.box[1]], [args.box[2], args.box[3]]]])
+
+    run(tracker, frames[:10], box, None)  # 워밍업
+    base_masks, base_fps = run(tracker, frames, box, tracker.image_size)
+    print(f"{len(frames)} frames")
+    print(f"fixed {tracker.image_size:>4}: {base_fps:6.1f} FPS")
+
+    for size in sorted(args.sizes, reverse=True):
+        masks, fps = run(tracker, frames, box, size)
+        ious = [mask_iou(a, b) for a, b in zip(masks, base_masks)]
+        print(f"fixed {size:>4}: {fps:6.1f} FPS ({fps / base_fps:4.2f}x), "
+              f"mask IoU vs {tracker.image_size} mean {np.mean(ious):.3f} / min {np.min(ious):.3f}")
+
+    tracker.set_adaptive_input_sizes(args.sizes)
+    tracker.adaptive_min_object_size = args.min_object_size
+    masks, fps = run(tracker, frames, box, None)
+    ious = [mask_iou(a, b) for a, b in zip(masks, base_masks)]
+    print(f"adaptive  : {fps:6.1f} FPS ({fps / base_fps:4.2f}x), "
+          f"mask IoU vs {tracker.image_size} mean {np.mean(ious):.3f} / min {np.min(ious):.3f}")
+
+    for size, stats in sorted(tracker.input_size_stats.items()):
+        print(f"  {size:>4}: {stats['frames']:4d} frames, {stats['frames'] / stats['time']:6.1f} FPS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+SAM2ObjectTracker CPU 벤치마크
+CPU 에서 fp32 추적기와 동적 INT8 + channels-last 추적기의 ms/frame, fp32 대비 마스크 IoU 비교
+
+Example: python scripts/benchmark_sam2_cpu.py --video recordings/clip.mp4 --box 400 120 620 700 --threads 8
+"""
+import argparse
+
+import numpy as np
+import torch
+
+from sam2.build_sam import build_sam2_object_tracker
+from benchmark_utils import timed, load_frames, mask_iou
+
+
+def run(tracker, frames, box):
+    """클립 전체 추적 후 (프레임별 마스크, ms/frame) 반환"""
+    tracker.reset_tracker()
+    tracker.track_new_object(img=frames[0], box=box, bgr=True)
+
+    def track_frames():
+        return [(tracker.track_all_objects(img=frame, bgr=True)["pred_masks"] > 0).numpy() for frame in frames[1:]]
+
+    masks, seconds = timed(track_frames)
+    ms = seconds / (len(frames) - 1) * 1000
+    return masks, ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2ObjectTracker CPU INT8 benchmark")
+    parser.add_argument("--video", type=str, required=True)
+    parser.add_argument("--box", type=int, nargs=4, required=True, metavar=("X1", "Y1", "X2", "Y2"),
+                        help="Initial box of the object in the first frame")
+    parser.add_argument("--config_file", type=str, default="./configs/samurai/sam2.1_hiera_b+.yaml")
+    parser.add_argument("--ckpt_path", type=str, default="checkpoints/sam2.1_hiera_base_plus.pt")
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads, e.g. physical cores")
+    parser.add_argument("--no_channels_last", action="store_true")
+    parser.add_argument("--max_frames", type=int, default=50)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.max_frames)
+    box = np.array([[[args.box[0], args.box[1]], [args.box[2], args.box[3]]]])
+
+    results = {}
+    for name, cpu_int8 in (("fp32", False), ("int8", True)):
+        tracker = build_sam2_object_tracker(num_objects=1,
+                                            config_file=args.config_file,
+                                            ckpt_path=args.ckpt_path,
+                                            device="cpu",
+                                            verbose=False,
+                                            cpu_int8=cpu_int8,
+                                            cpu_channels_last=not args.no_channels_last,
+                                            cpu_num_threads=args.threads)
+
+        run(tracker, frames[:5], box)  # 워밍업
+        results[name] = run(tracker, frames, box)
+        del tracker
+
+    base_masks, base_ms = results["fp32"]
+    masks, ms = results["int8"]
+    ious = [mask_iou(a, b) for a, b in zip(masks, base_masks)]
+
+    print(f"{len(frames)} frames, {torch.get_num_threads()} threads")
+    print(f"fp32: {base_ms:7.1f} ms/frame")
+    print(f"int8: {ms:7.1f} ms/frame ({base_ms / ms:4.2f}x), "
+          f"mask IoU vs fp32 mean {np.mean(ious):.3f} / min {np.min(ious):.3f}")
+
+
+if __name__ == "__main__":
+    main()
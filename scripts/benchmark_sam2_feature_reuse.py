@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+SAM2ObjectTracker 백본 특징 재사용 벤치마크
+녹화 클립에서 feature_reuse_threshold 별 ms/frame, 재사용 비율, 기준 (매 프레임 백본 실행) 대비 마스크 IoU 비교
+
+Example: python scripts/benchmark_sam2_feature_reuse.py --video recordings/clip.mp4 --box 400 120 620 700 --thresholds 0.02 0.05 0.1
+"""
+import argparse
+
+import numpy as np
+import torch
+
+from sam2.build_sam import build_sam2_object_tracker
+from benchmark_utils import timed, load_frames, mask_iou
+
+
+def run(tracker, frames, box, threshold, refresh_interval):
+    """클립 전체 추적 후 (프레임별 마스크, ms/frame, 재사용 비율) 반환"""
+    tracker.feature_reuse_threshold = threshold
+    tracker.feature_refresh_interval = refresh_interval
+    tracker.feature_cache_stats.update(computed=0, reused=0)
+    tracker.reset_tracker()
+    tracker.track_new_object(img=frames[0], box=box, bgr=True)
+
+    def track_frames():
+        return [(tracker.track_all_objects(img=frame, bgr=True)["pred_masks"] > 0).cpu().numpy() for frame in frames[1:]]
+
+    masks, seconds = timed(track_frames)
+    ms = seconds / (len(frames) - 1) * 1000
+
+    stats = tracker.feature_cache_stats
+    reuse_ratio = stats["reused"] / max(stats["computed"] + stats["reused"], 1)
+    return masks, ms, reuse_ratio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2ObjectTracker backbone feature reuse benchmark")
+    parser.add_argument("--video", type=str, required=True)
+    parser.add_argument("--box", type=int, nargs=4, required=True, metavar=("X1", "Y1", "X2", "Y2"),
+                        help="Initial box of the object in the first frame")
+    parser.add_argument("--config_file", type=str, default="./configs/samurai/sam2.1_hiera_b+.yaml")
+    parser.add_argument("--ckpt_path", type=str, default="checkpoints/sam2.1_hiera_base_plus.pt")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.02, 0.05, 0.1])
+    parser.add_argument("--refresh_interval", type=int, default=10)
+    parser.add_argument("--max_frames", type=int, default=300)
+    args = parser.parse_args()
+
+    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    tracker = build_sam2_object_tracker(num_objects=1,
+                                        config_file=args.config_file,
+                                        ckpt_path=args.ckpt_path,
+                                        device=device,
+                                        verbose=False)
+
+    frames = load_frames(args.video, args.max_frames)
+    box = np.array([[[args.box[0], args.box[1]], [args.box[2], args.box[3]]]])
+
+    # 기준: 매 프레임 백본 실행
+    run(tracker, frames[:10], box, 0.0, args.refresh_interval)  # 워밍업
+    base_masks, base_ms, _ = run(tracker, frames, box, 0.0, args.refresh_interval)
+    print(f"{len(frames)} frames, refresh interval {args.refresh_interval}")
+    print(f"baseline        : {base_ms:7.1f} ms/frame")
+
+    for threshold in args.thresholds:
+        masks, ms, reuse_ratio = run(tracker, frames, box, threshold, args.refresh_interval)
+        ious = [mask_iou(a, b) for a, b in zip(masks, base_masks)]
+        print(f"threshold {threshold:<6}: {ms:7.1f} ms/frame ({base_ms / ms:4.2f}x), "
+              f"reused {reuse_ratio * 100:5.1f}%, mask IoU vs baseline mean {np.mean(ious):.3f} / min {np.min(ious):.3f}")
+
+
+if __name__ == "__main__":
+    main()
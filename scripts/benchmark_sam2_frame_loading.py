@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+SAM2VideoPredictor 프레임 로딩 벤치마크
+전체 디코딩 (기본 init_state) 과 스트리밍 로딩 (streaming_frames=True) 의 첫 마스크까지 시간, 전파 시간, 최대 메모리 비교
+모드마다 별도 프로세스에서 실행해 최대 RSS 를 분리
+--check: 모델 없이 스트리밍 로더 (프리페치 스레드 포함) 의 프레임이 전체 디코딩 결과와 같은지 확인
+         --video_path 가 없으면 합성 mp4 클립을 만들어 사용
+
+Example: python scripts/benchmark_sam2_frame_loading.py --video_path videos/long.mp4 --box 1612 364 1920 430
+         python scripts/benchmark_sam2_frame_loading.py --check
+"""
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+
+import numpy as np
+import torch
+
+from sam2.build_sam import build_sam2_video_predictor
+from sam2.utils.misc import load_video_frames
+from benchmark_utils import timed
+
+
+def run(args, streaming, results):
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    predictor = build_sam2_video_predictor(args.config_file, args.ckpt_path, device=device)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with torch.autocast("cuda", dtype=torch.bfloat16, enabled=device == "cuda"):
+        def first_mask():
+            state = predictor.init_state(video_path=args.video_path,
+                                         offload_video_to_cpu=args.offload_video_to_cpu,
+                                         streaming_frames=streaming,
+                                         max_cached_frames=args.max_cached_frames)
+            predictor.add_new_points_or_box(inference_state=state, frame_idx=0, obj_id=1,
+                                            box=np.array(args.box, dtype=np.float32))
+            return state
+
+        def propagate():
+            for _ in predictor.propagate_in_video(state, max_frame_num_to_track=args.max_frames):
+                pass
+
+        state, first_mask_time = timed(first_mask)
+        _, propagate_time = timed(propagate)
+
+    results[streaming] = {
+        "frames": state["num_frames"],
+        "first_mask": first_mask_time,
+        "propagate": propagate_time,
+        "rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024,
+        "cuda_mb": torch.cuda.max_memory_allocated() / 2 ** 20 if device == "cuda" else 0.0,
+    }
+
+
+def write_test_video(path, num_frames=50, size=(320, 240)):
+    """프레임마다 내용이 다른 mp4v 클립"""
+    import cv2
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 25, size)
+    for i in range(num_frames):
+        frame = np.full((size[1], size[0], 3), (i * 5) % 256, dtype=np.uint8)
+        cv2.rectangle(frame, (i * 4, 40), (i * 4 + 60, 160), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def check_streaming(video_path, image_size=1024):
+    """
+    스트리밍 로더의 모든 프레임을 전체 디코딩 결과와 비교
+    프리페치 스레드가 디코드한 프레임 (순방향) 과 직접 디코드한 프레임 (역방향, 캐시 밖) 을 모두 확인
+    """
+    kwargs = dict(image_size=image_size, offload_video_to_cpu=True, compute_device=torch.device("cpu"))
+    images, height, width = load_video_frames(video_path, **kwargs)
+    frames, s_height, s_width = load_video_frames(video_path, streaming_frames=True, max_cached_frames=8,
+                                                  prefetch_frames=4, **kwargs)
+    try:
+        assert (s_height, s_width) == (height, width), f"video size {(s_height, s_width)} != {(height, width)}"
+        assert len(frames) == len(images), f"{len(frames)} frames != {len(images)}"
+        for order in (range(len(frames)), reversed(range(len(frames)))):
+            for i in order:
+                diff = (frames[i] - images[i]).abs().max().item()
+                assert diff < 1e-5, f"frame {i} differs by {diff}"
+    finally:
+        frames.close()
+    print(f"streaming check OK: {len(images)} frames ({width}x{height})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2VideoPredictor frame loading benchmark")
+    parser.add_argument("--video_path", type=str, default=None, help="MP4 file or directory of JPEG frames")
+    parser.add_argument("--box", type=float, nargs=4, default=None, metavar=("X1", "Y1", "X2", "Y2"))
+    parser.add_argument("--config_file", type=str, default="configs/sam2.1/sam2.1_hiera_l.yaml")
+    parser.add_argument("--ckpt_path", type=str, default="checkpoints/sam2.1_hiera_large.pt")
+    parser.add_argument("--max_frames", type=int, default=None, help="Number of frames to propagate")
+    parser.add_argument("--max_cached_frames", type=int, default=64)
+    parser.add_argument("--offload_video_to_cpu", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Only check the streaming frames against eager decoding")
+    args = parser.parse_args()
+
+    if args.check:
+        if args.video_path is not None:
+            check_streaming(args.video_path)
+            return
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            video_path = os.path.join(tmp_dir, "check.mp4")
+            write_test_video(video_path)
+            check_streaming(video_path)
+        return
+    if args.video_path is None or args.box is None:
+        parser.error("--video_path and --box are required for the benchmark")
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Manager().dict()
+    for streaming in (False, True):
+        proc = ctx.Process(target=run, args=(args, streaming, results))
+        proc.start()
+        proc.join()
+
+    for streaming, name in ((False, "eager"), (True, "streaming")):
+        if streaming not in results:
+            print(f"{name:>9}: failed")
+            continue
+        r = results[streaming]
+        print(f"{name:>9}: {r['frames']} frames, first mask {r['first_mask']:6.2f} s, "
+              f"propagate {r['propagate']:6.2f} s, "
+              f"peak RSS +{r['rss_mb']:7.0f} MB, peak CUDA {r['cuda_mb']:7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+SAM2ObjectTracker ROI 추적 벤치마크
+녹화 클립에서 전체 프레임 추적과 칼만 예측 박스 주변 크롭 (ROI) 추적의 FPS, 크롭 프레임 비율, 전체 프레임 대비 마스크 IoU 비교
+
+Example: python scripts/benchmark_sam2_roi_tracking.py --video recordings/clip.mp4 --box 400 120 620 700 --sizes 384 512 640
+"""
+import argparse
+
+import numpy as np
+import torch
+
+from sam2.build_sam import build_sam2_object_tracker
+from benchmark_utils import timed, load_frames, mask_iou
+
+
+def run(tracker, frames, box):
+    """클립 전체 추적 후 (프레임별 마스크, FPS) 반환"""
+    tracker.reset_tracker()
+    tracker.input_size_stats.clear()
+    tracker.roi_stats.clear()
+    tracker.track_new_object(img=frames[0], box=box, bgr=True)
+
+    def track_frames():
+        return [(tracker.track_all_objects(img=frame, bgr=True)["pred_masks"] > 0).cpu().numpy() for frame in frames[1:]]
+
+    masks, seconds = timed(track_frames)
+    fps = (len(frames) - 1) / seconds
+    return masks, fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2ObjectTracker region-of-interest tracking benchmark")
+    parser.add_argument("--video", type=str, required=True)
+    parser.add_argument("--box", type=int, nargs=4, required=True, metavar=("X1", "Y1", "X2", "Y2"),
+                        help="Initial box of the object in the first frame")
+    parser.add_argument("--config_file", type=str, default="./configs/samurai/sam2.1_hiera_b+.yaml")
+    parser.add_argument("--ckpt_path", type=str, default="checkpoints/sam2.1_hiera_base_plus.pt")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[384, 512, 640, 768])
+    parser.add_argument("--margin", type=float, default=0.25)
+    parser.add_argument("--refresh_interval", type=int, default=30)
+    parser.add_argument("--max_frames", type=int, default=300)
+    args = parser.parse_args()
+
+    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    tracker = build_sam2_object_tracker(num_objects=1,
+                                        config_file=args.config_file,
+                                        ckpt_path=args.ckpt_path,
+                                        device=device,
+                                        verbose=False)
+
+    frames = load_frames(args.video, args.max_frames)
+    box = np.array([[[args.box[0], args.box[1]], [args.box[2], args.box[3]]]])
+
+    # 기준: 매 프레임 전체 프레임 추적
+    run(tracker, frames[:10], box)  # 워밍업
+    base_masks, base_fps = run(tracker, frames, box)
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+    print(f"full frame: {base_fps:6.1f} FPS")
+
+    tracker.set_roi_input_sizes(args.sizes)
+    tracker.roi_margin = args.margin
+    tracker.roi_refresh_interval = args.refresh_interval
+    masks, fps = run(tracker, frames, box)
+    ious = [mask_iou(a, b) for a, b in zip(masks, base_masks)]
+
+    roi_frames = sum(stats["frames"] for stats in tracker.roi_stats.values())
+    print(f"roi       : {fps:6.1f} FPS ({fps / base_fps:4.2f}x), "
+          f"cropped {roi_frames / (len(frames) - 1) * 100:5.1f}% of frames, "
+          f"mask IoU vs full frame mean {np.mean(ious):.3f} / min {np.min(ious):.3f}")
+
+    for size, stats in sorted(tracker.roi_stats.items()):
+        print(f"  crop {size:>4}: {stats['frames']:4d} frames, {stats['frames'] / stats['time']:6.1f} FPS")
+    for size, stats in sorted(tracker.input_size_stats.items()):
+        print(f"  full {size:>4}: {stats['frames']:4d} frames, {stats['frames'] / stats['time']:6.1f} FPS")
+
+
+if __name__ == "__main__":
+    main()
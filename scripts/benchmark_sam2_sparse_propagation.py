@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+SAM2VideoPredictor 희소 전파 벤치마크
+DAM 용 8개 샘플 프레임에 대해 전체 프레임 전파 (propagate_in_video) 와 희소 전파 (propagate_in_video_sparse) 의 시간, 마스크 IoU 비교
+
+Example: python scripts/benchmark_sam2_sparse_propagation.py --video_dir videos/1 --box 1612 364 1920 430 --strides 1 2 4 auto
+"""
+import argparse
+import glob
+import os
+
+import numpy as np
+import torch
+
+from sam2.build_sam import build_sam2_video_predictor
+from benchmark_utils import timed, mask_iou
+
+NUM_SAMPLES = 8
+
+
+def prompt(predictor, video_dir, box):
+    state = predictor.init_state(video_path=video_dir)
+    predictor.reset_state(state)
+    predictor.add_new_points_or_box(inference_state=state, frame_idx=0, obj_id=1, box=np.array(box, dtype=np.float32))
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2VideoPredictor sparse propagation benchmark")
+    parser.add_argument("--video_dir", type=str, required=True, help="Directory of JPEG frames")
+    parser.add_argument("--box", type=float, nargs=4, required=True, metavar=("X1", "Y1", "X2", "Y2"))
+    parser.add_argument("--config_file", type=str, default="configs/sam2.1/sam2.1_hiera_l.yaml")
+    parser.add_argument("--ckpt_path", type=str, default="checkpoints/sam2.1_hiera_large.pt")
+    parser.add_argument("--strides", type=str, nargs="+", default=["1", "2", "4", "auto"])
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    predictor = build_sam2_video_predictor(args.config_file, args.ckpt_path, device=device)
+
+    num_frames = len(glob.glob(os.path.join(args.video_dir, "*.jpg")))
+    indices = np.linspace(0, num_frames - 1, NUM_SAMPLES, dtype=int)
+
+    with torch.autocast("cuda", dtype=torch.bfloat16, enabled=device == "cuda"):
+        state = prompt(predictor, args.video_dir, args.box)
+        full, full_time = timed(lambda: {idx: (logits[0] > 0).cpu().numpy()
+                                         for idx, _, logits in predictor.propagate_in_video(state)})
+        print(f"{num_frames} frames, sampled {indices.tolist()}")
+        print(f"full propagation  : {full_time:6.2f} s")
+
+        for stride in args.strides:
+            stride = stride if stride == "auto" else int(stride)
+            state = prompt(predictor, args.video_dir, args.box)
+            sparse, sparse_time = timed(lambda: {idx: (logits[0] > 0).cpu().numpy()
+                                                 for idx, _, logits in predictor.propagate_in_video_sparse(
+                                                     state, target_frame_inds=indices, stride=stride)})
+            ious = [mask_iou(sparse[i], full[i]) for i in indices]
+            print(f"sparse stride {str(stride):>4}: {sparse_time:6.2f} s ({full_time / sparse_time:4.2f}x), "
+                  f"mask IoU vs full mean {np.mean(ious):.3f} / min {np.min(ious):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+SAM2ObjectTracker 단계별 프로파일링
+녹화 클립 추적 중 단계별 (백본, 메모리 구성, 메모리 어텐션, SAM 헤드, 칼만 필터, 메모리 인코더) 소요 시간의 백분위수 출력
+--trace 지정 시 Chrome trace JSON 저장 (chrome://tracing 또는 Perfetto 에서 열기)
+
+Example: python scripts/benchmark_sam2_stages.py --video recordings/clip.mp4 --box 400 120 620 700 --trace sam2_trace.json
+"""
+import argparse
+
+import cv2
+import numpy as np
+import torch
+
+from sam2.build_sam import build_sam2_object_tracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2ObjectTracker per-stage profiling")
+    parser.add_argument("--video", type=str, required=True)
+    parser.add_argument("--box", type=int, nargs=4, required=True, metavar=("X1", "Y1", "X2", "Y2"),
+                        help="Initial box of the object in the first frame")
+    parser.add_argument("--config_file", type=str, default="./configs/samurai/sam2.1_hiera_b+.yaml")
+    parser.add_argument("--ckpt_path", type=str, default="checkpoints/sam2.1_hiera_base_plus.pt")
+    parser.add_argument("--max_frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--trace", type=str, default=None, help="Chrome trace JSON output path")
+    args = parser.parse_args()
+
+    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    tracker = build_sam2_object_tracker(num_objects=1,
+                                        config_file=args.config_file,
+                                        ckpt_path=args.ckpt_path,
+                                        device=device,
+                                        verbose=False)
+
+    cap = cv2.VideoCapture(args.video)
+    ret, frame = cap.read()
+    if not ret:
+        raise SystemExit(f"Cannot read {args.video}")
+
+    box = np.array([[[args.box[0], args.box[1]], [args.box[2], args.box[3]]]])
+    tracker.track_new_object(img=frame, box=box, bgr=True)
+
+    num_frames = 0
+    while num_frames < args.max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        # 워밍업 이후부터 기록
+        if num_frames == args.warmup:
+            profiler = tracker.enable_profiling(trace=args.trace is not None)
+
+        tracker.track_all_objects(img=frame, bgr=True)
+        num_frames += 1
+    cap.release()
+
+    if num_frames <= args.warmup:
+        raise SystemExit(f"Need more than {args.warmup} frames, got {num_frames}")
+
+    summary = profiler.summary(percentiles=(50, 90, 99))
+    print(f"{num_frames - args.warmup} frames on {device}")
+    print(f"{'stage':>17} {'mean':>7} {'p50':>7} {'p90':>7} {'p99':>7}  (ms)")
+    for name in tracker.PROFILER_SPANS:
+        if name in summary:
+            stats = summary[name]
+            print(f"{name:>17} {stats['mean']:7.2f} {stats['p50']:7.2f} {stats['p90']:7.2f} {stats['p99']:7.2f}")
+
+    if args.trace:
+        profiler.export_chrome_trace(args.trace)
+        print(f"Chrome trace saved to {args.trace}")
+
+
+if __name__ == "__main__":
+    main()
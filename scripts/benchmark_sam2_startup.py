@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+SAM2 모델 시작 시간 벤치마크
+캐시 없이 빌드 (Hydra compose + instantiate + torch.load), 첫 캐시 빌드 (아티팩트 저장), 캐시 빌드 (저장된 설정 + mmap 가중치) 비교
+매 빌드는 새 프로세스에서 실행
+
+Example: python scripts/benchmark_sam2_startup.py --builder object_tracker --repeats 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def child(args):
+    start = time.perf_counter()
+    import torch
+
+    from sam2.build_sam import build_sam2_object_tracker, build_sam2_video_predictor
+    import_time = time.perf_counter() - start
+
+    # torch 를 이미 불러온 뒤라 import 시간에 영향 없음
+    from benchmark_utils import timed
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    artifact_cache = args.cache_dir if args.cache_dir else False
+
+    def build():
+        if args.builder == "object_tracker":
+            return build_sam2_object_tracker(num_objects=1, config_file=args.config_file, ckpt_path=args.ckpt_path,
+                                             device=device, verbose=False, artifact_cache=artifact_cache)
+        return build_sam2_video_predictor(args.config_file, args.ckpt_path, device=device, artifact_cache=artifact_cache)
+
+    _, build_time = timed(build)
+
+    print(json.dumps({"import": import_time, "build": build_time}))
+
+
+def run_child(args, cache_dir):
+    cmd = [sys.executable, __file__, "--child", "--builder", args.builder,
+           "--config_file", args.config_file, "--ckpt_path", args.ckpt_path, "--cache_dir", cache_dir]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2 startup benchmark")
+    parser.add_argument("--builder", type=str, default="object_tracker", choices=["object_tracker", "video_predictor"])
+    parser.add_argument("--config_file", type=str, default="configs/sam2.1/sam2.1_hiera_l.yaml")
+    parser.add_argument("--ckpt_path", type=str, default="checkpoints/sam2.1_hiera_large.pt")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--cache_dir", type=str, default="")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    def report(name, results):
+        build = [r["build"] for r in results]
+        imports = [r["import"] for r in results]
+        print(f"{name:>12}: build {min(build):6.2f} s (min) / {sum(build) / len(build):6.2f} s (mean), "
+              f"imports {min(imports):5.2f} s")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        report("no cache", [run_child(args, "") for _ in range(args.repeats)])
+        report("cache write", [run_child(args, cache_dir)])
+        report("cache hit", [run_child(args, cache_dir) for _ in range(args.repeats)])
+        size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(cache_dir) for f in files)
+        print(f"artifact size: {size / 2 ** 20:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+벤치마크 스크립트 공통 도우미 (GPU 동기화, 시간 측정, 프레임 로드, 마스크 IoU)
+scripts/ 에서 실행되는 벤치마크가 `from benchmark_utils import ...` 로 사용
+"""
+import time
+
+import cv2
+import numpy as np
+import torch
+
+
+def sync():
+    """GPU 작업이 끝날 때까지 대기 (CPU 에서는 아무것도 하지 않음)"""
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def timed(fn, repeats=1):
+    """(마지막 fn() 결과, 호출당 소요 시간 초), 측정 앞뒤로 GPU 동기화"""
+    sync()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    sync()
+    return out, (time.perf_counter() - start) / repeats
+
+
+def load_frames(path, max_frames):
+    """영상에서 앞의 max_frames 개 BGR 프레임"""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def mask_iou(a, b):
+    """두 이진 마스크의 IoU (둘 다 비어 있으면 1)"""
+    union = np.logical_or(a, b).sum()
+    return np.logical_and(a, b).sum() / union if union else 1.0
@@ -8,7 +8,7 @@ import time
 import warnings
 import requests
 from pathlib import Path
-from threading import Thread
+from threading import Lock, Thread
 from datetime import datetime
 from typing import List, Dict
 # 모듈 import를 위한 경로 추가
@@ -35,6 +35,8 @@ LOG_FILE = PROJECT_ROOT / "action_log.txt"
 # Global Variables & Flask App
 # -----------------------------------------------------------------------------
 recording_active = False
+# 카메라는 한 번에 한 녹화만 사용
+camera_lock = Lock()
 signal_queue = []
 app = Flask(__name__)
 # 모듈 인스턴스
@@ -129,20 +131,31 @@ def process_external_signals():
             print(f"[TRIGGER] 신호 처리: {signal.signal_type}")
             print(f"[TRIGGER] BBox: {signal.bbox_normalized}")
             
-            def record_and_analyze():
+            # 녹화 스레드가 플래그를 세우기 전에 다음 신호가 카메라를 잡지 않도록 여기서 세움
+            recording_active = True
+
+            # 분석은 녹화가 끝난 뒤에도 계속되므로, 다음 신호가 `signal` 을 바꾸기 전에 스레드 시작 시점의 신호를 묶어 둠
+            def record_and_analyze(signal):
                 global recording_active
-                recording_active = True
+                video_path = None
                 try:
-                    # 신호를 받았을 때만 카메라 초기화
-                    if not camera_manager.is_initialized:
-                        print("[CAMERA] 카메라 초기화 중...")
-                        if not camera_manager.initialize_camera("http://192.168.5.59:5001/video_feed"):
-                            print("[CAMERA] 카메라 초기화 실패 - 녹화를 건너뜁니다")
-                            return
-                        print("[CAMERA] 카메라 초기화 완료")
-                    
-                    # 녹화
-                    video_path = camera_manager.record_video(DURATION_SEC, FPS)
+                    # 플래그는 녹화 구간만 소유 - 이전 신호의 분석 스레드가 다음 녹화 중에 플래그를 내리지 않도록
+                    with camera_lock:
+                        try:
+                            # 신호를 받았을 때만 카메라 초기화
+                            if not camera_manager.is_initialized:
+                                print("[CAMERA] 카메라 초기화 중...")
+                                if not camera_manager.initialize_camera("http://192.168.5.59:5001/video_feed"):
+                                    print("[CAMERA] 카메라 초기화 실패 - 녹화를 건너뜁니다")
+                                    return
+                                print("[CAMERA] 카메라 초기화 완료")
+
+                            # 녹화
+                            video_path = camera_manager.record_video(DURATION_SEC, FPS)
+                        finally:
+                            # 녹화가 끝나면 카메라를 다음 신호에 넘김 - 동시에 들어온 분석은 DAM 배치 스케줄러가 묶어서 처리
+                            recording_active = False
+
                     if video_path:
                         # DAM 분석
                         description = dam_analyzer.analyze_video(video_path, signal.bbox_normalized, use_sam2=False)
@@ -154,10 +167,8 @@ def process_external_signals():
                             send_analysis_result_to_web(description, signal.bbox_normalized, signal.signal_type)
                 except Exception as e:
                     print(f"[오류] 녹화/분석 실패: {e}")
-                finally:
-                    recording_active = False
-            
-            Thread(target=record_and_analyze, daemon=True).start()
+
+            Thread(target=record_and_analyze, args=(signal,), daemon=True).start()
         time.sleep(0.1)
 # -----------------------------------------------------------------------------
 # Main Function
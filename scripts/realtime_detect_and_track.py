@@ -109,6 +109,8 @@ def main():
                     new_boxes.append(box)
 
             for box in new_boxes:
+                if sam.curr_obj_idx >= sam.num_objects:
+                    break
                 if not tracked_boxes or \
                    max(compute_iou(box, tb) for tb in tracked_boxes) < IOU_THRESHOLD:
                     sam.track_new_object(img=img_rgb, box=np.array([box]))
@@ -14,25 +14,31 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import time
 import torch
 import torch.nn as nn
 import numpy as np
 from PIL import Image
 from .model.constants import DEFAULT_IMAGE_TOKEN, IMAGE_TOKEN_INDEX
 from .model.conversation import SeparatorStyle, conv_templates
-from .model.mm_utils import KeywordsStoppingCriteria, process_image, tokenizer_image_token
+from .model.mm_utils import KeywordsStoppingCriteria, PerRowMaxNewTokensCriteria, process_image, tokenizer_image_token
 from .model import get_model_name_from_path, load_pretrained_model
 from transformers import TextIteratorStreamer
 from threading import Thread
 
 class DescribeAnythingModel(nn.Module):
-    def __init__(self, model_path, conv_mode, prompt_mode, **kwargs):
+    def __init__(self, model_path, conv_mode, prompt_mode, use_prefix_cache=False, **kwargs):
         super().__init__()
         
         self.model_path = model_path
         self.conv_mode = conv_mode
         self.prompt_mode = prompt_mode
 
+        # KV cache of the static conversation/system prefix (everything before the first <image>), keyed by conv_mode and prefix tokens
+        self.use_prefix_cache = use_prefix_cache
+        self._prefix_cache = None
+        self.prefix_cache_stats = dict(hits=0, misses=0, bypassed=0, prefix_tokens=0, prefill_s=0.0, saved_prefill_s=0.0)
+
         if isinstance(model_path, str):
             self.tokenizer, self.model, _, _ = load_pretrained_model(model_path, None, None, **kwargs)
             self.model_name = get_model_name_from_path(model_path)
@@ -245,6 +251,111 @@ class DescribeAnythingModel(nn.Module):
             
         return torch.cat((images_tensor, images_tensor2), dim=1) if images_tensor2 is not None else images_tensor
     
+    @staticmethod
+    def masks_to_boxes(masks):
+        """Batched `mask_to_box` for (N, H, W) bool masks using row/column reductions. Returns (N, 4) x0, y0, w, h."""
+        height, width = masks.shape[-2:]
+        rows = masks.any(dim=2).to(torch.uint8)
+        cols = masks.any(dim=1).to(torch.uint8)
+        y0 = rows.argmax(dim=1)
+        y1 = height - rows.flip(1).argmax(dim=1)
+        x0 = cols.argmax(dim=1)
+        x1 = width - cols.flip(1).argmax(dim=1)
+        return torch.stack((x0, y0, x1 - x0, y1 - y0), dim=1)
+
+    @staticmethod
+    def crop_window(box, crop_mode, img_h, img_w, min_box_w=48, min_box_h=48):
+        """(x0, y0, x1, y1) of the region `crop_image` cuts out for `crop_mode`, given the mask box (x0, y0, w, h)."""
+        x0, y0, w, h = box
+        if crop_mode == "full":
+            return 0, 0, img_w, img_h
+        if crop_mode == "crop":
+            return x0, y0, x0 + w, y0 + h
+        if crop_mode == "focal_crop":
+            xc, yc = x0 + w/2, y0 + h/2
+            w, h = max(w, min_box_w), max(h, min_box_h)
+            x0, y0 = int(xc - w / 2), int(yc - h / 2)
+        elif crop_mode != "context_crop":
+            raise ValueError(f"Unsupported crop_mode: {crop_mode}")
+        return max(x0-w, 0), max(y0-h, 0), min(x0+2*w, img_w), min(y0+2*h, img_h)
+
+    @staticmethod
+    def batched_output_size(processor):
+        """(H, W) of the tensors `process_image` returns in "resize" mode, or None if the batched path cannot reproduce it.
+
+        As in `process_image`, CLIP-style processors (with `crop_size`) resize to `crop_size`; their own shortest-edge
+        resize and center crop are then no-ops only if `size["shortest_edge"]` matches a square `crop_size`.
+        SigLIP-style processors resize to `size`.
+        """
+        size = processor.size
+        if hasattr(processor, "crop_size"):
+            crop_size = processor.crop_size
+            shortest_edge = size.get("shortest_edge") if isinstance(size, dict) else size
+            if crop_size["height"] != crop_size["width"] or shortest_edge != crop_size["height"]:
+                return None
+            return crop_size["height"], crop_size["width"]
+        return (size["height"], size["width"]) if isinstance(size, dict) else (size, size)
+
+    def supports_batched_preprocess(self, image_pils, mask_pils, crop_modes):
+        """The batched path reproduces `process_image` for resize-style processors (SigLIP, or CLIP in "resize" mode) and the crop modes above."""
+        config = self.model.config
+        processor = config.image_processor
+        if getattr(config, "image_aspect_ratio", None) == "pad":
+            return False
+        if getattr(config, "image_aspect_ratio", None) != "resize" and hasattr(processor, "crop_size"):
+            # CLIP-style processors center crop by default
+            return False
+        if self.batched_output_size(processor) is None:
+            return False
+        if any(mode not in ("full", "crop", "context_crop", "focal_crop") for mode in crop_modes if mode is not None):
+            return False
+        sizes = {image_pil.size for image_pil in image_pils} | {mask_pil.size for mask_pil in mask_pils}
+        return len(sizes) == 1 and all(mask_pil.mode in ("L", "1", "I", "F") for mask_pil in mask_pils)
+
+    def get_image_tensors(self, image_pils, mask_pils, crop_mode, crop_mode2):
+        """Per-frame tensors as returned by `get_image_tensor`, preprocessed as one batch when possible."""
+        if self.supports_batched_preprocess(image_pils, mask_pils, (crop_mode, crop_mode2)):
+            return list(self.get_image_tensors_batched(image_pils, mask_pils, crop_mode, crop_mode2).split(1, dim=0))
+        return [self.get_image_tensor(image_pil, mask_pil, crop_mode=crop_mode, crop_mode2=crop_mode2) for image_pil, mask_pil in zip(image_pils, mask_pils)]
+
+    def get_image_tensors_batched(self, image_pils, mask_pils, crop_mode, crop_mode2):
+        """Tensor-native version of `get_image_tensor` for all frames of a clip at once.
+
+        Frames and masks are uploaded once as a stacked uint8 tensor, mask boxes come from row/column reductions and
+        the crop + resize of the image and mask channels for both crop modes is a single `roi_align` call, followed by
+        one normalization. Matches the PIL path within interpolation tolerance. Returns (N, 4 or 8, H, W).
+        """
+        from torchvision.ops import roi_align
+
+        processor = self.model.config.image_processor
+        out_h, out_w = self.batched_output_size(processor)
+        device = self.model.device
+
+        images = torch.from_numpy(np.stack([np.asarray(image_pil.convert("RGB")) for image_pil in image_pils])).to(device)
+        masks = torch.from_numpy(np.stack([np.asarray(mask_pil) for mask_pil in mask_pils])).to(device) > 0
+        num_frames, img_h, img_w = masks.shape
+
+        crop_modes = [mode for mode in (crop_mode, crop_mode2) if mode is not None]
+        boxes = self.masks_to_boxes(masks).tolist() if any(mode != "full" for mode in crop_modes) else [None] * num_frames
+        rois = []
+        for mode in crop_modes:
+            for i, box in enumerate(boxes):
+                rois.append((i,) + self.crop_window(box, mode, img_h, img_w))
+        rois = torch.tensor(rois, dtype=torch.float32, device=device)
+
+        # RGB and mask (as 0/255 like the PIL mask image) are cropped and resized together
+        channels = torch.cat((images.permute(0, 3, 1, 2), masks[:, None].to(torch.uint8) * 255), dim=1).float()
+        crops = roi_align(channels, rois, output_size=(out_h, out_w), spatial_scale=1.0, sampling_ratio=-1, aligned=True)
+
+        # The mask goes through the processor as a grayscale RGB image, so its channel uses the first mean/std entry
+        mean = torch.tensor(list(processor.image_mean) + [processor.image_mean[0]], dtype=torch.float32, device=device)
+        std = torch.tensor(list(processor.image_std) + [processor.image_std[0]], dtype=torch.float32, device=device)
+        crops = (crops.clamp(0, 255) * processor.rescale_factor - mean[:, None, None]) / std[:, None, None]
+
+        # (num_crop_modes * N, 4, H, W) -> (N, num_crop_modes * 4, H, W)
+        crops = crops.view(len(crop_modes), num_frames, 4, out_h, out_w).permute(1, 0, 2, 3, 4).reshape(num_frames, -1, out_h, out_w)
+        return crops.to(dtype=torch.float16)
+
     def get_description_from_prompt(self, image_pils, mask_pils, prompt, conv, streaming=False, temperature=0.2, top_p=0.5, num_beams=1, max_new_tokens=512, **kwargs):
         if streaming:
             return self.get_description_from_prompt_iterator(image_pils, mask_pils, prompt, conv, streaming=True, temperature=temperature, top_p=top_p, num_beams=num_beams, max_new_tokens=max_new_tokens, **kwargs)
@@ -258,13 +369,14 @@ class DescribeAnythingModel(nn.Module):
         assert crop_mode == "full", "Current prompt only supports first crop as full (non-cropped). If you need other specifications, please update the prompt."
         
         assert len(image_pils) == len(mask_pils), f"image_pils and mask_pils must have the same length. Got {len(image_pils)} and {len(mask_pils)}."
-        image_tensors = [self.get_image_tensor(image_pil, mask_pil, crop_mode=crop_mode, crop_mode2=crop_mode2) for image_pil, mask_pil in zip(image_pils, mask_pils)]
+        image_tensors = self.get_image_tensors(image_pils, mask_pils, crop_mode=crop_mode, crop_mode2=crop_mode2)
         
         input_ids = tokenizer_image_token(prompt, self.tokenizer, IMAGE_TOKEN_INDEX, return_tensors="pt").unsqueeze(0).cuda()
 
         stop_str = conv.sep if conv.sep_style != SeparatorStyle.TWO else conv.sep2
         keywords = [stop_str]
-        stopping_criteria = KeywordsStoppingCriteria(keywords, self.tokenizer, input_ids)
+        # `self.model.generate` passes `inputs_embeds` to the LLM and only returns the new tokens, so the stopping criteria start counting from 0.
+        stopping_criteria = KeywordsStoppingCriteria(keywords, self.tokenizer, input_ids[:, :0])
 
         streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True) if streaming else None
         generation_kwargs = dict(
@@ -294,6 +406,8 @@ class DescribeAnythingModel(nn.Module):
                 yield new_text
             
             thread.join()
+        elif self.use_prefix_cache and num_beams == 1:
+            yield self.generate_from_prompt_ids([input_ids[0]], image_tensors, stop_str, temperature=temperature, top_p=top_p, max_new_tokens=max_new_tokens, **kwargs)[0]
         else:
             with torch.inference_mode():
                 output_ids = self.model.generate(**generation_kwargs)
@@ -305,3 +419,233 @@ class DescribeAnythingModel(nn.Module):
             outputs = outputs.strip()
 
             yield outputs
+
+    @staticmethod
+    def left_align(inputs_embeds, attention_mask):
+        """Move right-padded rows to the end of the sequence so that all rows end at the same position, as required for batched decoding."""
+        seq_len = inputs_embeds.shape[1]
+        shift = seq_len - attention_mask.long().sum(dim=1, keepdim=True)
+        index = (torch.arange(seq_len, device=inputs_embeds.device)[None] - shift) % seq_len
+        inputs_embeds = torch.gather(inputs_embeds, 1, index[..., None].expand_as(inputs_embeds))
+        attention_mask = torch.gather(attention_mask, 1, index)
+        return inputs_embeds, attention_mask
+
+    def get_description_batch(self, image_pils_list, mask_pils_list, queries, temperature=0.2, top_p=0.5, max_new_tokens=512, **kwargs):
+        """Describe several clips with one vision tower pass and one padded `generate` call.
+
+        `queries` and `max_new_tokens` may be a single value shared by all requests or a list with one entry per request.
+        Rows that emit EOS or reach their own `max_new_tokens` are finished early while the rest of the batch keeps decoding.
+        Returns a list of descriptions in request order.
+        """
+        batch_size = len(image_pils_list)
+        assert len(mask_pils_list) == batch_size, f"image_pils_list and mask_pils_list must have the same length. Got {batch_size} and {len(mask_pils_list)}."
+        if isinstance(queries, str):
+            queries = [queries] * batch_size
+        if isinstance(max_new_tokens, int):
+            max_new_tokens = [max_new_tokens] * batch_size
+        assert len(queries) == batch_size and len(max_new_tokens) == batch_size, "queries and max_new_tokens must have one entry per request."
+
+        crop_mode, crop_mode2 = self.prompt_mode.split("+")
+        assert crop_mode == "full", "Current prompt only supports first crop as full (non-cropped). If you need other specifications, please update the prompt."
+
+        # Images are consumed in order by `prepare_inputs_labels_for_multimodal`, so the tensors of all requests are simply concatenated.
+        image_tensors = []
+        prompt_ids = []
+        for image_pils, mask_pils, query in zip(image_pils_list, mask_pils_list, queries):
+            assert len(image_pils) == len(mask_pils), f"image_pils and mask_pils must have the same length. Got {len(image_pils)} and {len(mask_pils)}."
+            prompt, conv = self.get_prompt(query)
+            image_tensors.extend(self.get_image_tensors(image_pils, mask_pils, crop_mode=crop_mode, crop_mode2=crop_mode2))
+            prompt_ids.append(tokenizer_image_token(prompt, self.tokenizer, IMAGE_TOKEN_INDEX, return_tensors="pt"))
+
+        stop_str = conv.sep if conv.sep_style != SeparatorStyle.TWO else conv.sep2
+        return self.generate_from_prompt_ids(prompt_ids, image_tensors, stop_str, temperature=temperature, top_p=top_p, max_new_tokens=max_new_tokens, **kwargs)
+
+    def generate_from_prompt_ids(self, prompt_ids, image_tensors, stop_str, temperature=0.2, top_p=0.5, max_new_tokens=512, **kwargs):
+        """Greedy/sampled decoding (`num_beams=1`) for a batch of tokenized prompts whose images are given in order in `image_tensors`."""
+        batch_size = len(prompt_ids)
+        if isinstance(max_new_tokens, int):
+            max_new_tokens = [max_new_tokens] * batch_size
+
+        max_len = max(len(ids) for ids in prompt_ids)
+        input_ids = torch.zeros((batch_size, max_len), dtype=torch.long)
+        attention_mask = torch.zeros((batch_size, max_len), dtype=torch.bool)
+        for i, ids in enumerate(prompt_ids):
+            input_ids[i, :len(ids)] = ids
+            attention_mask[i, :len(ids)] = True
+        input_ids = input_ids.to(self.model.device)
+        attention_mask = attention_mask.to(self.model.device)
+
+        right_padded = getattr(self.model.llm.config, "tokenizer_padding_side", "right") != "left"
+        prefix_ids = None
+        if self.use_prefix_cache and right_padded:
+            if kwargs:
+                # The prefix-cache decode loop only implements greedy/top-p sampling, so other generation options
+                # (top_k, repetition_penalty, ...) are left to `generate` instead of being dropped
+                self.prefix_cache_stats["bypassed"] += 1
+            else:
+                prefix_ids = self.get_common_prefix_ids(prompt_ids)
+
+        # With `inputs_embeds`, `generate` only returns the new tokens, so the stopping criteria start counting from 0.
+        stopping_criteria = [
+            KeywordsStoppingCriteria([stop_str], self.tokenizer, input_ids[:, :0]),
+            PerRowMaxNewTokensCriteria(max_new_tokens),
+        ]
+        generation_kwargs = dict(
+            do_sample=True if temperature > 0 else False,
+            use_cache=True,
+            stopping_criteria=stopping_criteria,
+            temperature=temperature,
+            top_p=top_p,
+            num_beams=1,
+            pad_token_id=self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id,
+            **kwargs
+        )
+
+        with torch.inference_mode():
+            (_, _, attention_mask, _, inputs_embeds, _) = self.model.prepare_inputs_labels_for_multimodal(
+                input_ids, None, attention_mask, None, None, image_tensors
+            )
+            inputs_embeds = inputs_embeds.to(self.model.dtype)
+
+            if prefix_ids is not None:
+                output_ids = self.generate_with_prefix_cache(prefix_ids, inputs_embeds, attention_mask, max(max_new_tokens), **generation_kwargs)
+            else:
+                if right_padded:
+                    inputs_embeds, attention_mask = self.left_align(inputs_embeds, attention_mask)
+                output_ids = self.model.llm.generate(
+                    inputs_embeds=inputs_embeds,
+                    attention_mask=attention_mask,
+                    max_new_tokens=max(max_new_tokens),
+                    **generation_kwargs
+                )
+
+        descriptions = []
+        for row_ids, row_max_new_tokens in zip(output_ids, max_new_tokens):
+            row_ids = row_ids[:row_max_new_tokens]
+            eos_positions = (row_ids == self.tokenizer.eos_token_id).nonzero()
+            if len(eos_positions) > 0:
+                row_ids = row_ids[:eos_positions[0, 0]]
+            outputs = self.tokenizer.decode(row_ids, skip_special_tokens=True).strip()
+            if stop_str in outputs:
+                outputs = outputs[: outputs.find(stop_str)]
+            descriptions.append(outputs.strip())
+
+        return descriptions
+
+    @staticmethod
+    def get_common_prefix_ids(prompt_ids):
+        """Text tokens before the first image token, if they are identical for all prompts (otherwise None)."""
+        prefixes = []
+        for ids in prompt_ids:
+            image_positions = (ids == IMAGE_TOKEN_INDEX).nonzero()
+            if len(image_positions) == 0:
+                return None
+            prefixes.append(ids[:image_positions[0, 0]])
+        if len(prefixes[0]) == 0 or any(not torch.equal(prefix, prefixes[0]) for prefix in prefixes[1:]):
+            return None
+        return prefixes[0]
+
+    def get_prefix_past_key_values(self, prefix_ids):
+        """Returns the KV cache of the static text prefix, computing it only when the prefix (prompt or `conv_mode`) changed."""
+        key = (self.conv_mode, tuple(prefix_ids.tolist()))
+        if self._prefix_cache is not None and self._prefix_cache[0] == key:
+            self.prefix_cache_stats["hits"] += 1
+            self.prefix_cache_stats["saved_prefill_s"] += self.prefix_cache_stats["prefill_s"]
+            return self._prefix_cache[1]
+
+        start_time = time.time()
+        with torch.inference_mode():
+            outputs = self.model.llm(input_ids=prefix_ids[None].to(self.model.device), use_cache=True)
+        past_key_values = outputs.past_key_values
+        if hasattr(past_key_values, "to_legacy_cache"):
+            past_key_values = past_key_values.to_legacy_cache()
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+
+        self._prefix_cache = (key, past_key_values)
+        self.prefix_cache_stats["misses"] += 1
+        self.prefix_cache_stats["prefix_tokens"] = len(prefix_ids)
+        self.prefix_cache_stats["prefill_s"] = time.time() - start_time
+        return past_key_values
+
+    def clear_prefix_cache(self):
+        self._prefix_cache = None
+
+    def get_prefix_cache_stats(self):
+        return dict(self.prefix_cache_stats, enabled=self.use_prefix_cache, cached=self._prefix_cache is not None)
+
+    @staticmethod
+    def sample_next_token(logits, temperature, top_p):
+        if temperature <= 0:
+            return logits.argmax(dim=-1)
+        probs = torch.softmax(logits.float() / temperature, dim=-1)
+        sorted_probs, sorted_indices = probs.sort(dim=-1, descending=True)
+        # Keep the smallest set of tokens whose cumulative probability reaches top_p (always at least one token).
+        sorted_probs[(sorted_probs.cumsum(dim=-1) - sorted_probs) > top_p] = 0
+        next_sorted = torch.multinomial(sorted_probs, num_samples=1)
+        return sorted_indices.gather(-1, next_sorted).squeeze(-1)
+
+    def generate_with_prefix_cache(self, prefix_ids, inputs_embeds, attention_mask, max_new_tokens, **generation_kwargs):
+        """Decoding that reuses the cached KV of the static text prefix.
+
+        `inputs_embeds` are right-padded and start with the prefix. Only the image tokens and the suffix are prefilled here
+        (left-aligned after the prefix), then the new tokens are decoded step by step on top of the resulting cache.
+        `generate` is not used for the decode steps: it rebuilds `cache_position` from the new tokens only, which makes the
+        causal mask hide the cached keys whenever a 4D mask is built (eager attention, or padded rows with SDPA).
+        Here `cache_position` and `position_ids` always continue from the cache. Finished rows (EOS or a stopping criterion)
+        are padded with `pad_token_id` as in `generate`. The returned ids only contain the new tokens.
+        Only `temperature`, `top_p`, `stopping_criteria` and `pad_token_id` are used; `generate_from_prompt_ids` does not
+        take this path when other generation options are given.
+        """
+        batch_size = inputs_embeds.shape[0]
+        prefix_len = len(prefix_ids)
+        temperature, top_p = generation_kwargs["temperature"], generation_kwargs["top_p"]
+        stopping_criteria = generation_kwargs.get("stopping_criteria") or []
+        pad_token_id = generation_kwargs.get("pad_token_id", self.tokenizer.eos_token_id)
+        past_key_values = tuple(
+            tuple(t.expand(batch_size, -1, -1, -1) for t in layer_past)
+            for layer_past in self.get_prefix_past_key_values(prefix_ids)
+        )
+
+        suffix_embeds, suffix_mask = self.left_align(inputs_embeds[:, prefix_len:], attention_mask[:, prefix_len:])
+        attention_mask = torch.cat((suffix_mask.new_ones((batch_size, prefix_len)), suffix_mask), dim=1)
+        position_ids = (attention_mask.long().cumsum(dim=-1) - 1).clamp(min=0)
+        cache_len = attention_mask.shape[1]
+
+        outputs = self.model.llm(
+            inputs_embeds=suffix_embeds,
+            attention_mask=attention_mask,
+            position_ids=position_ids[:, prefix_len:],
+            past_key_values=past_key_values,
+            cache_position=torch.arange(prefix_len, cache_len, device=suffix_embeds.device),
+            use_cache=True,
+        )
+        next_tokens = self.sample_next_token(outputs.logits[:, -1], temperature, top_p)
+        output_ids = next_tokens[:, None]
+        position_ids = position_ids[:, -1:]
+        unfinished = torch.ones(batch_size, dtype=torch.bool, device=output_ids.device)
+
+        for _ in range(max_new_tokens - 1):
+            is_done = next_tokens == self.tokenizer.eos_token_id
+            for criteria in stopping_criteria:
+                is_done = is_done | torch.as_tensor(criteria(output_ids, None), device=output_ids.device)
+            unfinished = unfinished & ~is_done
+            if not unfinished.any():
+                break
+
+            attention_mask = torch.cat((attention_mask, attention_mask.new_ones((batch_size, 1))), dim=1)
+            position_ids = position_ids + 1
+            outputs = self.model.llm(
+                input_ids=next_tokens[:, None],
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=outputs.past_key_values,
+                cache_position=torch.arange(cache_len, cache_len + 1, device=output_ids.device),
+                use_cache=True,
+            )
+            cache_len += 1
+            next_tokens = self.sample_next_token(outputs.logits[:, -1], temperature, top_p)
+            next_tokens = torch.where(unfinished, next_tokens, next_tokens.new_full((), pad_token_id))
+            output_ids = torch.cat((output_ids, next_tokens[:, None]), dim=1)
+
+        return output_ids
@@ -52,15 +52,22 @@ def get_frame_from_vcap(vidcap, num_frames=10, fps=None, frame_count=None):
     count = 0
     success = True
     frame_indices = np.linspace(0, frame_count - 2, num_frames, dtype=int)
+    # Non-selected frames are only grabbed (no retrieve / colour conversion); repeated indices yield the same frame again
+    frame_repeats = {}
+    for idx in frame_indices:
+        frame_repeats[int(idx)] = frame_repeats.get(int(idx), 0) + 1
 
     while success:
         # print("frame_count:", frame_count, "count:", count, "num_frames:", num_frames, "frame_interval:", frame_interval)
         if frame_count >= num_frames:
-            success, frame = vidcap.read()
-            if count in frame_indices:
+            success = vidcap.grab()
+            if success and count in frame_repeats:
+                success, frame = vidcap.retrieve()
+                if not success:
+                    break
                 img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 im_pil = Image.fromarray(img)
-                images.append(im_pil)
+                images.extend([im_pil] * frame_repeats[count])
                 if len(images) >= num_frames:
                     return images
             count += 1
@@ -266,7 +273,15 @@ def get_model_name_from_path(model_path):
 
 
 class KeywordsStoppingCriteria(StoppingCriteria):
-    def __init__(self, keywords, tokenizer, input_ids):
+    """Stops a row once its generated tokens end with one of the keywords.
+
+    Keyword ids are stored once as a right-aligned padded tensor and moved to the generation device only once,
+    so each step is a single vectorized suffix comparison over the whole batch. Decoding the tail to text
+    (to catch keywords tokenized differently in context) only happens every `decode_interval` steps.
+    Returns one flag per row, so finished rows are padded by `generate` while the others continue.
+    """
+
+    def __init__(self, keywords, tokenizer, input_ids, decode_interval=8):
         self.keywords = keywords
         self.keyword_ids = []
         self.max_keyword_len = 0
@@ -282,31 +297,79 @@ class KeywordsStoppingCriteria(StoppingCriteria):
             self.keyword_ids.append(torch.tensor(cur_keyword_ids))
         self.tokenizer = tokenizer
         self.start_len = input_ids.shape[1]
+        self.decode_interval = decode_interval
+
+        # (num_keywords, max_keyword_len), right-aligned so that the last column is the last token of each keyword
+        self.keyword_table = torch.full((len(self.keyword_ids), self.max_keyword_len), -1, dtype=torch.long)
+        self.keyword_valid = torch.zeros((len(self.keyword_ids), self.max_keyword_len), dtype=torch.bool)
+        self.keyword_lens = torch.tensor([len(ids) for ids in self.keyword_ids], dtype=torch.long)
+        for i, ids in enumerate(self.keyword_ids):
+            if len(ids) > 0:
+                self.keyword_table[i, -len(ids):] = ids
+                self.keyword_valid[i, -len(ids):] = True
+        self._device_tables = {}
+
+    def _tables_on(self, device):
+        if device not in self._device_tables:
+            self._device_tables[device] = (
+                self.keyword_table.to(device),
+                self.keyword_valid.to(device),
+                self.keyword_lens.to(device),
+            )
+        return self._device_tables[device]
+
+    def match_keyword_ids(self, output_ids: torch.LongTensor) -> torch.BoolTensor:
+        """Per-row flag: the generated part of `output_ids` ends with one of the keyword id sequences."""
+        batch_size, seq_len = output_ids.shape
+        gen_len = seq_len - self.start_len
+        if gen_len <= 0 or self.max_keyword_len == 0:
+            return torch.zeros(batch_size, dtype=torch.bool, device=output_ids.device)
+        table, valid, lens = self._tables_on(output_ids.device)
+        tail_len = min(gen_len, self.max_keyword_len)
+        tail = output_ids.new_full((batch_size, self.max_keyword_len), -1)
+        tail[:, -tail_len:] = output_ids[:, -tail_len:]
+        # (batch, num_keywords): every valid keyword position equals the tail and the keyword fits in the generated part
+        matches = ((tail[:, None, :] == table[None]) | ~valid[None]).all(dim=-1) & (lens <= gen_len)[None]
+        return matches.any(dim=-1)
+
+    def match_keyword_text(self, output_ids: torch.LongTensor) -> torch.BoolTensor:
+        """Per-row flag from decoded text of the recent tail (slow path)."""
+        gen_len = output_ids.shape[1] - self.start_len
+        offset = min(gen_len, self.decode_interval + self.max_keyword_len)
+        if offset <= 0:
+            return torch.zeros(output_ids.shape[0], dtype=torch.bool, device=output_ids.device)
+        outputs = self.tokenizer.batch_decode(output_ids[:, -offset:], skip_special_tokens=True)
+        return torch.tensor(
+            [any(keyword in text for keyword in self.keywords) for text in outputs],
+            dtype=torch.bool,
+            device=output_ids.device,
+        )
 
-    def call_for_batch(
+    def __call__(
         self, output_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs
-    ) -> bool:
-        offset = min(output_ids.shape[1] -
-                     self.start_len, self.max_keyword_len)
-        self.keyword_ids = [
-            keyword_id.to(output_ids.device) for keyword_id in self.keyword_ids
-        ]
-        for keyword_id in self.keyword_ids:
-            if (output_ids[0, -keyword_id.shape[0]:] == keyword_id).all():
-                return True
-        outputs = self.tokenizer.batch_decode(
-            output_ids[:, -offset:], skip_special_tokens=True
-        )[0]
-        for keyword in self.keywords:
-            if keyword in outputs:
-                return True
-        return False
+    ) -> torch.BoolTensor:
+        is_done = self.match_keyword_ids(output_ids)
+        gen_len = output_ids.shape[1] - self.start_len
+        if self.decode_interval and gen_len > 0 and gen_len % self.decode_interval == 0:
+            is_done = is_done | self.match_keyword_text(output_ids)
+        return is_done
+
+
+class PerRowMaxNewTokensCriteria(StoppingCriteria):
+    """Stops each row of a batch after its own `max_new_tokens`.
+
+    `generate` only takes a single `max_new_tokens`, so batched requests run with the maximum
+    of all rows and this criterion marks the shorter rows as finished early. Rows that are done
+    are padded by `generate` and no longer affect when the batch stops.
+    """
+
+    def __init__(self, max_new_tokens, start_len=0):
+        self.max_new_tokens = torch.as_tensor(max_new_tokens, dtype=torch.long)
+        self.start_len = start_len
 
     def __call__(
         self, output_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs
-    ) -> bool:
-        outputs = []
-        for i in range(output_ids.shape[0]):
-            outputs.append(self.call_for_batch(
-                output_ids[i].unsqueeze(0), scores))
-        return all(outputs)
+    ) -> torch.BoolTensor:
+        if self.max_new_tokens.device != output_ids.device:
+            self.max_new_tokens = self.max_new_tokens.to(output_ids.device)
+        return (output_ids.shape[1] - self.start_len) >= self.max_new_tokens
@@ -14,16 +14,23 @@ class DAMAnalyzer:
     """DAM 분석 클래스 (TensorRT 최적화 지원)"""
     
     def __init__(self, dam_script_path: Path, temperature: float = 0.1, top_p: float = 0.15, 
-                 use_tensorrt: bool = True, tensorrt_cache_dir: str = "tensorrt_cache"):
+                 use_tensorrt: bool = True, tensorrt_cache_dir: str = "tensorrt_cache",
+                 max_batch_size: int = 4, batch_window_s: float = 0.05, max_new_tokens: int = 512):
         self.dam_script_path = dam_script_path
         self.temperature = temperature
         self.top_p = top_p
         self.use_tensorrt = use_tensorrt
         self.tensorrt_cache_dir = tensorrt_cache_dir
+        self.max_batch_size = max_batch_size
+        self.batch_window_s = batch_window_s
+        self.max_new_tokens = max_new_tokens
         
         # TensorRT 최적화기
         self.tensorrt_optimizer = None
         
+        # 동시 요청 배치 스케줄러 (TensorRT 모드에서만 사용)
+        self.batch_scheduler = None
+        
         # DAM 스크립트 존재 확인
         if not self.dam_script_path.exists():
             raise FileNotFoundError(f"DAM script not found at: {self.dam_script_path}")
@@ -51,12 +58,42 @@ class DAMAnalyzer:
                 force_rebuild=False  # 기존 엔진이 있으면 재사용
             )
             print(" TensorRT 최적화 완료 - 고속 추론 모드 활성화")
+            self._start_batch_scheduler()
             
         except Exception as e:
             print(f" TensorRT 초기화 실패, 기본 모드로 전환: {e}")
             self.use_tensorrt = False
             self.tensorrt_optimizer = None
     
+    def _start_batch_scheduler(self):
+        """배치 스케줄러 시작 (이미 실행 중이면 유지)"""
+        if self.batch_scheduler is not None:
+            return
+        from .dam_batch_scheduler import DAMBatchScheduler
+        
+        self.batch_scheduler = DAMBatchScheduler(
+            self._run_batch,
+            max_batch_size=self.max_batch_size,
+            batch_window_s=self.batch_window_s
+        )
+    
+    def _stop_batch_scheduler(self):
+        """배치 스케줄러 종료"""
+        if self.batch_scheduler is not None:
+            self.batch_scheduler.stop()
+            self.batch_scheduler = None
+    
+    def _run_batch(self, requests) -> List[Optional[str]]:
+        """스케줄러가 모은 요청을 한 번에 추론"""
+        if not self.tensorrt_optimizer:
+            return [None] * len(requests)
+        return self.tensorrt_optimizer.infer_batch(
+            [r.frames for r in requests],
+            [r.masks for r in requests],
+            [r.query for r in requests],
+            [r.max_new_tokens for r in requests]
+        )
+    
     def _extract_description(self, raw_output: str) -> str:
         """DAM 출력에서 설명 추출"""
         desc = ""
@@ -80,26 +117,13 @@ class DAMAnalyzer:
             return None
         
         try:
-            import cv2
             from PIL import Image
             import numpy as np
+            from sam2.utils.misc import sample_video_frames
             
-            # 비디오에서 8개 프레임 추출
-            cap = cv2.VideoCapture(str(video_path))
-            frames = []
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            # 균등하게 8개 프레임 선택
-            indices = np.linspace(0, frame_count-1, 8, dtype=int)
-            
-            for idx in indices:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-                ret, frame = cap.read()
-                if ret:
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    frames.append(Image.fromarray(frame_rgb))
-            
-            cap.release()
+            # 비디오에서 균등하게 8개 프레임 추출 (프레임별 seek 없이 한 번의 순차 디코딩)
+            frames_rgb, _, _ = sample_video_frames(video_path, num_frames=8)
+            frames = [Image.fromarray(frame_rgb) for frame_rgb in frames_rgb]
             
             if len(frames) != 8:
                 print(f" 프레임 추출 실패: {len(frames)}/8")
@@ -121,9 +145,12 @@ class DAMAnalyzer:
                 mask_array[y1:y2, x1:x2] = 255
                 masks.append(Image.fromarray(mask_array))
             
-            # TensorRT 추론
+            # TensorRT 추론 (동시 요청은 스케줄러에서 하나의 배치로 묶임)
             print(" TensorRT 고속 추론 실행...")
-            description = self.tensorrt_optimizer.infer(frames, masks)
+            if self.batch_scheduler is not None:
+                description = self.batch_scheduler.describe(frames, masks, self.prompt, self.max_new_tokens)
+            else:
+                description = self.tensorrt_optimizer.infer(frames, masks)
             
             if description:
                 return description
@@ -225,6 +252,9 @@ class DAMAnalyzer:
     def set_prompt(self, new_prompt: str):
         """프롬프트 변경"""
         self.prompt = new_prompt
+        # 프롬프트가 바뀌면 캐시된 프리픽스 KV도 무효화
+        if self.tensorrt_optimizer:
+            self.tensorrt_optimizer.clear_prefix_cache()
         print(f" 프롬프트 변경됨: {new_prompt[:50]}...")
     
     def set_parameters(self, temperature: float = None, top_p: float = None):
@@ -248,6 +278,7 @@ class DAMAnalyzer:
                     cache_dir=self.tensorrt_cache_dir,
                     force_rebuild=True
                 )
+                self._start_batch_scheduler()
                 print(" TensorRT 엔진 재빌드 완료")
             except Exception as e:
                 print(f" TensorRT 재빌드 실패: {e}")
@@ -255,6 +286,7 @@ class DAMAnalyzer:
     def disable_tensorrt(self):
         """TensorRT 최적화 비활성화"""
         self.use_tensorrt = False
+        self._stop_batch_scheduler()
         self.tensorrt_optimizer = None
         print(" TensorRT 최적화 비활성화 - 기본 모드 사용")
     
@@ -273,4 +305,8 @@ class DAMAnalyzer:
         if self.tensorrt_optimizer:
             info["tensorrt_info"] = self.tensorrt_optimizer.get_performance_info()
         
+        # 배치 스케줄러 통계 추가
+        if self.batch_scheduler:
+            info["batch_info"] = self.batch_scheduler.get_stats()
+        
         return info 
\ No newline at end of file
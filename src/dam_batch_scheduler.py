@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+DAM Batch Scheduler Module
+동시에 들어온 DAM 요청을 짧은 시간 창 동안 모아 하나의 배치로 추론
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from PIL import Image
+
+
+@dataclass
+class DAMRequest:
+    """대기 중인 DAM 요청 (8프레임 클립 + 마스크)"""
+    frames: List[Image.Image]
+    masks: List[Image.Image]
+    query: str
+    max_new_tokens: int = 512
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.time)
+
+
+class DAMBatchScheduler:
+    """DAM 요청 배치 스케줄러
+
+    첫 요청이 도착하면 `batch_window_s` 동안 (또는 `max_batch_size`개가 찰 때까지) 요청을 모은 뒤
+    `batch_fn(requests)`를 한 번 호출한다. `batch_fn`은 요청 순서대로 설명 문자열 리스트를 반환해야 한다.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[DAMRequest]], List[str]],
+                 max_batch_size: int = 4, batch_window_s: float = 0.05):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.batch_window_s = batch_window_s
+
+        self._queue: "queue.Queue[Optional[DAMRequest]]" = queue.Queue()
+        self._running = True
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+        # 통계 정보
+        self.stats = {
+            "batches": 0,
+            "requests": 0,
+            "max_batch_size_seen": 0,
+            "last_batch_time": 0.0,
+        }
+
+    def submit(self, frames: List[Image.Image], masks: List[Image.Image], query: str,
+               max_new_tokens: int = 512) -> Future:
+        """요청 등록 - 결과는 반환된 Future로 전달됨"""
+        if not self._running:
+            raise RuntimeError("DAMBatchScheduler is stopped")
+        request = DAMRequest(frames, masks, query, max_new_tokens)
+        self._queue.put(request)
+        return request.future
+
+    def describe(self, frames: List[Image.Image], masks: List[Image.Image], query: str,
+                 max_new_tokens: int = 512, timeout: Optional[float] = None) -> str:
+        """요청 등록 후 결과까지 대기 (동기 호출용)"""
+        return self.submit(frames, masks, query, max_new_tokens).result(timeout=timeout)
+
+    def _collect_batch(self, first: DAMRequest) -> List[DAMRequest]:
+        """첫 요청 이후 시간 창 안에 들어온 요청을 모음"""
+        batch = [first]
+        deadline = time.time() + self.batch_window_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._running = False
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while self._running:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect_batch(first)
+
+            start_time = time.time()
+            try:
+                descriptions = self.batch_fn(batch)
+                if len(descriptions) != len(batch):
+                    raise RuntimeError(f"batch_fn returned {len(descriptions)} results for {len(batch)} requests")
+                for request, description in zip(batch, descriptions):
+                    request.future.set_result(description)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self.stats["max_batch_size_seen"] = max(self.stats["max_batch_size_seen"], len(batch))
+            self.stats["last_batch_time"] = time.time() - start_time
+            print(f" DAM 배치 처리 완료: {len(batch)}개 요청, {self.stats['last_batch_time']:.2f}초")
+
+        # 종료 시 남은 요청은 취소
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.future.cancel()
+
+    def get_stats(self) -> dict:
+        """배치 통계 반환"""
+        stats = self.stats.copy()
+        stats["avg_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def stop(self):
+        """스케줄러 종료"""
+        self._running = False
+        self._queue.put(None)
+        self._worker.join(timeout=5)
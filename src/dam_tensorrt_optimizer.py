@@ -103,7 +103,8 @@ class DAMTensorRTOptimizer:
             self.dam_model = DescribeAnythingModel(
                 model_path=self.model_path,
                 conv_mode="v1",
-                prompt_mode="full+focal_crop"
+                prompt_mode="full+focal_crop",
+                use_prefix_cache=True  # 고정 시스템/대화 프리픽스의 KV 캐시 재사용
             )
             
             # GPU로 이동
@@ -294,10 +295,48 @@ class DAMTensorRTOptimizer:
             self.logger.error(f"추론 실패: {e}")
             return None
     
+    def infer_batch(self, images_list: List[List[Image.Image]], masks_list: List[List[Image.Image]],
+                    queries: List[str], max_new_tokens: List[int]) -> List[Optional[str]]:
+        """여러 클립을 하나의 패딩 배치로 추론 (실패 시 요청마다 None)"""
+        if self.dam_model is None:
+            self.logger.error("모델이 로드되지 않았습니다")
+            return [None] * len(images_list)
+        
+        try:
+            start_time = time.time()
+            
+            if torch.cuda.is_available():
+                torch.cuda.reset_peak_memory_stats()
+            
+            descriptions = self.dam_model.get_description_batch(
+                images_list, masks_list, queries,
+                temperature=0.1,
+                top_p=0.15,
+                max_new_tokens=max_new_tokens
+            )
+            
+            inference_time = time.time() - start_time
+            self.performance_info["inference_time"] = inference_time
+            self.performance_info["batch_size"] = len(images_list)
+            
+            if torch.cuda.is_available():
+                self.performance_info["memory_usage"] = torch.cuda.max_memory_allocated()
+            
+            self.logger.info(f"배치 추론 완료: {len(images_list)}개, {inference_time:.3f}초")
+            return descriptions
+            
+        except Exception as e:
+            self.logger.error(f"배치 추론 실패: {e}")
+            return [None] * len(images_list)
+    
     def get_performance_info(self) -> Dict[str, Any]:
         """성능 정보 반환"""
         info = self.performance_info.copy()
         
+        # 프리픽스 KV 캐시 정보 (절약된 prefill 시간 포함)
+        if self.dam_model is not None:
+            info["prefix_cache"] = self.dam_model.get_prefix_cache_stats()
+        
         if torch.cuda.is_available():
             info.update({
                 "gpu_name": torch.cuda.get_device_name(0),
@@ -308,6 +347,11 @@ class DAMTensorRTOptimizer:
         
         return info
     
+    def clear_prefix_cache(self):
+        """프리픽스 KV 캐시 무효화 (프롬프트/대화 모드 변경 시)"""
+        if self.dam_model is not None:
+            self.dam_model.clear_prefix_cache()
+    
     def warmup(self, num_iterations: int = 3):
         """모델 워밍업"""
         if self.dam_model is None:
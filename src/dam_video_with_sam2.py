@@ -39,6 +39,7 @@ import glob
 import os
 import tempfile
 from sam2.build_sam import build_sam2_video_predictor
+from sam2.utils.misc import sample_video_frames
 
 def extract_frames_from_video(video_path):
     """Extract frames from a video file and save them to a temporary directory."""
@@ -63,36 +64,45 @@ def extract_frames_from_video(video_path):
     
     return frame_paths, temp_dir
 
-def apply_sam2(image_files, points=None, box=None, normalized_coords=False, use_sam2=False):
+def create_bbox_masks(box, height, width, num_masks, normalized_coords=False):
+    """Create the same rectangular mask for `num_masks` frames from a bbox"""
+    if normalized_coords:
+        x1, y1, x2, y2 = box
+        x1 = int(x1 * width)
+        y1 = int(y1 * height) 
+        x2 = int(x2 * width)
+        y2 = int(y2 * height)
+    else:
+        x1, y1, x2, y2 = map(int, box)
+    
+    # Create rectangular mask for all frames
+    masks = []
+    for _ in range(num_masks):
+        mask = np.zeros((height, width), dtype=bool)
+        mask[y1:y2, x1:x2] = True
+        masks.append(mask)
+    
+    print(f"Using bbox-based masks (default mode): [{x1},{y1},{x2},{y2}]")
+    return masks
+
+def apply_sam2(image_files, points=None, box=None, normalized_coords=False, use_sam2=False,
+               frame_indices=None, stride=1):
     """Apply SAM2 to video frames using points or box on first frame
     
     Args:
         use_sam2: If True, use SAM2 processing. If False (default), create rectangular masks from bbox
+        frame_indices: If given, only return the masks of these frames (in this order). SAM2 then
+            tracks sparsely up to the last requested frame instead of propagating through every frame
+        stride: Tracking stride between requested frames for sparse propagation, or "auto"
     """
     
+    num_masks = len(image_files) if frame_indices is None else len(frame_indices)
+
     if not use_sam2 and box is not None:
         # Default behavior: Skip SAM2 processing - create simple rectangular masks from bbox
         first_frame = cv2.imread(image_files[0])
         height, width = first_frame.shape[:2]
-        
-        if normalized_coords:
-            x1, y1, x2, y2 = box
-            x1 = int(x1 * width)
-            y1 = int(y1 * height) 
-            x2 = int(x2 * width)
-            y2 = int(y2 * height)
-        else:
-            x1, y1, x2, y2 = map(int, box)
-        
-        # Create rectangular mask for all frames
-        masks = []
-        for img_file in image_files:
-            mask = np.zeros((height, width), dtype=bool)
-            mask[y1:y2, x1:x2] = True
-            masks.append(mask)
-        
-        print(f"Using bbox-based masks (default mode): [{x1},{y1},{x2},{y2}]")
-        return masks
+        return create_bbox_masks(box, height, width, num_masks, normalized_coords)
     elif not use_sam2:
         raise ValueError("Default mode requires box coordinates")
 
@@ -118,7 +128,8 @@ def apply_sam2(image_files, points=None, box=None, normalized_coords=False, use_
 
     # Initialize inference state
     video_dir = os.path.dirname(image_files[0])
-    inference_state = predictor.init_state(video_path=video_dir)
+    # Sparse propagation only touches a fraction of the frames, so decode them on demand
+    inference_state = predictor.init_state(video_path=video_dir, streaming_frames=frame_indices is not None)
     predictor.reset_state(inference_state)
 
     # Add points or box on first frame
@@ -145,13 +156,21 @@ def apply_sam2(image_files, points=None, box=None, normalized_coords=False, use_
                 box=box
             )
 
-        # Propagate through video and collect masks
-        masks = []
-        for out_frame_idx, out_obj_ids, out_mask_logits in predictor.propagate_in_video(inference_state):
-            mask = (out_mask_logits[0] > 0.0).cpu().numpy()
-            masks.append(mask)
+        if frame_indices is None:
+            # Propagate through video and collect masks
+            masks = []
+            for out_frame_idx, out_obj_ids, out_mask_logits in predictor.propagate_in_video(inference_state):
+                mask = (out_mask_logits[0] > 0.0).cpu().numpy()
+                masks.append(mask)
+            return masks
 
-    return masks
+        # Sparse propagation: only the requested frames are output
+        masks_by_frame = {}
+        for out_frame_idx, out_obj_ids, out_mask_logits in predictor.propagate_in_video_sparse(
+                inference_state, target_frame_inds=frame_indices, stride=stride):
+            masks_by_frame[out_frame_idx] = (out_mask_logits[0] > 0.0).cpu().numpy()
+
+    return [masks_by_frame[int(i)] for i in frame_indices]
 
 def print_streaming(text):
     """Helper function to print streaming text with flush"""
@@ -219,6 +238,8 @@ if __name__ == '__main__':
                        help='Directory to save the output images with contours')
     parser.add_argument('--use_sam2', action='store_true', 
                        help='Use SAM2 segmentation processing (default: use bbox-based rectangular masks)')
+    parser.add_argument('--sam2_stride', type=str, default='auto',
+                       help='SAM2 tracking stride between the sampled frames: an integer, or "auto" (default)')
 
     args = parser.parse_args()
     
@@ -232,37 +253,48 @@ if __name__ == '__main__':
     if args.use_sam2:
         sam2_checkpoint = "checkpoints/sam2.1_hiera_large.pt"
         model_cfg = "configs/sam2.1/sam2.1_hiera_l.yaml"
-        predictor = build_sam2_video_predictor(model_cfg, sam2_checkpoint, device=device)
+        # Every DAM run is a new process: reuse the cached config and memory-mapped weights
+        predictor = build_sam2_video_predictor(model_cfg, sam2_checkpoint, device=device, artifact_cache=True)
         print("SAM2 model loaded")
     else:
         predictor = None
         print("Using bbox-based masks (default mode)")
 
-    # Get list of image files and sort them
-    if args.video_file:
-        image_files, temp_dir = extract_frames_from_video(args.video_file)
-    else:
-        image_files = sorted(glob.glob(os.path.join(args.video_dir, "*.jpg")))
-    
-    # Select 8 frames uniformly
-    indices = np.linspace(0, len(image_files)-1, 8, dtype=int)
-    
-    selected_files = [image_files[i] for i in indices]
-
     # Parse points or box for first frame
     points = ast.literal_eval(args.points) if args.points else None
     box = ast.literal_eval(args.box) if args.box else None
 
-    # Process video (default: bbox-based masks, optional: SAM2)
-    masks = apply_sam2(image_files, points=points, box=box, 
-                      normalized_coords=args.normalized_coords,
-                      use_sam2=args.use_sam2)
-    
-    # Select masks for the 8 frames we want
-    selected_masks = [masks[i] for i in indices]
+    temp_dir = None
+    if args.video_file and not args.use_sam2:
+        # bbox-based masks only need the 8 sampled frames: decode them in one sequential pass
+        # instead of writing every frame of the clip to JPEG first
+        if box is None:
+            raise ValueError("Default mode requires box coordinates")
+        frames_rgb, _, _ = sample_video_frames(args.video_file, num_frames=8)
+        height, width = frames_rgb[0].shape[:2]
+        selected_masks = create_bbox_masks(box, height, width, len(frames_rgb), args.normalized_coords)
+        processed_images = [Image.fromarray(frame) for frame in frames_rgb]
+    else:
+        # Get list of image files and sort them
+        if args.video_file:
+            image_files, temp_dir = extract_frames_from_video(args.video_file)
+        else:
+            image_files = sorted(glob.glob(os.path.join(args.video_dir, "*.jpg")))
+        
+        # Select 8 frames uniformly
+        indices = np.linspace(0, len(image_files)-1, 8, dtype=int)
+        
+        selected_files = [image_files[i] for i in indices]
+
+        # Process video (default: bbox-based masks, optional: SAM2), only for the 8 frames we want
+        selected_masks = apply_sam2(image_files, points=points, box=box,
+                                    normalized_coords=args.normalized_coords,
+                                    use_sam2=args.use_sam2,
+                                    frame_indices=indices,
+                                    stride=args.sam2_stride if args.sam2_stride == 'auto' else int(args.sam2_stride))
 
-    # Convert frames to PIL images
-    processed_images = [Image.open(f).convert('RGB') for f in selected_files]
+        # Convert frames to PIL images
+        processed_images = [Image.open(f).convert('RGB') for f in selected_files]
     processed_masks = [Image.fromarray((m.squeeze() * 255).astype(np.uint8)) for m in selected_masks]
 
     # Initialize DAM model and get description
@@ -297,11 +329,9 @@ if __name__ == '__main__':
         vis_box = [box] if box is not None else None
         
         # Save visualizations for selected frames
-        for idx, (img_path, mask) in enumerate(zip(selected_files, selected_masks)):
-            # Read image and convert to float
-            img = cv2.imread(img_path)
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img_np = img.astype(float) / 255.0
+        for idx, (img, mask) in enumerate(zip(processed_images, selected_masks)):
+            # Convert image to float
+            img_np = np.asarray(img).astype(float) / 255.0
             
             # Add contours and points/box
             img_with_contour_np = add_contour(img_np, mask, 
@@ -316,6 +346,6 @@ if __name__ == '__main__':
         print(f"Output images with contours saved in {args.output_image_dir}")
 
     # Clean up temporary directory if we extracted frames from video
-    if args.video_file:
+    if temp_dir is not None:
         import shutil
         shutil.rmtree(temp_dir)
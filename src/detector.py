@@ -4,7 +4,7 @@ import threading
 import requests
 import numpy as np
 import paho.mqtt.client as paho
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 from ultralytics import YOLO
 from sam2.build_sam import build_sam2_object_tracker
 from demo.config.settings import (
@@ -12,6 +12,7 @@ from demo.config.settings import (
     MASK_THRESHOLD, DEMO_API, BROKER_ADDR, BROKER_PORT
 )
 from demo.utils.alerts import AlertManager, AlertCodes
+from demo.core.pyramid import FramePyramid, as_pyramid
 import torch
 
 class HumanDetector:
@@ -50,7 +51,9 @@ class HumanTracker:
             config_file=SAM_CONFIG_PATH,
             ckpt_path=SAM_CHECKPOINT_PATH,
             device=DEVICE,
-            verbose=False
+            verbose=False,
+            # cached config and memory-mapped weights after the first start
+            artifact_cache=True
         )
         self._warm_up()
         self.last_center = None
@@ -61,27 +64,27 @@ class HumanTracker:
         _ = self.tracker.track_all_objects(img=dummy)
 
     def initialize(self, frame, persons):
+        self.tracker.reset_tracker()
         self.tracker.track_new_object(
-            img=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB),
-            box=np.array(persons)
+            img=frame,
+            box=np.array(persons),
+            bgr=True
         )
     
     def track(self, frame):
         if self.tracker is None:
             return None, False
             
-        out = self.tracker.track_all_objects(img=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        out = self.tracker.track_all_objects(img=frame, bgr=True)
         masks = out.get("pred_masks")
-        has_mask = False
-        
-        if masks is not None:
-            m_np = masks.cpu().numpy()
-            for i in range(m_np.shape[0]):
-                if (m_np[i,0] > MASK_THRESHOLD).sum() > 0:
-                    has_mask = True
-                    break
-                    
-        return m_np if has_mask else None, has_mask
+        if masks is None or masks.shape[0] == 0:
+            return None, False
+
+        # threshold on the device, only flags, low-res bboxes and bit-packed masks are copied back
+        summary = self.tracker.summarize_masks(masks, threshold=MASK_THRESHOLD, mask_format="bits")
+        has_mask = bool(summary["present"].any())
+
+        return summary if has_mask else None, has_mask
     
     def check_stationary(self, bbox_coords, current_time):
         if bbox_coords is None:
@@ -146,9 +149,13 @@ class DetectionProcessor(threading.Thread):
             
             if frame_to_process is not None:
                 from demo.utils.viz import draw_timestamp, process_masks, draw_detection_boxes
-                
-                disp = frame_to_process.copy()
-                h, w = frame_to_process.shape[:2]
+
+                # 소비자마다 미리 축소된 레벨 사용: YOLO 640, SAM2 1024², 화면은 preview
+                # 검출/추적 박스는 원본 좌표로 변환해서 PTZ, 정지 판정, DAM 에 전달
+                pyramid = as_pyramid(frame_to_process)
+                disp = pyramid.get('preview').copy()
+                h, w = disp.shape[:2]
+                full_w, full_h = pyramid.size
                 
                 cx, cy = w // 2, h // 2
                 cv2.line(disp, (cx, 0), (cx, h), (0, 255, 0), 1)
@@ -161,24 +168,28 @@ class DetectionProcessor(threading.Thread):
                 bbox_for_ptz = None
 
                 if self.detection_mode:
-                    persons = self.detector.detect(frame_to_process)
+                    persons = self.detector.detect(pyramid.get('yolo'))
                     if persons:
+                        persons = [self._convert_box(pyramid, box, 'yolo', None) for box in persons]
                         bbox_for_ptz = persons[0]
-                        self.tracker.initialize(frame_to_process, persons)
+                        self.tracker.initialize(pyramid.get('sam'),
+                                                [self._convert_box(pyramid, box, None, 'sam') for box in persons])
                         self.was_tracking = True
                         self.detection_mode = False
-                        draw_detection_boxes(disp, persons)
+                        draw_detection_boxes(disp, [self._convert_box(pyramid, box, None, 'preview') for box in persons])
                         self.alert_manager.send_alert(AlertCodes.PERSON_DETECTED, "PERSON_DETECTED")
 
                 elif self.tracker.tracker is not None:
-                    masks, has_mask = self.tracker.track(frame_to_process)
+                    masks, has_mask = self.tracker.track(pyramid.get('sam'))
                     if has_mask:
-                        bbox_for_ptz = process_masks(masks, disp, frame_to_process)
+                        bbox_preview = process_masks(masks, disp)
+                        if bbox_preview is not None:
+                            bbox_for_ptz = tuple(sum(self._convert_box(pyramid, bbox_preview, 'preview', None), []))
                         if self.tracker.check_stationary(bbox_for_ptz, now):
                             self.alert_manager.send_alert(AlertCodes.STATIONARY_BEHAVIOR, "STATIONARY BEHAVIOR DETECTED: analysis required")
                             threading.Thread(
                                 target=self.post_stationary_bbox, 
-                                args=(bbox_for_ptz, (w, h)), 
+                                args=(bbox_for_ptz, (full_w, full_h)), 
                                 daemon=True
                             ).start()
                 
@@ -188,6 +199,14 @@ class DetectionProcessor(threading.Thread):
 
             self.new_frame_event.clear()
 
+    @staticmethod
+    def _convert_box(pyramid: FramePyramid, box, src: Optional[str], dst: Optional[str]):
+        """박스를 src 레벨 좌표에서 dst 레벨 좌표로 변환 (None 은 원본), [[x1, y1], [x2, y2]] 정수 리스트로 반환"""
+        pts = pyramid.box_to_full(src, box) if src is not None else np.asarray(box, dtype=np.float64).reshape(-1, 2)
+        if dst is not None:
+            pts = pyramid.box_from_full(dst, pts)
+        return np.rint(pts).astype(int).tolist()
+
     def stop(self):
         """스레드를 안전하게 종료합니다."""
         self.running = False
@@ -215,15 +234,18 @@ class DetectionProcessor(threading.Thread):
         except Exception as e:
             print(f"[DAM] POST failed: {e}")
     
-    def process_frame(self, frame: cv2.Mat) -> Tuple[cv2.Mat, Optional[Tuple]]:
+    def process_frame(self, frame: Union[FramePyramid, cv2.Mat]) -> Tuple[cv2.Mat, Optional[Tuple]]:
         """
         메인 스레드에서는 이 메소드를 호출합니다.
-        프레임을 버퍼에 넣고 즉시 최신 처리 결과를 반환합니다.
+        프레임 (FramePyramid 또는 원본 프레임) 을 버퍼에 넣고 즉시 최신 처리 결과를 반환합니다.
         """
         with self.lock:
             self.input_frame = frame
             # 처리된 최신 프레임과 bbox를 즉시 반환 (기다리지 않음)
-            output_frame = self.output_frame_for_stream if self.output_frame_for_stream is not None else frame
+            if self.output_frame_for_stream is not None:
+                output_frame = self.output_frame_for_stream
+            else:
+                output_frame = frame.get('preview') if isinstance(frame, FramePyramid) else frame
             bbox = self.output_bbox_for_ptz
         
         self.new_frame_event.set() # 처리 스레드에게 새 프레임이 왔다고 알림
@@ -2,25 +2,97 @@
 """
 Log Manager Module
 로그 저장 및 관리 기능을 담당
+
+로그 파일 (TIMESTAMP\\tDESCRIPTION 텍스트) 옆에 오프셋 인덱스 파일 (<로그>.idx) 을 유지
+- 인덱스 레코드: (unix timestamp, 로그 파일 내 바이트 오프셋) 고정 16 바이트
+- 최근 N 개 / 시간 구간 조회는 인덱스에서 위치를 찾아 해당 구간만 읽음 (파일 크기와 무관)
+- 추가는 메모리 버퍼에 모았다가 일정 개수/시간마다 한 번에 기록, fsync 는 주기적으로
+- 크기 또는 날짜 기준으로 로그를 회전 (action_log.<YYYYmmdd-HHMMSS>.txt + .idx)
 """
 
+import atexit
+import bisect
+import os
+import re
+import struct
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# (unix timestamp, byte offset)
+INDEX_RECORD = struct.Struct('<qQ')
+
+
+class _IndexView:
+    """인덱스 파일을 timestamp 기준으로 이분 탐색하기 위한 시퀀스 (레코드를 필요할 때만 읽음)"""
+
+    def __init__(self, f, count: int):
+        self.f = f
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i: int) -> int:
+        return _read_index_records(self.f, i, 1)[0][0]
+
+
+def _read_index_records(f, start: int, count: int) -> List[Tuple[int, int]]:
+    f.seek(start * INDEX_RECORD.size)
+    data = f.read(count * INDEX_RECORD.size)
+    return [INDEX_RECORD.unpack_from(data, i * INDEX_RECORD.size) for i in range(len(data) // INDEX_RECORD.size)]
+
 
 class LogManager:
     """로그 관리 클래스"""
-    
-    def __init__(self, log_file_path: Path):
-        self.log_file_path = log_file_path
-        
+
+    def __init__(self,
+                 log_file_path: Path,
+                 flush_every: int = 32,
+                 flush_interval: float = 1.0,
+                 fsync_interval: float = 5.0,
+                 max_bytes: Optional[int] = 50 * 1024 * 1024,
+                 rotate_daily: bool = False):
+        self.log_file_path = Path(log_file_path)
+        self.index_path = self._index_path(self.log_file_path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+
+        self._lock = threading.RLock()
+        self._buffer: List[Tuple[int, bytes]] = []  # 아직 기록하지 않은 (timestamp, 라인)
+        self._log_f = None
+        self._index_f = None
+        self._last_flush = time.time()
+        self._last_fsync = time.time()
+        self._dirty = False  # fsync 이후 기록이 있었는지
+        self._opened_day = None
+
         # 로그 파일 디렉토리 생성
         self.log_file_path.parent.mkdir(exist_ok=True)
-        
+
         # 로그 파일이 없으면 헤더 생성
         if not self.log_file_path.exists():
             self._create_log_file()
-    
+
+        self._open()
+
+        # 주기적으로 버퍼 기록 + fsync
+        self._running = True
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def _index_path(log_path: Path) -> Path:
+        return log_path.with_name(log_path.name + '.idx')
+
     def _create_log_file(self):
         """로그 파일 생성 및 헤더 추가"""
         try:
@@ -29,50 +101,273 @@ class LogManager:
                 f.write("# Format: TIMESTAMP\\tDESCRIPTION\n")
                 f.write("# Created: " + datetime.now().isoformat() + "\n")
                 f.write("\n")
+            self.index_path.write_bytes(b'')
             print(f" 로그 파일 생성: {self.log_file_path}")
         except Exception as e:
             print(f" 로그 파일 생성 실패: {e}")
-    
+
+    # ─────────────────────── 파일 / 인덱스 ───────────────────────
+    def _open(self):
+        self._reconcile_index()
+        self._log_f = self.log_file_path.open("ab")
+        self._index_f = self.index_path.open("ab")
+        self._opened_day = datetime.now().date()
+
+    def _close_files(self):
+        for f in (self._log_f, self._index_f):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+        self._log_f = self._index_f = None
+
+    def _reconcile_index(self):
+        """
+        인덱스가 없거나 로그보다 뒤처진 경우 (이전 버전의 로그, 기록 도중 종료) 빠진 항목을 스캔해서 인덱스에 추가
+        마지막으로 인덱스된 항목 이후만 읽으므로 정상 종료 후에는 비용이 없음
+        """
+        if not self.index_path.exists():
+            self.index_path.write_bytes(b'')
+
+        # 끝이 잘린 레코드는 버림
+        index_size = self.index_path.stat().st_size
+        if index_size % INDEX_RECORD.size:
+            with self.index_path.open("r+b") as f:
+                f.truncate(index_size - index_size % INDEX_RECORD.size)
+
+        with self.index_path.open("rb") as f:
+            count = os.fstat(f.fileno()).st_size // INDEX_RECORD.size
+            last = _read_index_records(f, count - 1, 1)[0] if count else None
+
+        if last is not None and last[1] >= self.log_file_path.stat().st_size:
+            # 로그 파일이 바뀐 경우 (외부에서 잘림/교체) 인덱스를 처음부터 다시 만듦
+            self.index_path.write_bytes(b'')
+            last = None
+
+        records = []
+        with self.log_file_path.open("rb") as f:
+            if last is not None:
+                f.seek(last[1])
+                f.readline()  # 이미 인덱스된 마지막 항목
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if not line.endswith(b'\n'):
+                    # 기록 도중 잘린 마지막 줄
+                    break
+                timestamp = self._parse_timestamp(line)
+                if timestamp is not None:
+                    records.append(INDEX_RECORD.pack(timestamp, offset))
+
+        if records:
+            with self.index_path.open("ab") as f:
+                f.write(b''.join(records))
+            print(f" 로그 인덱스 갱신: {len(records)}개 항목")
+
+    @staticmethod
+    def _parse_timestamp(line: bytes) -> Optional[int]:
+        if not line.strip() or line.startswith(b'#'):
+            return None
+        try:
+            return int(datetime.strptime(line[:19].decode('utf8'), TIMESTAMP_FORMAT).timestamp())
+        except ValueError:
+            return None
+
+    def _segments(self) -> List[Tuple[Path, Path]]:
+        """(로그, 인덱스) 목록, 오래된 회전 파일부터 현재 파일 순서"""
+        stem, suffix = self.log_file_path.stem, self.log_file_path.suffix
+        # <stem>.<YYYYmmdd-HHMMSS>[-n]<suffix>, 같은 초의 회전은 n 순서 (문자열 정렬은 '-' 가 '.' 보다 앞서므로 파싱해서 정렬)
+        pattern = re.compile(re.escape(stem) + r'\.(\d{8}-\d{6})(?:-(\d+))?' + re.escape(suffix))
+        rotated = []
+        for p in self.log_file_path.parent.glob(f"{stem}.*{suffix}"):
+            match = pattern.fullmatch(p.name)
+            if match:
+                rotated.append(((match.group(1), int(match.group(2) or 0)), p))
+        rotated.sort()
+        return [(p, self._index_path(p)) for _, p in rotated] + [(self.log_file_path, self.index_path)]
+
+    def _rotate_if_needed(self):
+        # self._lock 을 잡고 버퍼를 기록한 뒤에 호출
+        now = datetime.now()
+        too_big = self.max_bytes is not None and self._log_f.tell() >= self.max_bytes
+        new_day = self.rotate_daily and now.date() != self._opened_day
+        if not (too_big or new_day):
+            return
+
+        self._close_files()
+        stamp = now.strftime('%Y%m%d-%H%M%S')
+        rotated = self.log_file_path.with_name(f"{self.log_file_path.stem}.{stamp}{self.log_file_path.suffix}")
+        n = 1
+        while rotated.exists():  # 같은 초에 두 번 회전한 경우
+            rotated = self.log_file_path.with_name(f"{self.log_file_path.stem}.{stamp}-{n}{self.log_file_path.suffix}")
+            n += 1
+        os.replace(self.log_file_path, rotated)
+        os.replace(self.index_path, self._index_path(rotated))
+        print(f" 로그 파일 회전: {rotated}")
+
+        self._create_log_file()
+        self._open()
+
+    # ─────────────────────── 기록 ───────────────────────
     def append_log(self, description: str) -> bool:
-        """로그 항목 추가"""
+        """로그 항목 추가 (버퍼링, flush_every 개 또는 flush_interval 초마다 파일에 기록)"""
         try:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # 파일에 추가
-            with self.log_file_path.open("a", encoding="utf8") as f:
-                f.write(f"{timestamp}\t{description}\n")
-            
+            now = datetime.now()
+            timestamp = now.strftime(TIMESTAMP_FORMAT)
+            # 한 항목은 한 줄
+            description = ' '.join(str(description).splitlines())
+            line = f"{timestamp}\t{description}\n".encode('utf8')
+
+            with self._lock:
+                self._buffer.append((int(now.replace(microsecond=0).timestamp()), line))
+                if len(self._buffer) >= self.flush_every:
+                    self._flush_locked()
+
             return True
-            
+
         except Exception as e:
             print(f" 로그 저장 실패: {e}")
             return False
-    
+
+    def _flush_locked(self, fsync: bool = False):
+        if self._buffer:
+            offset = self._log_f.tell()
+            records = []
+            for timestamp, line in self._buffer:
+                records.append(INDEX_RECORD.pack(timestamp, offset))
+                offset += len(line)
+
+            # 로그를 먼저 기록해야 인덱스가 항상 기록된 항목만 가리킴
+            self._log_f.write(b''.join(line for _, line in self._buffer))
+            self._log_f.flush()
+            self._index_f.write(b''.join(records))
+            self._index_f.flush()
+            self._buffer = []
+            self._dirty = True
+            self._rotate_if_needed()
+
+        self._last_flush = time.time()
+        if fsync and self._dirty:
+            os.fsync(self._log_f.fileno())
+            os.fsync(self._index_f.fileno())
+            self._dirty = False
+            self._last_fsync = self._last_flush
+
+    def flush(self, fsync: bool = False):
+        """버퍼의 항목을 파일에 기록 (fsync=True 면 디스크까지)"""
+        with self._lock:
+            if self._log_f is not None:
+                self._flush_locked(fsync=fsync)
+
+    def _flush_loop(self):
+        while self._running:
+            time.sleep(min(self.flush_interval, self.fsync_interval))
+            try:
+                with self._lock:
+                    if self._log_f is None:
+                        continue
+                    now = time.time()
+                    if self._buffer and now - self._last_flush >= self.flush_interval:
+                        self._flush_locked()
+                    if now - self._last_fsync >= self.fsync_interval:
+                        self._flush_locked(fsync=True)
+                    elif self.rotate_daily:
+                        self._rotate_if_needed()
+            except Exception as e:
+                print(f" 로그 기록 실패: {e}")
+
+    def close(self):
+        """버퍼를 기록하고 파일을 닫음"""
+        self._running = False
+        with self._lock:
+            if self._log_f is not None:
+                self._flush_locked(fsync=True)
+                self._close_files()
+
+    # ─────────────────────── 조회 ───────────────────────
+    @staticmethod
+    def _read_entries(log_path: Path, start_offset: int, end_offset: Optional[int] = None) -> List[str]:
+        with log_path.open("rb") as f:
+            f.seek(start_offset)
+            data = f.read() if end_offset is None else f.read(end_offset - start_offset)
+        return [line.strip() for line in data.decode('utf8', errors='replace').splitlines()
+                if line.strip() and not line.startswith('#')]
+
     def read_recent_logs(self, count: int = 10) -> List[str]:
-        """최근 로그 읽기"""
+        """최근 로그 읽기 (인덱스에서 count 번째 전 항목의 위치를 찾아 그 뒤만 읽음)"""
         try:
-            if not self.log_file_path.exists():
+            if count <= 0:
                 return []
-            
-            with self.log_file_path.open("r", encoding="utf8") as f:
-                lines = f.readlines()
-            
-            # 주석이 아닌 라인만 필터링
-            log_lines = [line.strip() for line in lines if line.strip() and not line.startswith('#')]
-            
+            self.flush()
+
+            logs: List[str] = []
+            with self._lock:
+                for log_path, index_path in reversed(self._segments()):
+                    if not (log_path.exists() and index_path.exists()):
+                        continue
+                    with index_path.open("rb") as f:
+                        total = os.fstat(f.fileno()).st_size // INDEX_RECORD.size
+                        if total == 0:
+                            continue
+                        need = count - len(logs)
+                        start = max(0, total - need)
+                        offset = _read_index_records(f, start, 1)[0][1]
+                    logs = self._read_entries(log_path, offset)[-need:] + logs
+                    if len(logs) >= count:
+                        break
+
             # 최근 count개 반환
-            return log_lines[-count:] if log_lines else []
-            
+            return logs[-count:]
+
+        except Exception as e:
+            print(f" 로그 읽기 실패: {e}")
+            return []
+
+    def read_logs_between(self, start: datetime, end: datetime) -> List[str]:
+        """start <= 시각 < end 인 로그 읽기 (인덱스 이분 탐색)"""
+        try:
+            self.flush()
+            start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+
+            logs: List[str] = []
+            with self._lock:
+                for log_path, index_path in self._segments():
+                    if not (log_path.exists() and index_path.exists()):
+                        continue
+                    with index_path.open("rb") as f:
+                        total = os.fstat(f.fileno()).st_size // INDEX_RECORD.size
+                        if total == 0:
+                            continue
+                        view = _IndexView(f, total)
+                        lo = bisect.bisect_left(view, start_ts)
+                        hi = bisect.bisect_left(view, end_ts)
+                        if lo >= hi:
+                            continue
+                        start_offset = _read_index_records(f, lo, 1)[0][1]
+                        end_offset = _read_index_records(f, hi, 1)[0][1] if hi < total else None
+                    logs.extend(self._read_entries(log_path, start_offset, end_offset))
+
+            return logs
+
         except Exception as e:
             print(f" 로그 읽기 실패: {e}")
             return []
-    
+
     def clear_logs(self) -> bool:
-        """로그 파일 초기화"""
+        """로그 파일 초기화 (회전된 로그와 인덱스도 삭제)"""
         try:
-            self._create_log_file()
+            with self._lock:
+                self._buffer = []
+                self._close_files()
+                for log_path, index_path in self._segments()[:-1]:
+                    log_path.unlink(missing_ok=True)
+                    index_path.unlink(missing_ok=True)
+                self._create_log_file()
+                self._open()
             print(" 로그 파일 초기화 완료")
             return True
         except Exception as e:
             print(f" 로그 파일 초기화 실패: {e}")
-            return False 
\ No newline at end of file
+            return False
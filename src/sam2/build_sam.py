@@ -75,6 +75,7 @@ def build_sam2(
     mode="eval",
     hydra_overrides_extra=[],
     apply_postprocessing=True,
+    artifact_cache=None,
     **kwargs,
 ):
 
@@ -87,10 +88,7 @@ def build_sam2(
             "++model.sam_mask_decoder_extra_args.dynamic_multimask_stability_thresh=0.98",
         ]
     # Read config and init model
-    cfg = compose(config_name=config_file, overrides=hydra_overrides_extra)
-    OmegaConf.resolve(cfg)
-    model = instantiate(cfg.model, _recursive_=True)
-    _load_checkpoint(model, ckpt_path)
+    model = _build_model(config_file, hydra_overrides_extra, ckpt_path, artifact_cache)
     model = model.to(device)
     if mode == "eval":
         model.eval()
@@ -106,6 +104,10 @@ def build_sam2_object_tracker(
     mode="eval",
     hydra_overrides_extra=[],
     apply_postprocessing=True,
+    cpu_int8=False,
+    cpu_channels_last=True,
+    cpu_num_threads=None,
+    artifact_cache=None,
 ):
     hydra_overrides = [
         "++model._target_=sam2.sam2_object_tracker.SAM2ObjectTracker",
@@ -125,17 +127,37 @@ def build_sam2_object_tracker(
     hydra_overrides.extend(hydra_overrides_extra)
 
     # Read config and init model
-    cfg = compose(config_name=config_file, overrides=hydra_overrides)
-    OmegaConf.resolve(cfg)
-    model = instantiate(cfg.model, _recursive_=True)
-    _load_checkpoint(model, ckpt_path)
+    model = _build_model(config_file, hydra_overrides, ckpt_path, artifact_cache)
     model = model.to(device)
     if mode == "eval":
         model.eval()
 
+    # CPU deployment mode: dynamic INT8 Linear layers, channels-last convolutions, thread options
+    if cpu_int8 and torch.device(device).type == "cpu":
+        from sam2.utils.cpu_optimization import optimize_for_cpu
+
+        model = optimize_for_cpu(model,
+                                 quantize=True,
+                                 channels_last=cpu_channels_last,
+                                 num_threads=cpu_num_threads,
+                                 )
+
     return model
 
 
+def build_sam2_multi_stream_tracker(
+    stream_ids,
+    num_objects,
+    config_file,
+    verbose=False,
+    **kwargs,
+):
+    from sam2.sam2_multi_stream_tracker import SAM2MultiStreamTracker
+
+    tracker = build_sam2_object_tracker(num_objects, config_file, verbose=verbose, **kwargs)
+    return SAM2MultiStreamTracker(tracker, stream_ids=stream_ids, verbose=verbose)
+
+
 def build_sam2_video_predictor(
     config_file,
     ckpt_path=None,
@@ -143,6 +165,7 @@ def build_sam2_video_predictor(
     mode="eval",
     hydra_overrides_extra=[],
     apply_postprocessing=True,
+    artifact_cache=None,
     **kwargs,
 ):
     hydra_overrides = [
@@ -163,10 +186,7 @@ def build_sam2_video_predictor(
     hydra_overrides.extend(hydra_overrides_extra)
 
     # Read config and init model
-    cfg = compose(config_name=config_file, overrides=hydra_overrides)
-    OmegaConf.resolve(cfg)
-    model = instantiate(cfg.model, _recursive_=True)
-    _load_checkpoint(model, ckpt_path)
+    model = _build_model(config_file, hydra_overrides, ckpt_path, artifact_cache)
     model = model.to(device)
     if mode == "eval":
         model.eval()
@@ -193,14 +213,66 @@ def build_sam2_video_predictor_hf(model_id, **kwargs):
     )
 
 
+def _build_model(config_file, hydra_overrides, ckpt_path, artifact_cache=None):
+    """
+    Instantiate the model from the config and load the checkpoint.
+
+    If `artifact_cache` is enabled (a directory, True for the default directory, or
+    None to use the SAM2_ARTIFACT_CACHE environment variable), the resolved config and
+    loaded weights are cached on first use. Later builds skip the Hydra composition and
+    the random weight initialization and memory-map the cached weights.
+    """
+    from sam2.utils.model_cache import (
+        artifact_key,
+        load_model_artifact,
+        resolve_artifact_cache_dir,
+        save_model_artifact,
+        skip_weight_init,
+    )
+
+    cache_dir = None
+    if ckpt_path is not None:
+        cache_dir = resolve_artifact_cache_dir(artifact_cache)
+    if cache_dir is not None:
+        key = artifact_key(config_file, hydra_overrides, ckpt_path)
+        artifact = load_model_artifact(cache_dir, key)
+        if artifact is not None:
+            cfg, sd = artifact
+            with skip_weight_init():
+                model = instantiate(cfg.model, _recursive_=True)
+            _load_state_dict(model, sd, assign=True)
+            logging.info(f"Loaded model artifact {key} from {cache_dir}")
+            return model
+
+    cfg = compose(config_name=config_file, overrides=hydra_overrides)
+    OmegaConf.resolve(cfg)
+    model = instantiate(cfg.model, _recursive_=True)
+    _load_checkpoint(model, ckpt_path)
+    if cache_dir is not None:
+        save_model_artifact(cache_dir, key, cfg, model)
+    return model
+
+
+def _load_state_dict(model, sd, assign=False):
+    if assign:
+        try:
+            # adopt the (memory-mapped) tensors instead of copying them into the parameters
+            missing_keys, unexpected_keys = model.load_state_dict(sd, assign=True)
+        except TypeError:
+            # torch < 2.1
+            missing_keys, unexpected_keys = model.load_state_dict(sd)
+    else:
+        missing_keys, unexpected_keys = model.load_state_dict(sd)
+    if missing_keys:
+        logging.error(missing_keys)
+        raise RuntimeError()
+    if unexpected_keys:
+        logging.error(unexpected_keys)
+        raise RuntimeError()
+
+
 def _load_checkpoint(model, ckpt_path):
     if ckpt_path is not None:
         sd = torch.load(ckpt_path, map_location="cpu", weights_only=True)["model"]
-        missing_keys, unexpected_keys = model.load_state_dict(sd)
-        if missing_keys:
-            logging.error(missing_keys)
-            raise RuntimeError()
-        if unexpected_keys:
-            logging.error(unexpected_keys)
-            raise RuntimeError()
+        _load_state_dict(model, sd)
         logging.info("Loaded checkpoint sucessfully")
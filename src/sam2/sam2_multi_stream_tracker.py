@@ -0,0 +1,142 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterable, Optional, Union
+
+import numpy as np
+import torch
+
+from sam2.sam2_object_tracker import SAM2ObjectTracker
+
+
+class SAM2MultiStreamTracker:
+    """
+    Tracks objects in several video streams (cameras) with one shared SAM2ObjectTracker model.
+
+    Every stream keeps its own object slots, memory bank, Kalman filter state and feature cache.
+    Per tick, the current frames of all streams are stacked into a single image encoder batch and
+    the backbone output is split back per stream for memory attention, the SAM heads and the memory
+    encoder, which still run per stream.
+
+    """
+
+    def __init__(self, tracker: SAM2ObjectTracker, stream_ids: Iterable[Hashable] = (), verbose: bool = False):
+        self.tracker = tracker
+        self.verbose = verbose
+        self.states = {}
+
+        for stream_id in stream_ids:
+            self.add_stream(stream_id)
+
+        self.stats = {'ticks': 0, 'last_backbone_batch': 0, 'last_backbone_time': 0.0, 'last_tick_time': 0.0}
+
+    def add_stream(self, stream_id: Hashable):
+        if stream_id in self.states:
+            raise KeyError(f"Stream {stream_id} already exists")
+        self.states[stream_id] = self.tracker.new_stream_state()
+
+    def remove_stream(self, stream_id: Hashable):
+        del self.states[stream_id]
+
+    @contextmanager
+    def use_stream(self, stream_id: Hashable):
+        """Loads the state of a stream into the shared tracker and saves it back afterwards."""
+        previous = self.tracker.get_stream_state()
+        self.tracker.set_stream_state(self.states[stream_id])
+        try:
+            yield self.tracker
+        finally:
+            self.states[stream_id] = self.tracker.get_stream_state()
+            self.tracker.set_stream_state(previous)
+
+    def num_objects(self, stream_id: Hashable) -> int:
+        return self.states[stream_id]['curr_obj_idx']
+
+    @torch.inference_mode()
+    def track_new_object(self,
+                         stream_id: Hashable,
+                         img: Union[np.ndarray, torch.Tensor],
+                         points: Optional[np.ndarray] = None,
+                         box: Optional[np.ndarray] = None,
+                         mask: Optional[np.ndarray] = None,
+                         bgr: bool = False
+                         ) -> Dict:
+        """Starts tracking new objects in one stream, see `SAM2ObjectTracker.track_new_object`."""
+        with self.use_stream(stream_id) as tracker:
+            return tracker.track_new_object(img=img, points=points, box=box, mask=mask, bgr=bgr)
+
+    @torch.inference_mode()
+    def reset_stream(self, stream_id: Hashable):
+        with self.use_stream(stream_id) as tracker:
+            tracker.reset_tracker()
+
+    @torch.inference_mode()
+    def track_all_streams(self,
+                          frames: Dict[Hashable, Union[np.ndarray, torch.Tensor]],
+                          bgr: bool = False
+                          ) -> Dict[Hashable, Dict]:
+        """
+        Tracks all objects of every given stream on its current frame.
+
+        Parameters
+        ----------
+        frames : Dict[Hashable, Union[np.ndarray, torch.Tensor]]
+            The current frame of each stream, either a NumPy array (H, W, C) or a preprocessed
+            tensor (1, C, H, W). Streams without a frame this tick are skipped.
+
+        bgr : bool, optional
+            Whether the NumPy frames are in BGR channel order.
+
+        Returns
+        -------
+        predictions : Dict[Hashable, Dict]
+            The `track_all_objects` prediction of each stream.
+
+        """
+
+        start_time = time.time()
+        tracker = self.tracker
+
+        images = {}
+        for stream_id, img in frames.items():
+            if isinstance(img, np.ndarray):
+                img = tracker.preprocess_image(img=img, bgr=bgr)
+            images[stream_id] = img
+
+        # one image encoder pass for every stream that has objects to track
+        active = [stream_id for stream_id in images if self.states[stream_id]['curr_obj_idx'] > 0]
+        backbone_outs = {}
+
+        if active:
+            backbone_start = time.time()
+            batch = torch.cat([images[stream_id] for stream_id in active], dim=0)
+            backbone_out = tracker.forward_image(batch)
+
+            for i, stream_id in enumerate(active):
+                backbone_outs[stream_id] = {
+                    "backbone_fpn": [feat[i:i + 1] for feat in backbone_out["backbone_fpn"]],
+                    "vision_pos_enc": [pos[i:i + 1] for pos in backbone_out["vision_pos_enc"]],
+                }
+
+            self.stats['last_backbone_time'] = time.time() - backbone_start
+
+        predictions = {}
+        for stream_id, img in images.items():
+            if stream_id not in backbone_outs:
+                predictions[stream_id] = tracker.get_empty_prediction()
+                continue
+
+            with self.use_stream(stream_id) as stream_tracker:
+                predictions[stream_id] = stream_tracker.track_all_objects(img=img,
+                                                                          backbone_out=backbone_outs[stream_id]
+                                                                          )
+
+        self.stats['ticks'] += 1
+        self.stats['last_backbone_batch'] = len(active)
+        self.stats['last_tick_time'] = time.time() - start_time
+
+        if self.verbose:
+            print(f"SAM2 Multi-stream: {len(active)}/{len(images)} streams in one backbone batch, "
+                  f"{self.stats['last_backbone_time'] * 1000:.1f}ms backbone, "
+                  f"{self.stats['last_tick_time'] * 1000:.1f}ms total")
+
+        return predictions
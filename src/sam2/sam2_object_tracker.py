@@ -1,5 +1,4 @@
 import time
-from collections import deque
 from typing import Tuple, List, Optional, Dict, Any
 from typing import Union
 
@@ -9,7 +8,10 @@ import torch
 import torch.nn.functional as F
 from sam2.modeling.sam2_base import SAM2Base, NO_OBJ_SCORE
 from sam2.modeling.sam2_utils import get_1d_sine_pe
+from sam2.utils.amg import batched_mask_to_box
 from sam2.utils.kalman_filter import KalmanFilter
+from sam2.utils.memory_bank import MemoryBank
+from sam2.utils.profiler import StageProfiler, format_timings
 
 
 class SAM2ObjectTracker(SAM2Base):
@@ -24,17 +26,32 @@ class SAM2ObjectTracker(SAM2Base):
                  memory_bank_iou_threshold: float = 0.5,
                  memory_bank_obj_score_threshold: float = 0.0,
                  memory_bank_kf_score_threshold: float = 0.0,
+                 feature_reuse_threshold: float = 0.0,
+                 feature_refresh_interval: int = 10,
+                 adaptive_input_sizes: Tuple[int, ...] = (),
+                 adaptive_min_object_size: int = 128,
+                 roi_input_sizes: Tuple[int, ...] = (),
+                 roi_margin: float = 0.25,
+                 roi_min_obj_score_logits: float = 0.0,
+                 roi_min_ious: float = 0.5,
+                 roi_edge_margin: int = 32,
+                 roi_refresh_interval: int = 30,
                  **kwargs
                  ):
 
         super().__init__(**kwargs)
 
+        # num_objects is the slot capacity; only the occupied slots are batched per frame.
+        # obj_ids maps batch rows to object ids (row i tracks object obj_ids[i]) and
+        # curr_obj_idx is the number of occupied slots.
         self.num_objects = num_objects
         self.curr_obj_idx = 0
+        self.obj_ids = []
+        self.next_obj_id = 0
 
         self.model_constants = {}
 
-        self.past_frames = {'short_term': deque(maxlen=7), 'long_term': deque(maxlen=7)}
+        self.memory_bank = MemoryBank(short_term_size=7, long_term_size=7, max_objects=num_objects)
         self.verbose = verbose
         self.use_mask_input_as_output_without_sam = False
 
@@ -53,159 +70,185 @@ class SAM2ObjectTracker(SAM2Base):
         self.memory_bank_obj_score_threshold = memory_bank_obj_score_threshold
         self.memory_bank_kf_score_threshold = memory_bank_kf_score_threshold
 
+        # Backbone feature reuse for static scenes (disabled when the threshold is 0).
+        # The previous backbone output is reused while the frame change score stays below
+        # feature_reuse_threshold, for at most feature_refresh_interval consecutive frames.
+        self.feature_reuse_threshold = feature_reuse_threshold
+        self.feature_refresh_interval = feature_refresh_interval
+        self.feature_cache = {}
+        self.feature_cache_stats = {'computed': 0, 'reused': 0, 'last_change_score': None}
+
+        # set by sam2.utils.cpu_optimization.optimize_for_cpu
+        self.channels_last = False
+
+        # Adaptive input resolution (disabled when no sizes are given). While every object is tracked
+        # stably, track_all_objects uses the smallest of adaptive_input_sizes at which the smallest
+        # object (Kalman filter box) still spans adaptive_min_object_size input pixels.
+        self.adaptive_input_sizes = ()
+        self.set_adaptive_input_sizes(adaptive_input_sizes)
+        self.adaptive_min_object_size = adaptive_min_object_size
+        self.input_size_stats = {}
+
+        # Region-of-interest tracking (disabled when no sizes are given). While every object is tracked
+        # stably and confidently, track_all_objects encodes a square crop of one of roi_input_sizes
+        # around the Kalman predicted boxes (plus roi_margin per side) at full-frame pixel density.
+        # It falls back to a full frame after a frame with an object score logit below
+        # roi_min_obj_score_logits or an IoU below roi_min_ious, with an object within roi_edge_margin
+        # pixels of the crop edge, or after roi_refresh_interval consecutive crops.
+        self.roi_input_sizes = ()
+        self.set_roi_input_sizes(roi_input_sizes)
+        self.roi_margin = roi_margin
+        self.roi_min_obj_score_logits = roi_min_obj_score_logits
+        self.roi_min_ious = roi_min_ious
+        self.roi_edge_margin = roi_edge_margin
+        self.roi_refresh_interval = roi_refresh_interval
+        self.roi_state = {'fallback': True, 'consecutive': 0, 'last_box': None}
+        self.roi_stats = {}
+
+        # Per-stage timing spans, see enable_profiling. Enabled on the first frame when verbose.
+        self.profiler = StageProfiler(enabled=False)
+
     def update_kalman_filter(self,
-                             obj: int,
+                             obj_ids: List[int],
                              ious: torch.Tensor,
                              low_res_multimasks: torch.Tensor,
                              high_res_multimasks: torch.Tensor,
-                             sam_output_tokens: torch.Tensor
+                             sam_output_tokens: torch.Tensor,
+                             input_box: Optional[Tuple[int, int, int, int]] = None
                              ) -> Tuple:
         """
-        Updates the Kalman filter for object tracking based on the current object, IoU scores,
-        low and high resolution multi-masks, and SAM output tokens.
+        Updates the Kalman filters of all objects based on the IoU scores, low and high resolution
+        multi-masks, and SAM output tokens, and selects the best mask of every object.
 
         The original code can be found in the SAMURAI repo and has been adapted to work with multiple objects:
         https://github.com/yangchris11/samurai/blob/master/sam2/sam2/modeling/sam2_base.py#L421-L509
 
+        The candidate boxes of all objects x masks are computed on the device with `batched_mask_to_box`
+        and copied to the host once, the Kalman filter predict/update steps run on the stacked states
+        of all objects and the IoUs against the predicted boxes are computed in one vectorized call.
+
         Parameters
         ----------
-        obj : int
-            The identifier for the object being tracked.
+        obj_ids : List[int]
+            The identifiers of the objects in the batch rows.
 
         ious : torch.Tensor
-            A tensor containing the intersection over union (IoU) values for the current object
-            across multiple possible detections.
+            A tensor of shape [B, M] containing the predicted IoU of every candidate mask.
 
         low_res_multimasks : torch.Tensor
-            A tensor containing low resolution multi-masks for the object detections.
+            A tensor of shape [B, M, H*4, W*4] containing the low resolution candidate masks.
 
         high_res_multimasks : torch.Tensor
-            A tensor containing high resolution multi-masks for the object detections.
+            A tensor of shape [B, M, H*16, W*16] containing the high resolution candidate masks,
+            at the input resolution of the frame.
 
         sam_output_tokens : torch.Tensor
-            A tensor containing the output tokens from the SAM model for each detection.
+            A tensor of shape [B, M, C] containing the output tokens from the SAM model for each mask.
+
+        input_box : Tuple[int, int, int, int], optional
+            The (x0, y0, x1, y1) window of the input in `image_size` coordinates, for frames cropped
+            around the objects. Defaults to the full frame.
 
         Returns
         -------
         Tuple
             A tuple containing the following:
             - low_res_masks : torch.Tensor
-                The low resolution mask corresponding to the best IoU detection.
+                The low resolution masks [B, 1, H*4, W*4] of the selected candidates.
 
             - high_res_masks : torch.Tensor
-                The high resolution mask corresponding to the best IoU detection.
+                The high resolution masks [B, 1, H*16, W*16] of the selected candidates.
 
             - sam_output_token : torch.Tensor
-                The SAM output token corresponding to the best IoU detection.
+                The SAM output tokens [B, C] of the selected candidates.
 
             - ious : torch.Tensor
-                The IoU score of the best detection after filtering.
+                The IoU scores [B] of the selected candidates.
 
             - kf_ious : torch.Tensor
-                The Kalman filter IoU score of the best detection after filtering.
+                The Kalman filter IoU scores [B] of the selected candidates, NaN for objects
+                that are not in the stable state yet.
 
         """
 
-        ious = ious[obj]
-        low_res_multimasks = low_res_multimasks[obj]
-        high_res_multimasks = high_res_multimasks[obj]
-        sam_output_tokens = sam_output_tokens[obj]
-
-        kf_ious = torch.full((1,), float('nan'),  device=self.device)
-
-        if obj not in self.kf_mean or self.stable_frames.get(obj, 0) == 0:
-            best_iou_inds = torch.argmax(ious, dim=-1)
-
-            non_zero_indices = torch.argwhere(high_res_multimasks[best_iou_inds] > 0.0)
-
-            if len(non_zero_indices) == 0:
-                high_res_bbox = [0, 0, 0, 0]
-
-            else:
-                y_min, x_min = non_zero_indices.min(dim=0).values
-                y_max, x_max = non_zero_indices.max(dim=0).values
-                high_res_bbox = [x_min.item(), y_min.item(), x_max.item(), y_max.item()]
-
-            kf_mean, kf_covariance = self.kf.initiate(self.kf.xyxy_to_xyah(high_res_bbox))
-            self.kf_mean[obj] = kf_mean
-            self.kf_covariance[obj] = kf_covariance
-
-            self.stable_frames[obj] = 1
-
-        elif self.stable_frames[obj] < self.stable_frames_threshold:
-            kf_mean, kf_covariance = self.kf.predict(self.kf_mean[obj], self.kf_covariance[obj])
-            self.kf_mean[obj] = kf_mean
-            self.kf_covariance[obj] = kf_covariance
-
-            best_iou_inds = torch.argmax(ious, dim=-1)
-
-            non_zero_indices = torch.argwhere(high_res_multimasks[best_iou_inds] > 0.0)
-
-            if len(non_zero_indices) == 0:
-                high_res_bbox = [0, 0, 0, 0]
-
-            else:
-                y_min, x_min = non_zero_indices.min(dim=0).values
-                y_max, x_max = non_zero_indices.max(dim=0).values
-                high_res_bbox = [x_min.item(), y_min.item(), x_max.item(), y_max.item()]
-
-            if ious[best_iou_inds] > self.stable_ious_threshold:
-                kf_mean, kf_covariance = self.kf.update(self.kf_mean[obj],
-                                                        self.kf_covariance[obj],
-                                                        self.kf.xyxy_to_xyah(high_res_bbox)
-                                                        )
-                self.kf_mean[obj] = kf_mean
-                self.kf_covariance[obj] = kf_covariance
-
-                self.stable_frames[obj] += 1
-
-            else:
-                self.stable_frames[obj] = 0
-
-        else:
-            kf_mean, kf_covariance = self.kf.predict(self.kf_mean[obj], self.kf_covariance[obj])
-
-            self.kf_mean[obj] = kf_mean
-            self.kf_covariance[obj] = kf_covariance
-
-            high_res_multibboxes = []
-
-            for i in range(0, len(ious)):
-                non_zero_indices = torch.argwhere(high_res_multimasks[i] > 0.0)
-
-                if len(non_zero_indices) == 0:
-                    high_res_multibboxes.append([0, 0, 0, 0])
-
-                else:
-                    y_min, x_min = non_zero_indices.min(dim=0).values
-                    y_max, x_max = non_zero_indices.max(dim=0).values
-                    high_res_multibboxes.append([x_min.item(), y_min.item(), x_max.item(), y_max.item()])
-
-            # compute the IoU between the predicted bbox and the high_res_multibboxes
-            kf_ious = torch.tensor(self.kf.compute_iou(self.kf_mean[obj][:4], high_res_multibboxes), device=self.device)
-
-            # weighted iou
-            weighted_ious = self.kf_score_weight * kf_ious + (1 - self.kf_score_weight) * ious
-            best_iou_inds = torch.argmax(weighted_ious, dim=-1)
-
-            if ious[best_iou_inds] < self.stable_ious_threshold:
-                self.stable_frames[obj] = 0
-
-            else:
-                kf_mean, kf_covariance = self.kf.update(self.kf_mean[obj],
-                                                        self.kf_covariance[obj],
-                                                        self.kf.xyxy_to_xyah(high_res_multibboxes[best_iou_inds])
-                                                        )
-                self.kf_mean[obj] = kf_mean
-                self.kf_covariance[obj] = kf_covariance
-
-        low_res_masks = low_res_multimasks[best_iou_inds].unsqueeze(0)
-        high_res_masks = high_res_multimasks[best_iou_inds].unsqueeze(0)
-        sam_output_token = sam_output_tokens[best_iou_inds].unsqueeze(0)
-        ious = ious[best_iou_inds].unsqueeze(0)
-        kf_ious = kf_ious[best_iou_inds].unsqueeze(0) if ~torch.isnan(kf_ious).all() else kf_ious
-
-        return low_res_masks, high_res_masks, sam_output_token, ious, kf_ious
+        B = ious.shape[0]
+
+        # boxes of every candidate mask, one device-to-host copy together with the IoU predictions
+        boxes = batched_mask_to_box(high_res_multimasks > 0.0)
+        host = torch.cat([boxes.float(), ious.float().unsqueeze(-1)], dim=-1).cpu().numpy()
+        boxes, ious_np = host[..., :4].astype(np.float64), host[..., 4]
+
+        # the Kalman filter state is kept in full-frame image_size coordinates for every input
+        # resolution and crop
+        x0, y0, x1, _ = (0, 0, self.image_size, self.image_size) if input_box is None else input_box
+        boxes = boxes * ((x1 - x0) / high_res_multimasks.shape[-1]) + np.array([x0, y0, x0, y0])
+
+        stable_frames = np.array([self.stable_frames.get(obj, 0) if obj in self.kf_mean else 0 for obj in obj_ids])
+        is_init = stable_frames == 0
+        is_stable = stable_frames >= self.stable_frames_threshold
+
+        best_iou_inds = np.argmax(ious_np, axis=-1)
+        kf_ious = np.full((B,), np.nan)
+
+        if is_init.any():
+            init_rows = np.flatnonzero(is_init)
+            measurements = self.kf.multi_xyxy_to_xyah(boxes[init_rows, best_iou_inds[init_rows]])
+            kf_mean, kf_covariance = self.kf.multi_initiate(measurements)
+
+            for i, row in enumerate(init_rows):
+                self.kf_mean[obj_ids[row]] = kf_mean[i]
+                self.kf_covariance[obj_ids[row]] = kf_covariance[i]
+                self.stable_frames[obj_ids[row]] = 1
+
+        if not is_init.all():
+            tracked_rows = np.flatnonzero(~is_init)
+            kf_mean = np.stack([self.kf_mean[obj_ids[row]] for row in tracked_rows])
+            kf_covariance = np.stack([self.kf_covariance[obj_ids[row]] for row in tracked_rows])
+            kf_mean, kf_covariance = self.kf.multi_predict(kf_mean, kf_covariance)
+
+            # in the stable state, the candidates are re-ranked with the IoU to the predicted box
+            stable = is_stable[tracked_rows]
+            if stable.any():
+                stable_rows = tracked_rows[stable]
+                candidate_kf_ious = self.kf.multi_compute_iou(kf_mean[stable, :4], boxes[stable_rows])
+                weighted_ious = self.kf_score_weight * candidate_kf_ious + (1 - self.kf_score_weight) * ious_np[stable_rows]
+                best_iou_inds[stable_rows] = np.argmax(weighted_ious, axis=-1)
+                kf_ious[stable_rows] = candidate_kf_ious[np.arange(len(stable_rows)), best_iou_inds[stable_rows]]
+
+            best_ious = ious_np[tracked_rows, best_iou_inds[tracked_rows]]
+            confident = np.where(stable,
+                                 best_ious >= self.stable_ious_threshold,
+                                 best_ious > self.stable_ious_threshold
+                                 )
+
+            if confident.any():
+                measurements = self.kf.multi_xyxy_to_xyah(boxes[tracked_rows[confident], best_iou_inds[tracked_rows[confident]]])
+                kf_mean[confident], kf_covariance[confident] = self.kf.multi_update(kf_mean[confident],
+                                                                                    kf_covariance[confident],
+                                                                                    measurements
+                                                                                    )
+
+            for i, row in enumerate(tracked_rows):
+                obj = obj_ids[row]
+                self.kf_mean[obj] = kf_mean[i]
+                self.kf_covariance[obj] = kf_covariance[i]
+
+                if not confident[i]:
+                    self.stable_frames[obj] = 0
+                elif not stable[i]:
+                    self.stable_frames[obj] += 1
+
+        # gather the selected candidates on the device
+        best = torch.from_numpy(best_iou_inds).to(ious.device, non_blocking=True)
+        rows = torch.arange(B, device=ious.device)
+
+        low_res_masks = low_res_multimasks[rows, best].unsqueeze(1)
+        high_res_masks = high_res_multimasks[rows, best].unsqueeze(1)
+        sam_output_token = sam_output_tokens[rows, best]
+        best_ious = ious[rows, best]
+        kf_ious = torch.from_numpy(kf_ious).to(device=ious.device, dtype=torch.float32)
+
+        return low_res_masks, high_res_masks, sam_output_token, best_ious, kf_ious
 
     def forward_sam_heads(self,
                           backbone_features,
@@ -213,6 +256,8 @@ class SAM2ObjectTracker(SAM2Base):
                           mask_inputs=None,
                           high_res_features=None,
                           multimask_output=False,
+                          obj_ids=None,
+                          input_box=None,
                           ) -> Tuple:
         """
         Forward SAM prompt encoders and mask heads.
@@ -244,6 +289,13 @@ class SAM2ObjectTracker(SAM2Base):
             If True, the output includes 3 candidate masks and their corresponding IoU estimates.
             If False, only 1 mask and its corresponding IoU estimate are returned.
 
+        obj_ids : list of int, optional
+            The object id of each batch row, used to key the per-object Kalman filter state.
+            Defaults to the row indices.
+
+        input_box : tuple of int, optional
+            The (x0, y0, x1, y1) crop window of the input in `image_size` coordinates, None for full frames.
+
         Returns
         -------
         Tuple
@@ -281,9 +333,12 @@ class SAM2ObjectTracker(SAM2Base):
         """
 
         B = backbone_features.size(0)
+        H, W = backbone_features.shape[-2:]
         assert backbone_features.size(1) == self.sam_prompt_embed_dim
-        assert backbone_features.size(2) == self.sam_image_embedding_size
-        assert backbone_features.size(3) == self.sam_image_embedding_size
+        assert H == W, "Only square inputs are supported"
+
+        # prompts are only encoded at the model's native resolution
+        assert (point_inputs is None and mask_inputs is None) or H == self.sam_image_embedding_size
 
         # a) Handle point prompts
         if point_inputs is not None:
@@ -293,8 +348,8 @@ class SAM2ObjectTracker(SAM2Base):
 
         else:
             # If no points are provide, pad with an empty point (with label -1)
-            sam_point_coords = torch.zeros(self.num_objects, 1, 2, device=self.device)
-            sam_point_labels = -torch.ones(self.num_objects, 1, dtype=torch.int32, device=self.device)
+            sam_point_coords = torch.zeros(B, 1, 2, device=self.device)
+            sam_point_labels = -torch.ones(B, 1, dtype=torch.int32, device=self.device)
 
         # b) Handle mask prompts
         if mask_inputs is not None:
@@ -334,17 +389,20 @@ class SAM2ObjectTracker(SAM2Base):
                 self.model_constants['sparse_embeddings'] = sparse_embeddings
                 self.model_constants['dense_embeddings'] = dense_embeddings
 
-            sparse_embeddings = self.model_constants['sparse_embeddings']
-            dense_embeddings = self.model_constants['dense_embeddings']
-
-        out = self.sam_mask_decoder(image_embeddings=backbone_features,
-                                    image_pe=self.sam_prompt_encoder.get_dense_pe(),
-                                    sparse_prompt_embeddings=sparse_embeddings,
-                                    dense_prompt_embeddings=dense_embeddings,
-                                    multimask_output=multimask_output,
-                                    repeat_image=False,  # the image is already batched
-                                    high_res_features=high_res_features,
-                                    )
+            # the prompt-free embeddings are identical for every slot and spatially constant,
+            # so take the active rows and the grid of the current input resolution
+            sparse_embeddings = self.model_constants['sparse_embeddings'][:B]
+            dense_embeddings = self.model_constants['dense_embeddings'][:B, :, :H, :W]
+
+        with self.profiler.span('sam_heads'):
+            out = self.sam_mask_decoder(image_embeddings=backbone_features,
+                                        image_pe=self.get_dense_pe((H, W)),
+                                        sparse_prompt_embeddings=sparse_embeddings,
+                                        dense_prompt_embeddings=dense_embeddings,
+                                        multimask_output=multimask_output,
+                                        repeat_image=False,  # the image is already batched
+                                        high_res_features=high_res_features,
+                                        )
 
         low_res_multimasks, ious, sam_output_tokens, object_score_logits = out
 
@@ -361,45 +419,29 @@ class SAM2ObjectTracker(SAM2Base):
         # convert masks from possibly bfloat16 (or float16) to float32
         # (older PyTorch versions before 2.1 don't support `interpolate` on bf16)
         low_res_multimasks = low_res_multimasks.float()
+        input_size = H * self.backbone_stride
         high_res_multimasks = F.interpolate(low_res_multimasks,
-                                            size=(self.image_size, self.image_size),
+                                            size=(input_size, input_size),
                                             mode="bilinear",
                                             align_corners=False,
                                             )
 
         if multimask_output:
-            low_res_masks = []
-            high_res_masks = []
-            sam_output_token = []
-            best_ious = []
-            kf_ious = []
-
-            for obj in range(0, B):
-                out = self.update_kalman_filter(obj=obj,
+            with self.profiler.span('kalman_filter'):
+                out = self.update_kalman_filter(obj_ids=list(range(0, B)) if obj_ids is None else obj_ids,
                                                 ious=ious,
                                                 low_res_multimasks=low_res_multimasks,
                                                 high_res_multimasks=high_res_multimasks,
-                                                sam_output_tokens=sam_output_tokens
+                                                sam_output_tokens=sam_output_tokens,
+                                                input_box=input_box
                                                 )
 
-                _low_res_masks, _high_res_masks, _sam_output_token, _ious, _kf_ious = out
-
-                low_res_masks.append(_low_res_masks)
-                high_res_masks.append(_high_res_masks)
-                sam_output_token.append(_sam_output_token)
-                best_ious.append(_ious)
-                kf_ious.append(_kf_ious)
-
-            low_res_masks = torch.cat(low_res_masks).unsqueeze(1)
-            high_res_masks = torch.cat(high_res_masks).unsqueeze(1)
-            sam_output_token = torch.cat(sam_output_token)
-            best_ious = torch.cat(best_ious)
-            kf_ious = torch.cat(kf_ious)
+            low_res_masks, high_res_masks, sam_output_token, best_ious, kf_ious = out
 
         else:
             best_ious = ious[:, 0]
             sam_output_token = sam_output_tokens[:, 0]
-            kf_ious = torch.full((2,1), float("nan"), device=self.device)
+            kf_ious = torch.full((B,), float("nan"), device=self.device)
 
             low_res_masks, high_res_masks = low_res_multimasks, high_res_multimasks
 
@@ -432,7 +474,7 @@ class SAM2ObjectTracker(SAM2Base):
                 )
 
 
-    def update_memory_bank(self, prediction: Dict):
+    def update_memory_bank(self, prediction: Dict, input_box: Optional[Tuple[int, int, int, int]] = None):
         """
         Adds a prediction to short-term memory and, under specific conditions, to long-term memory.
 
@@ -441,46 +483,255 @@ class SAM2ObjectTracker(SAM2Base):
         prediction : Dict
             A dictionary representing a SAM2 prediction
 
+        input_box : Tuple[int, int, int, int], optional
+            The (x0, y0, x1, y1) crop window the prediction was made on, None for full frames.
+
         Returns
         -------
         None
-            This method does not return any value. It modifies self.past_frames in-place.
+            This method does not return any value. It writes into self.memory_bank in-place.
 
         Notes
         -----
-        - If the short_term deque is full, the method checks whether the frame should also be
-          added to the long_term memory based on an occlusion criterion.
+        - If the short-term memory is full, the method checks whether its oldest frame should also be
+          kept in the long-term memory based on an occlusion criterion.
+
+        - The occlusion criterion evaluates the object_score_logits of the oldest short term frame. If any of the
+          logits is greater than 5, it is considered not occluded and the oldest frame in short_term
+          is added to long_term.
+
+        """
+
+        if prediction['maskmem_features'] is None:
+            return
+
+        self.memory_bank.append(maskmem_features=prediction['maskmem_features'],
+                                maskmem_pos_enc=prediction['maskmem_pos_enc'],
+                                obj_ptr=prediction['obj_ptr'],
+                                object_score_logits=prediction['object_score_logits'],
+                                window=self.get_memory_window(input_box),
+                                )
+
+    def add_objects_to_memory_bank(self, prediction: Dict):
+        """
+        Adds the slots of newly prompted objects to the memory bank.
+
+        Parameters
+        ----------
+        prediction : Dict
+            A SAM2 prediction that only contains the rows of the new objects.
+
+        Returns
+        -------
+        None
+            This method does not return any value. It writes into self.memory_bank in-place.
+
+        Notes
+        -----
+        - Every memory bank frame holds one row per occupied slot. The new objects have no
+          history, so their prompted memory is scattered into the new rows of every stored frame.
+          Memory attention for a new object then only attends to its own prompted memory,
+          while the existing objects keep their rows unchanged.
+
+        """
+
+        if self.memory_bank.is_empty():
+            self.update_memory_bank(prediction=prediction)
+            return
+
+        if prediction['maskmem_features'] is None:
+            return
+
+        self.memory_bank.add_rows(maskmem_features=prediction['maskmem_features'],
+                                  obj_ptr=prediction['obj_ptr'],
+                                  object_score_logits=prediction['object_score_logits'],
+                                  )
+
+    @torch.inference_mode()
+    def remove_object(self, obj_id: int):
+        """
+        Frees the slot of a tracked object so it is no longer computed on every frame.
+
+        Parameters
+        ----------
+        obj_id : int
+            The id of the object as returned in `prediction['obj_ids']`.
+
+        Returns
+        -------
+        None
+            The memory bank rows and Kalman filter state of the object are dropped in-place.
+
+        """
+
+        if obj_id not in self.obj_ids:
+            raise KeyError(f"Unknown object id {obj_id}")
+
+        row = self.obj_ids.index(obj_id)
+
+        if not self.memory_bank.is_empty():
+            self.memory_bank.remove_row(row)
+
+        del self.obj_ids[row]
+        self.curr_obj_idx = len(self.obj_ids)
+
+        for state in (self.kf_mean, self.kf_covariance, self.stable_frames):
+            state.pop(obj_id, None)
+
+    def reset_tracker(self):
+        """Drops all tracked objects, their memory bank and Kalman filter state."""
+        self.memory_bank.clear()
+        self.clear_feature_cache()
+        self.obj_ids = []
+        self.curr_obj_idx = 0
+        self.kf_mean = {}
+        self.kf_covariance = {}
+        self.stable_frames = {}
+        self.roi_state = {'fallback': True, 'consecutive': 0, 'last_box': None}
+
+    # spans recorded by the profiler, in pipeline order
+    PROFILER_SPANS = ('preprocess', 'backbone', 'inference', 'memory_assembly', 'memory_attention',
+                      'sam_heads', 'kalman_filter', 'memory_encoder', 'memory_bank')
+
+    def enable_profiling(self, enabled: bool = True, trace: bool = False, window: int = 300) -> StageProfiler:
+        """
+        Replaces the profiler with a new one on the model's device.
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            Whether to record the stage spans (`PROFILER_SPANS`).
+
+        trace : bool, optional
+            Also record Chrome trace events, see `StageProfiler.export_chrome_trace`.
 
-        - The occlusion criterion evaluates the object_score_logits of the oldest short term frame. If the logits
-          are greater than 0.5, it is considered not occluded and the oldest frame in short_term
-          is added to long_term. 0.5 is an arbitrary threshold on a scale of 0-1 that assumes 0.5 is half-occluded.
+        window : int, optional
+            Number of recent durations per span used for the rolling statistics.
+
+        Returns
+        -------
+        StageProfiler
+            The new profiler, e.g. `tracker.enable_profiling().summary()` after tracking.
 
         """
 
-        memory_frame = {'maskmem_pos_enc': prediction['maskmem_pos_enc'],
-                        'maskmem_features': prediction['maskmem_features'],
-                        'obj_ptr': prediction['obj_ptr'],
-                        'object_score_logits': prediction['object_score_logits'],
-                        'ious': prediction['ious'],
-                        'kf_ious': prediction['kf_ious']
-                        }
+        self.profiler = StageProfiler(enabled=enabled, device=self.device, window=window, trace=trace)
+
+        return self.profiler
 
-        if len(self.past_frames['short_term']) == self.past_frames['short_term'].maxlen:
-            oldest_short_term_frame = self.past_frames['short_term'].popleft()
-            object_score_logits = oldest_short_term_frame['object_score_logits']
+    STREAM_STATE_ATTRS = ('obj_ids', 'curr_obj_idx', 'next_obj_id', 'memory_bank',
+                          'kf_mean', 'kf_covariance', 'stable_frames', 'feature_cache', 'feature_cache_stats',
+                          'roi_state')
 
-            not_occluded = (object_score_logits > 5).any()
+    def new_stream_state(self) -> Dict:
+        """
+        Creates an empty per-stream tracking state (slots, memory bank, Kalman filter and feature cache).
 
-            if not_occluded:
-                self.past_frames['long_term'].append(oldest_short_term_frame)
+        The model weights are shared; a stream is tracked by loading its state with `set_stream_state`
+        before calling the tracking methods and saving it back with `get_stream_state`.
+
+        """
 
-        self.past_frames['short_term'].append(memory_frame)
+        return {'obj_ids': [],
+                'curr_obj_idx': 0,
+                'next_obj_id': 0,
+                'memory_bank': MemoryBank(short_term_size=self.memory_bank.short_term_size,
+                                          long_term_size=self.memory_bank.long_term_size,
+                                          max_objects=self.num_objects
+                                          ),
+                'kf_mean': {},
+                'kf_covariance': {},
+                'stable_frames': {},
+                'feature_cache': {},
+                'feature_cache_stats': {'computed': 0, 'reused': 0, 'last_change_score': None},
+                'roi_state': {'fallback': True, 'consecutive': 0, 'last_box': None},
+                }
+
+    def get_stream_state(self) -> Dict:
+        """Returns the current per-stream tracking state (by reference)."""
+        return {name: getattr(self, name) for name in self.STREAM_STATE_ATTRS}
+
+    def set_stream_state(self, state: Dict):
+        """Loads a per-stream tracking state created by `new_stream_state`."""
+        for name in self.STREAM_STATE_ATTRS:
+            setattr(self, name, state[name])
+
+    def get_dense_pe(self, feat_size: Tuple[int, int]) -> torch.Tensor:
+        """Positional encoding of the SAM prompt encoder on a feature grid, shape (1, C, H, W)."""
+        if tuple(feat_size) == self.sam_prompt_encoder.image_embedding_size:
+            return self.sam_prompt_encoder.get_dense_pe()
+
+        key = ('dense_pe', tuple(feat_size))
+        if key not in self.model_constants:
+            self.model_constants[key] = self.sam_prompt_encoder.pe_layer(tuple(feat_size)).unsqueeze(0)
+
+        return self.model_constants[key]
+
+    def get_memory_spatial_pos(self, feat_size: Tuple[int, int]) -> torch.Tensor:
+        """Spatial positional encoding of the memories on a feature grid, shape (HW, 1, C)."""
+        spatial_pos = self.memory_bank.spatial_pos
+        if tuple(feat_size) == self.memory_bank.feat_size:
+            return spatial_pos
+
+        key = ('maskmem_spatial_pos', tuple(feat_size))
+        if key not in self.model_constants:
+            # the memory encoder's sine encoding only depends on the shape of its input
+            dummy = spatial_pos.new_zeros((1, spatial_pos.shape[-1], *feat_size))
+            pos = self.memory_encoder.position_encoding(dummy)
+            self.model_constants[key] = pos.flatten(2).permute(2, 0, 1).to(spatial_pos.dtype).contiguous()
+
+        return self.model_constants[key]
+
+    def get_memory_pos_embed(self, t_pos_list: List[int], feat_size: Optional[Tuple[int, int]] = None) -> torch.Tensor:
+        """
+        Spatial plus temporal positional encoding of the memory frames, shape (len(t_pos_list) * HW, 1, C).
+
+        The spatial encoding is the same for every frame and object, so only the temporal encoding
+        differs per frame; it is gathered with an index cached per temporal layout and added in
+        a single broadcast instead of once per stored frame. `feat_size` is the feature grid of the
+        current frame and defaults to the grid of the memory bank.
+
+        """
+
+        key = ('maskmem_tpos_index', tuple(t_pos_list))
+        if key not in self.model_constants:
+            # t_pos is the distance in frames, index num_maskmem - t_pos - 1 (wrapping like a Python index)
+            index = [(self.num_maskmem - t_pos - 1) % self.maskmem_tpos_enc.shape[0] for t_pos in t_pos_list]
+            self.model_constants[key] = torch.tensor(index, device=self.maskmem_tpos_enc.device)
+
+        tpos_enc = self.maskmem_tpos_enc.index_select(0, self.model_constants[key]).view(len(t_pos_list), 1, 1, -1)
+        spatial_pos = self.get_memory_spatial_pos(feat_size or self.memory_bank.feat_size).unsqueeze(0)
+
+        return (spatial_pos + tpos_enc.to(spatial_pos.dtype)).flatten(0, 1)
+
+    def get_obj_ptr_pos_embed(self, pos_list: List[int], max_obj_ptrs_in_encoder: int) -> torch.Tensor:
+        """
+        Temporal positional encoding of the object pointers, shape (len(pos_list), mem_dim).
+
+        The projected sine embedding of every pointer position is computed once per pointer count
+        and the current positions are gathered from it.
+
+        """
+
+        key = ('obj_ptr_tpos', max_obj_ptrs_in_encoder)
+        if key not in self.model_constants:
+            t_diff_max = max_obj_ptrs_in_encoder - 1
+            tpos_dim = self.hidden_dim if self.proj_tpos_enc_in_obj_ptrs else self.mem_dim
+            positions = torch.arange(max_obj_ptrs_in_encoder + 1, device=self.device)
+            obj_pos = get_1d_sine_pe(positions / t_diff_max, dim=tpos_dim)
+            self.model_constants[key] = self.obj_ptr_tpos_proj(obj_pos)
+
+        table = self.model_constants[key]
+
+        return table[torch.tensor(pos_list, device=table.device)]
 
 
     def prepare_memory_conditioned_features(self,
                                             current_vision_feats: List[torch.Tensor],
                                             current_vision_pos_embeds: List[torch.Tensor],
                                             feat_sizes: List[Tuple[int, int]],
+                                            use_memory: bool = True,
+                                            input_box: Optional[Tuple[int, int, int, int]] = None,
                                             ) -> torch.Tensor:
 
         """
@@ -497,6 +748,14 @@ class SAM2ObjectTracker(SAM2Base):
         feat_sizes : List[Tuple]
             The spatial dimensions (height, width) of the feature maps.
 
+        use_memory : bool, optional
+            Whether to condition on the memory bank. False for newly prompted objects,
+            which are encoded like an initial conditioning frame. Default is True.
+
+        input_box : Tuple[int, int, int, int], optional
+            The (x0, y0, x1, y1) crop window of the frame in `image_size` coordinates. The memories
+            are then read from the same window. None for full frames.
+
         Returns
         -------
         pix_feat_with_mem: torch.Tensor
@@ -509,7 +768,6 @@ class SAM2ObjectTracker(SAM2Base):
         B = current_vision_feats[-1].size(1)  # batch size on this frame
         C = self.hidden_dim
         H, W = feat_sizes[-1]  # top-level (lowest-resolution) feature size
-        device = current_vision_feats[-1].device
 
         # The case of `self.num_maskmem == 0` below is primarily used for reproducing SAM on images.
         # In this case, we skip the fusion with any memory.
@@ -518,106 +776,63 @@ class SAM2ObjectTracker(SAM2Base):
             return pix_feat
 
         num_obj_ptr_tokens = 0
-        # Step 1: condition the visual features of the current frame on previous memories
-        if self.past_frames['short_term'] or self.past_frames['long_term']:
-            short_term = self.past_frames['short_term']
-            long_term = self.past_frames['long_term']
-
-            # Retrieve the memories encoded with the maskmem backbone
-            to_cat_memory, to_cat_memory_pos_embed = [], []
-
-            t_pos_and_prevs = [(0, long_term[t_pos]) for t_pos in range(0, len(long_term))]
-
-            for t_pos in range(1, len(short_term) + 1):
-                t_pos_and_prevs.append((t_pos, short_term[t_pos - 1]))
-
-            for t_pos, prev in t_pos_and_prevs:
-                if prev is None:
-                    continue  # skip padding frames
-
-                # "maskmem_features" might have been offloaded to CPU in demo use cases,
-                # so we load it back to GPU (it's a no-op if it's already on GPU).
-                feats = prev["maskmem_features"].to(device, non_blocking=True)
-                to_cat_memory.append(feats.flatten(2).permute(2, 0, 1))
-
-                # Spatial positional encoding (it might have been offloaded to CPU in eval)
-                maskmem_enc = prev["maskmem_pos_enc"][-1].to(device, non_blocking=True)
-                maskmem_enc = maskmem_enc.flatten(2).permute(2, 0, 1)
-
-                # Temporal positional encoding
-                maskmem_enc = (maskmem_enc + self.maskmem_tpos_enc[self.num_maskmem - t_pos - 1])
-
-                to_cat_memory_pos_embed.append(maskmem_enc)
-
-            pos_and_ptrs = []
-            # Construct the list of past object pointers
-            if self.use_obj_ptrs_in_encoder:
-                num_frames = len(long_term) + len(short_term)
-                max_obj_ptrs_in_encoder = min(num_frames, self.max_obj_ptrs_in_encoder)
-
-                for pos in range(1, max_obj_ptrs_in_encoder - len(long_term) + 1):
-                    out = short_term[len(short_term)-pos]
-                    pos_and_ptrs.append((pos, out['obj_ptr']))
-
-                for pos in range(1, len(long_term) + 1):
-                    out = long_term[len(long_term)-pos]
-                    pos_and_ptrs.append((pos, out['obj_ptr']))
+        with self.profiler.span('memory_assembly'):
+            # Step 1: condition the visual features of the current frame on previous memories
+            if use_memory and not self.memory_bank.is_empty():
+                slots, t_pos_list = self.memory_bank.memory_slots()
+
+                # Spatial + temporal positional encoding of the memories, identical for every object
+                memory_pos_embed = [self.get_memory_pos_embed(t_pos_list, (H, W))]
+
+                # Construct the list of past object pointers
+                ptr_slots = []
+                if self.use_obj_ptrs_in_encoder:
+                    max_obj_ptrs_in_encoder = min(len(self.memory_bank), self.max_obj_ptrs_in_encoder)
+                    ptr_slots, pos_list = self.memory_bank.pointer_slots(max_obj_ptrs_in_encoder)
+
+                    # If we have at least one object pointer, add them to the across attention
+                    if len(ptr_slots) > 0:
+                        # a temporal positional embedding based on how far each object pointer is from
+                        # the current frame (sine embedding normalized by the max pointer num).
+                        if self.add_tpos_enc_to_obj_ptrs and max_obj_ptrs_in_encoder > 1:
+                            obj_pos = self.get_obj_ptr_pos_embed(pos_list, max_obj_ptrs_in_encoder)
+
+                        else:
+                            obj_pos = memory_pos_embed[0].new_zeros(len(pos_list), self.mem_dim)
+
+                        # each pointer is split into (C // self.mem_dim) tokens in the memory bank
+                        obj_pos = obj_pos.unsqueeze(1).repeat_interleave(self.memory_bank.ptr_tokens, dim=0)
+
+                        memory_pos_embed.append(obj_pos.to(memory_pos_embed[0].dtype))
+                        num_obj_ptr_tokens = obj_pos.shape[0]
+
+                # The memories encoded with the maskmem backbone and the object pointers are stored as
+                # the memory attention input, so this is a view (or one index_select while the bank fills up).
+                # On a frame at another input resolution, the spatial memories are resampled to its grid,
+                # on a cropped frame the window of the crop is sliced out.
+                memory = self.memory_bank.get_memory(slots, ptr_slots, (H, W), self.get_memory_window(input_box))
+                memory_pos_embed = torch.cat(memory_pos_embed, dim=0).expand(-1, B, -1)
 
-                # If we have at least one object pointer, add them to the across attention
-                if len(pos_and_ptrs) > 0:
-                    pos_list, ptrs_list = zip(*pos_and_ptrs)
-
-                    # stack object pointers along dim=0 into [ptr_seq_len, B, C] shape
-                    obj_ptrs = torch.stack(ptrs_list, dim=0)
-
-                    # a temporal positional embedding based on how far each object pointer is from
-                    # the current frame (sine embedding normalized by the max pointer num).
-                    if self.add_tpos_enc_to_obj_ptrs and max_obj_ptrs_in_encoder > 1:
-                        t_diff_max = max_obj_ptrs_in_encoder - 1
-                        tpos_dim = C if self.proj_tpos_enc_in_obj_ptrs else self.mem_dim
-                        obj_pos = torch.tensor(pos_list, device=device)
-                        obj_pos = get_1d_sine_pe(obj_pos / t_diff_max, dim=tpos_dim)
-                        obj_pos = self.obj_ptr_tpos_proj(obj_pos)
-                        obj_pos = obj_pos.unsqueeze(1).expand(-1, B, self.mem_dim)
-
-                    else:
-                        obj_pos = obj_ptrs.new_zeros(len(pos_list), B, self.mem_dim)
-
-                    if self.mem_dim < C:
-                        # split a pointer into (C // self.mem_dim) tokens for self.mem_dim < C
-                        obj_ptrs = obj_ptrs.reshape(-1, B, C // self.mem_dim, self.mem_dim)
-                        obj_ptrs = obj_ptrs.permute(0, 2, 1, 3).flatten(0, 1)
-                        obj_pos = obj_pos.repeat_interleave(C // self.mem_dim, dim=0)
-
-                    to_cat_memory.append(obj_ptrs)
-                    to_cat_memory_pos_embed.append(obj_pos)
-                    num_obj_ptr_tokens = obj_ptrs.shape[0]
-
-                else:
-                    num_obj_ptr_tokens = 0
-
-        else:
-            # for initial conditioning frames, encode them without using any previous memory
-            if self.directly_add_no_mem_embed:
-                # directly add no-mem embedding (instead of using the transformer encoder)
-                pix_feat_with_mem = current_vision_feats[-1] + self.no_mem_embed
-                pix_feat_with_mem = pix_feat_with_mem.permute(1, 2, 0).view(B, C, H, W)
-                return pix_feat_with_mem
-
-            # Use a dummy token on the first frame (to avoid empty memory input to tranformer encoder)
-            to_cat_memory = [self.no_mem_embed.expand(1, B, self.mem_dim)]
-            to_cat_memory_pos_embed = [self.no_mem_pos_enc.expand(1, B, self.mem_dim)]
-
-        # Step 2: Concatenate the memories and forward through the transformer encoder
-        memory = torch.cat(to_cat_memory, dim=0)
-        memory_pos_embed = torch.cat(to_cat_memory_pos_embed, dim=0)
-
-        pix_feat_with_mem = self.memory_attention(curr=current_vision_feats,
-                                                  curr_pos=current_vision_pos_embeds,
-                                                  memory=memory,
-                                                  memory_pos=memory_pos_embed,
-                                                  num_obj_ptr_tokens=num_obj_ptr_tokens,
-                                                  )
+            else:
+                # for initial conditioning frames, encode them without using any previous memory
+                if self.directly_add_no_mem_embed:
+                    # directly add no-mem embedding (instead of using the transformer encoder)
+                    pix_feat_with_mem = current_vision_feats[-1] + self.no_mem_embed
+                    pix_feat_with_mem = pix_feat_with_mem.permute(1, 2, 0).view(B, C, H, W)
+                    return pix_feat_with_mem
+
+                # Use a dummy token on the first frame (to avoid empty memory input to tranformer encoder)
+                memory = self.no_mem_embed.expand(1, B, self.mem_dim)
+                memory_pos_embed = self.no_mem_pos_enc.expand(1, B, self.mem_dim)
+
+        # Step 2: forward through the transformer encoder
+        with self.profiler.span('memory_attention'):
+            pix_feat_with_mem = self.memory_attention(curr=current_vision_feats,
+                                                      curr_pos=current_vision_pos_embeds,
+                                                      memory=memory,
+                                                      memory_pos=memory_pos_embed,
+                                                      num_obj_ptr_tokens=num_obj_ptr_tokens,
+                                                      )
         # reshape the output (HW)BC => BCHW
         pix_feat_with_mem = pix_feat_with_mem.permute(1, 2, 0).view(B, C, H, W)
 
@@ -632,6 +847,9 @@ class SAM2ObjectTracker(SAM2Base):
                   mask_inputs: Optional[torch.Tensor],
                   run_mem_encoder: bool = True,
                   prev_sam_mask_logits: Optional[torch.Tensor] = None,
+                  obj_ids: Optional[List[int]] = None,
+                  use_memory: bool = True,
+                  input_box: Optional[Tuple[int, int, int, int]] = None,
                   ) -> Dict[str, Any]:
 
         """
@@ -662,6 +880,15 @@ class SAM2ObjectTracker(SAM2Base):
         prev_sam_mask_logits : torch.Tensor or None, optional
          Previously predicted SAM mask logits to be used as input for the SAM mask decoder.
 
+        obj_ids : list of int or None, optional
+         Object ids of the batch rows. Defaults to the occupied slots.
+
+        use_memory : bool, optional
+         Whether to condition the rows on the memory bank. Default is True.
+
+        input_box : tuple of int or None, optional
+         The (x0, y0, x1, y1) crop window of the frame in `image_size` coordinates, None for full frames.
+
         Returns
         -------
         dict of str to Any
@@ -702,6 +929,8 @@ class SAM2ObjectTracker(SAM2Base):
             pix_feat_with_mem = self.prepare_memory_conditioned_features(current_vision_feats=current_vision_feats[-1:],
                                                                          current_vision_pos_embeds=current_vision_pos_embeds[-1:],
                                                                          feat_sizes=feat_sizes[-1:],
+                                                                         use_memory=use_memory,
+                                                                         input_box=input_box,
                                                                          )
 
             # apply SAM-style segmentation head
@@ -712,7 +941,7 @@ class SAM2ObjectTracker(SAM2Base):
                 assert point_inputs is not None and mask_inputs is None
                 mask_inputs = prev_sam_mask_logits
 
-            init_frame = not self.past_frames['short_term'] and not self.past_frames['long_term']
+            init_frame = not use_memory or self.memory_bank.is_empty()
             multimask_output = self._use_multimask(init_frame, point_inputs)
 
             sam_outputs = self.forward_sam_heads(backbone_features=pix_feat_with_mem,
@@ -720,6 +949,8 @@ class SAM2ObjectTracker(SAM2Base):
                                                  mask_inputs=mask_inputs,
                                                  high_res_features=high_res_features,
                                                  multimask_output=multimask_output,
+                                                 obj_ids=self.obj_ids if obj_ids is None else obj_ids,
+                                                 input_box=input_box,
                                                  )
 
             _, _, _, low_res_masks, high_res_masks, obj_ptr, object_score_logits, ious, kf_ious = sam_outputs
@@ -734,12 +965,13 @@ class SAM2ObjectTracker(SAM2Base):
         # Finally run the memory encoder on the predicted mask to encode
         # it into a new memory feature (that can be used in future frames)
         if run_mem_encoder and self.num_maskmem > 0:
-            maskmem_features, maskmem_pos_enc = self._encode_new_memory(current_vision_feats=current_vision_feats,
-                                                                        feat_sizes=feat_sizes,
-                                                                        pred_masks_high_res=high_res_masks,
-                                                                        object_score_logits=object_score_logits,
-                                                                        is_mask_from_pts=(point_inputs is not None),
-                                                                        )
+            with self.profiler.span('memory_encoder'):
+                maskmem_features, maskmem_pos_enc = self._encode_new_memory(current_vision_feats=current_vision_feats,
+                                                                            feat_sizes=feat_sizes,
+                                                                            pred_masks_high_res=high_res_masks,
+                                                                            object_score_logits=object_score_logits,
+                                                                            is_mask_from_pts=(point_inputs is not None),
+                                                                            )
             current_out["maskmem_features"] = maskmem_features
             current_out["maskmem_pos_enc"] = maskmem_pos_enc
 
@@ -753,13 +985,19 @@ class SAM2ObjectTracker(SAM2Base):
     def preprocess_image(self,
                          img: np.ndarray,
                          img_mean: Tuple[float] = (0.485, 0.456, 0.406),
-                         img_std: Tuple[float] = (0.229, 0.224, 0.225)
+                         img_std: Tuple[float] = (0.229, 0.224, 0.225),
+                         bgr: bool = False,
+                         size: Optional[int] = None
                          ):
 
         """
         Preprocess an input image for model inference, including resizing, standardization,
         and moving the image to the specified device.
 
+        On CUDA the uint8 image is uploaded once through a pinned staging buffer and the channel
+        order, resize and standardization run on the device. On CPU the image is resized as uint8
+        and converted to float32 in a single pass (no float64 intermediate).
+
         Parameters
         ----------
         img : np.ndarray
@@ -772,6 +1010,13 @@ class SAM2ObjectTracker(SAM2Base):
             Standard deviation values for each channel used for standardization.
             Default is (0.229, 0.224, 0.225).
 
+        bgr : bool, optional
+            Whether the image is in BGR channel order (e.g. straight from OpenCV). It is converted
+            to RGB as part of the preprocessing. Default is False.
+
+        size : int, optional
+            Square input size to resize to. Defaults to the model's `image_size`.
+
         Returns
         -------
         torch.Tensor
@@ -779,27 +1024,326 @@ class SAM2ObjectTracker(SAM2Base):
 
         """
 
-        image_size = self.image_size
+        image_size = self.image_size if size is None else size
+        device = self.device
+
+        # Standardization constants, with the 1/255 scaling folded in: x * scale + bias
+        key = ('img_standardize', tuple(img_mean), tuple(img_std), device)
+        if key not in self.model_constants:
+            img_mean = torch.tensor(img_mean, dtype=torch.float32)[None, :, None, None]
+            img_std = torch.tensor(img_std, dtype=torch.float32)[None, :, None, None]
+            scale = (1.0 / (255.0 * img_std)).to(device)
+            bias = (-img_mean / img_std).to(device)
+            self.model_constants[key] = (scale, bias)
+
+        scale, bias = self.model_constants[key]
+
+        img = np.ascontiguousarray(img)
+
+        if device.type == 'cuda':
+            # Upload uint8 through a pinned staging buffer (reused per shape, guarded by an event)
+            staging_key = ('img_staging', img.shape)
+            if staging_key not in self.model_constants:
+                self.model_constants[staging_key] = (torch.empty(img.shape, dtype=torch.uint8).pin_memory(),
+                                                     torch.cuda.Event()
+                                                     )
+
+            staging, copied = self.model_constants[staging_key]
+            copied.synchronize()
+            staging.numpy()[...] = img
+            img = staging.to(device, non_blocking=True)
+            copied.record()
+
+            # (H, W, C) uint8 => (1, C, H, W) float32, resize and standardize on the device
+            img = img.permute(2, 0, 1).unsqueeze(0).float()
+            if bgr:
+                img = img.flip(1)
+
+            if img.shape[-2:] != (image_size, image_size):
+                img = F.interpolate(img, size=(image_size, image_size), mode="bilinear", align_corners=False)
+            img = torch.addcmul(bias, img, scale)
 
-        # Resize
-        img = cv2.resize(img, (image_size, image_size)) / 255.0
-
-        # Convert to Tensor and shape from (H,W,C) to (C,H,W)
-        img = torch.from_numpy(img).permute(2, 0, 1).float()
+        else:
+            # Resize as uint8 (unless the caller already passes a pre-scaled frame), then convert to
+            # float32 once and standardize in place
+            if img.shape[:2] != (image_size, image_size):
+                img = cv2.resize(img, (image_size, image_size))
+            if bgr:
+                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
-        # Standardize
-        img_mean = torch.tensor(img_mean, dtype=torch.float32)[:, None, None]
-        img_std = torch.tensor(img_std, dtype=torch.float32)[:, None, None]
-        img -= img_mean
-        img /= img_std
+            img = torch.from_numpy(img).permute(2, 0, 1).unsqueeze(0).float().to(device)
+            img.mul_(scale).add_(bias)
 
-        # Move to device
-        img = img.to(self.device, non_blocking=True).float().unsqueeze(0)
+        if self.channels_last:
+            img = img.contiguous(memory_format=torch.channels_last)
 
         return img
 
 
-    def get_image_features(self, img: torch.Tensor) -> Tuple:
+    def check_input_sizes(self, sizes: Tuple[int, ...]) -> Tuple[int, ...]:
+        """
+        Validates candidate input sizes and returns them sorted.
+
+        The sizes must be multiples of 32 (the stride of the last Hiera stage, which also keeps the
+        window positional embeddings tileable) and at most `image_size`.
+
+        """
+
+        for size in sizes:
+            if size % 32 != 0 or size > self.image_size:
+                raise ValueError(f"Invalid input size {size}: expected a multiple of 32 of at most {self.image_size}")
+
+        return tuple(sorted(set(sizes)))
+
+    def set_adaptive_input_sizes(self, sizes: Tuple[int, ...]):
+        """Sets the candidate input sizes of the adaptive resolution mode, an empty tuple disables it."""
+        self.adaptive_input_sizes = self.check_input_sizes(sizes)
+
+    def set_roi_input_sizes(self, sizes: Tuple[int, ...]):
+        """Sets the candidate crop sizes of the region-of-interest tracking mode, an empty tuple disables it."""
+        self.roi_input_sizes = self.check_input_sizes(sizes)
+
+    def is_kalman_stable(self) -> bool:
+        """Whether every tracked object is in the stable Kalman filter state."""
+        return all(obj_id in self.kf_mean and self.stable_frames.get(obj_id, 0) >= self.stable_frames_threshold
+                   for obj_id in self.obj_ids)
+
+    def select_input_size(self) -> int:
+        """
+        Picks the input size of the next frame in the adaptive resolution mode.
+
+        Returns
+        -------
+        int
+            The smallest adaptive size at which the smallest tracked object is at least
+            `adaptive_min_object_size` pixels wide and high, based on its Kalman filter box.
+            `image_size` if the mode is disabled or any object is not in the stable Kalman state
+            (recently prompted, or lost on a recent frame).
+
+        """
+
+        if not self.adaptive_input_sizes or self.curr_obj_idx == 0 or not self.is_kalman_stable():
+            return self.image_size
+
+        min_side = float('inf')
+        for obj_id in self.obj_ids:
+            # (cx, cy, aspect ratio, height) in image_size coordinates
+            _, _, a, h = self.kf_mean[obj_id][:4]
+            min_side = min(min_side, a * h, h)
+
+        for size in self.adaptive_input_sizes:
+            if min_side * size / self.image_size >= self.adaptive_min_object_size:
+                return size
+
+        return self.image_size
+
+    def select_roi_window(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Picks the crop window of the next frame in the region-of-interest tracking mode.
+
+        Returns
+        -------
+        Tuple[int, int, int, int] or None
+            The (x0, y0, x1, y1) window in `image_size` coordinates: the smallest square of
+            `roi_input_sizes` that holds the Kalman predicted boxes of all objects plus `roi_margin`
+            per side, centered on them and aligned to the backbone stride. None if the next frame
+            has to be a full frame.
+
+        """
+
+        if not self.roi_input_sizes or self.curr_obj_idx == 0 or self.memory_bank.is_empty():
+            return None
+
+        if self.roi_state['fallback'] or self.roi_state['consecutive'] >= self.roi_refresh_interval:
+            return None
+
+        if not self.is_kalman_stable():
+            return None
+
+        # one constant velocity step ahead of the current Kalman state
+        mean = np.stack([self.kf_mean[obj_id] for obj_id in self.obj_ids])
+        boxes = self.kf.multi_xyah_to_xyxy(np.dot(mean, self.kf._motion_mat.T)[:, :4])
+        x0, y0 = boxes[:, :2].min(axis=0)
+        x1, y1 = boxes[:, 2:].max(axis=0)
+        side = max(x1 - x0, y1 - y0) * (1 + 2 * self.roi_margin)
+
+        size = next((size for size in self.roi_input_sizes if size >= side), None)
+        if size is None or size >= self.image_size:
+            return None
+
+        # the crop is encoded at full-frame density, so its feature grid is a window of the full grid
+        stride = self.backbone_stride
+        left = int(np.clip(round(((x0 + x1) / 2 - size / 2) / stride) * stride, 0, self.image_size - size))
+        top = int(np.clip(round(((y0 + y1) / 2 - size / 2) / stride) * stride, 0, self.image_size - size))
+
+        return left, top, left + size, top + size
+
+    def get_memory_window(self, input_box: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+        """Converts a crop window in `image_size` coordinates to a (y0, x0, h, w) window of the memory bank grid."""
+        if input_box is None or self.memory_bank.feat_size is None:
+            return None
+
+        x0, y0, x1, y1 = input_box
+        if x1 - x0 == self.image_size:
+            return None
+
+        grid = self.memory_bank.feat_size[0] / self.image_size
+
+        return round(y0 * grid), round(x0 * grid), round((y1 - y0) * grid), round((x1 - x0) * grid)
+
+    def crop_frame(self, img: np.ndarray, input_box: Tuple[int, int, int, int]) -> np.ndarray:
+        """
+        Crops the region of a frame that maps to a window in `image_size` coordinates.
+
+        The crop size in pixels only depends on the window size, so the preprocessing buffers
+        are reused across crop positions.
+
+        """
+
+        H, W = img.shape[:2]
+        x0, y0, x1, y1 = input_box
+        sx, sy = W / self.image_size, H / self.image_size
+
+        width, height = round((x1 - x0) * sx), round((y1 - y0) * sy)
+        left, top = min(round(x0 * sx), W - width), min(round(y0 * sy), H - height)
+
+        return img[top:top + height, left:left + width]
+
+    def update_roi_state(self, prediction: Dict, input_box: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Decides whether the next frame can be cropped, based on the prediction of the current frame.
+
+        The next frame is a full frame if any object score logit is below `roi_min_obj_score_logits`,
+        any IoU is below `roi_min_ious`, or, on a cropped frame, the Kalman box of an object is within
+        `roi_edge_margin` pixels of a crop edge that is not a frame edge.
+
+        """
+
+        state = self.roi_state
+        state['last_box'] = input_box
+        state['consecutive'] = state['consecutive'] + 1 if input_box is not None else 0
+
+        if not self.roi_input_sizes:
+            return
+
+        # one device-to-host copy of the confidences
+        scores = torch.stack([prediction['object_score_logits'].view(-1).float(),
+                              prediction['ious'].view(-1).float()
+                              ]).cpu().numpy()
+
+        confident = (scores[0] >= self.roi_min_obj_score_logits).all() and (scores[1] >= self.roi_min_ious).all()
+
+        near_edge = False
+        if input_box is not None and confident and self.is_kalman_stable():
+            boxes = self.kf.multi_xyah_to_xyxy(np.stack([self.kf_mean[obj_id][:4] for obj_id in self.obj_ids]))
+            x0, y0, x1, y1 = input_box
+            margin = self.roi_edge_margin
+
+            near_edge = (x0 > 0 and (boxes[:, 0] < x0 + margin).any()) \
+                or (y0 > 0 and (boxes[:, 1] < y0 + margin).any()) \
+                or (x1 < self.image_size and (boxes[:, 2] > x1 - margin).any()) \
+                or (y1 < self.image_size and (boxes[:, 3] > y1 - margin).any())
+
+        state['fallback'] = not confident or near_edge
+
+    def paste_roi_masks(self, prediction: Dict, input_box: Tuple[int, int, int, int]):
+        """Maps the masks of a cropped frame back to full-frame coordinates, in place."""
+        x0, y0, x1, y1 = input_box
+
+        for key, size in (("pred_masks", self.image_size // 4), ("pred_masks_high_res", self.image_size)):
+            masks = prediction[key]
+            scale = size / self.image_size
+
+            canvas = masks.new_full((masks.shape[0], masks.shape[1], size, size), NO_OBJ_SCORE)
+            canvas[..., round(y0 * scale):round(y1 * scale), round(x0 * scale):round(x1 * scale)] = masks
+            prediction[key] = canvas
+
+    def get_frame_change_score(self, img: torch.Tensor) -> Tuple[torch.Tensor, Optional[float]]:
+        """
+        Computes a cheap change score between the current frame and the frame of the cached backbone output.
+
+        Parameters
+        ----------
+        img : torch.Tensor
+            Preprocessed image tensor of shape (1, C, H, W).
+
+        Returns
+        -------
+        Tuple
+            - thumbnail : torch.Tensor
+                A 32x32 average-pooled thumbnail of the image.
+            - score : float or None
+                Mean absolute difference of the thumbnails in standardized units,
+                None if there is no cached frame of the same size.
+
+        """
+
+        thumbnail = F.adaptive_avg_pool2d(img, 32)
+
+        cached = self.feature_cache.get('thumbnail')
+        if cached is None or self.feature_cache.get('shape') != tuple(img.shape):
+            return thumbnail, None
+
+        score = (thumbnail - cached).abs().mean().item()
+
+        return thumbnail, score
+
+    def get_backbone_out(self, img: torch.Tensor) -> Dict:
+        """
+        Runs the image encoder, or reuses the previous backbone output when the scene is static.
+
+        Parameters
+        ----------
+        img : torch.Tensor
+            Preprocessed image tensor of shape (1, C, H, W).
+
+        Returns
+        -------
+        backbone_out : Dict
+            The output of `forward_image`.
+
+        Notes
+        -----
+        - Reuse is enabled when `feature_reuse_threshold` > 0. The change score is the mean absolute
+          difference of 32x32 thumbnails (in standardized units) against the frame the cached features
+          were computed on, so slow drifts accumulate instead of being compared frame to frame.
+        - The features are recomputed at least every `feature_refresh_interval` frames to bound drift.
+        - Memory attention, the SAM heads and the memory encoder always run on the current frame.
+
+        """
+
+        if self.feature_reuse_threshold <= 0:
+            self.feature_cache_stats['computed'] += 1
+            return self.forward_image(img)
+
+        thumbnail, score = self.get_frame_change_score(img)
+        self.feature_cache_stats['last_change_score'] = score
+
+        if score is not None and score < self.feature_reuse_threshold \
+                and self.feature_cache['age'] < self.feature_refresh_interval:
+            self.feature_cache['age'] += 1
+            self.feature_cache_stats['reused'] += 1
+            return self.feature_cache['backbone_out']
+
+        backbone_out = self.forward_image(img)
+        self.feature_cache = {'backbone_out': backbone_out,
+                              'thumbnail': thumbnail,
+                              'shape': tuple(img.shape),
+                              'age': 0,
+                              }
+        self.feature_cache_stats['computed'] += 1
+
+        return backbone_out
+
+    def clear_feature_cache(self):
+        """Drops the cached backbone output, e.g. after the PTZ camera moved."""
+        self.feature_cache = {}
+
+    def get_image_features(self,
+                           img: torch.Tensor,
+                           num_rows: Optional[int] = None,
+                           backbone_out: Optional[Dict] = None
+                           ) -> Tuple:
         """
         Extract and process image features for the current frame, expanding them to match the number
         of objects being tracked.
@@ -809,6 +1353,13 @@ class SAM2ObjectTracker(SAM2Base):
         img : torch.Tensor
             Input image tensor of shape (1, C, H, W).
 
+        num_rows : int, optional
+            Number of batch rows to expand the features to. Defaults to the number of occupied slots.
+
+        backbone_out : Dict, optional
+            A precomputed `forward_image` output for this frame (batch size 1), e.g. from a backbone
+            batch shared by several streams. If None, the image encoder is run (or its cache reused).
+
         Returns
         -------
         features : Tuple
@@ -823,19 +1374,22 @@ class SAM2ObjectTracker(SAM2Base):
         """
 
         # get feature embeddings
-        backbone_out = self.forward_image(img)
+        if backbone_out is None:
+            backbone_out = self.get_backbone_out(img)
+
+        num_rows = self.curr_obj_idx if num_rows is None else num_rows
 
         # expand the features to have the same dimension as the number of objects
-        expanded_image = img.expand(self.num_objects, -1, -1, -1)
+        expanded_image = img.expand(num_rows, -1, -1, -1)
         expanded_backbone_out = {"backbone_fpn": backbone_out["backbone_fpn"].copy(),
                                  "vision_pos_enc": backbone_out["vision_pos_enc"].copy(),
                                  }
 
         for i, feat in enumerate(expanded_backbone_out["backbone_fpn"]):
-            expanded_backbone_out["backbone_fpn"][i] = feat.expand(self.num_objects, -1, -1, -1)
+            expanded_backbone_out["backbone_fpn"][i] = feat.expand(num_rows, -1, -1, -1)
 
         for i, pos in enumerate(expanded_backbone_out["vision_pos_enc"]):
-            pos = pos.expand(self.num_objects, -1, -1, -1)
+            pos = pos.expand(num_rows, -1, -1, -1)
             expanded_backbone_out["vision_pos_enc"][i] = pos
 
         features = self._prepare_backbone_features(expanded_backbone_out)
@@ -846,6 +1400,129 @@ class SAM2ObjectTracker(SAM2Base):
 
         return features
 
+    @staticmethod
+    def summarize_masks(pred_masks: torch.Tensor,
+                        threshold: float = 0.0,
+                        mask_format: Optional[str] = "bits"
+                        ) -> Dict[str, Any]:
+        """
+        Thresholds the low-resolution masks on the device and copies only a compact summary to the host.
+
+        The presence flags, bboxes and (optionally) packed masks are laid out in one uint8 buffer, so the
+        summary costs a single device-to-host copy of a few kilobytes per object instead of the float
+        logits.
+
+        Parameters
+        ----------
+        pred_masks : torch.Tensor
+            Mask logits (N, 1, H, W), e.g. the "pred_masks" of `track_all_objects`.
+
+        threshold : float, optional
+            Logit threshold of the foreground.
+
+        mask_format : Optional[str], optional
+            "bits" for masks packed 8 pixels per byte (as `np.packbits`), "uint8" for one 0/1 byte per
+            pixel, or None to skip the masks.
+
+        Returns
+        -------
+        summary : Dict[str, Any]
+            - "present": Whether each mask has any foreground pixel, (N,) bool array.
+            - "boxes": Inclusive (x1, y1, x2, y2) bboxes in mask coordinates, (N, 4) int array, -1 if empty.
+            - "masks": (N, H * W / 8) uint8 array for "bits" (see `unpack_masks`), (N, H, W) bool array for
+              "uint8", or None.
+            - "mask_size": (H, W) of the masks.
+
+        """
+
+        if mask_format not in ("bits", "uint8", None):
+            raise ValueError(f"Unknown mask format {mask_format}")
+
+        N, _, H, W = pred_masks.shape
+        masks = pred_masks[:, 0] > threshold
+
+        rows = masks.any(dim=2)
+        cols = masks.any(dim=1)
+        present = rows.any(dim=1)
+        # first and last foreground row / column, argmax returns the first maximum
+        y1 = rows.to(torch.uint8).argmax(dim=1)
+        y2 = H - 1 - rows.flip(1).to(torch.uint8).argmax(dim=1)
+        x1 = cols.to(torch.uint8).argmax(dim=1)
+        x2 = W - 1 - cols.flip(1).to(torch.uint8).argmax(dim=1)
+        boxes = torch.where(present[:, None], torch.stack([x1, y1, x2, y2], dim=1), -1)
+
+        # 1 presence flag + 4 bbox coordinates as int16 => 10 bytes per object
+        header = torch.cat([present[:, None].to(torch.int16), boxes.to(torch.int16)], dim=1)
+        parts = [header.view(torch.uint8)]
+
+        if mask_format == "bits":
+            flat = masks.reshape(N, -1)
+            pad = -flat.shape[1] % 8
+            if pad:
+                flat = F.pad(flat, (0, pad))
+            bit_weights = torch.tensor([128, 64, 32, 16, 8, 4, 2, 1], dtype=torch.uint8, device=masks.device)
+            parts.append((flat.view(N, -1, 8).to(torch.uint8) * bit_weights).sum(dim=2, dtype=torch.uint8))
+
+        elif mask_format == "uint8":
+            parts.append(masks.reshape(N, -1).to(torch.uint8))
+
+        buffer = torch.cat(parts, dim=1).cpu().numpy()
+
+        header = np.ascontiguousarray(buffer[:, :10]).view(np.int16)
+        summary = {"present": header[:, 0].astype(bool),
+                   "boxes": header[:, 1:].astype(np.int64),
+                   "masks": None,
+                   "mask_size": (H, W),
+                   }
+
+        if mask_format == "bits":
+            summary["masks"] = buffer[:, 10:]
+        elif mask_format == "uint8":
+            summary["masks"] = buffer[:, 10:].reshape(N, H, W).view(bool)
+
+        return summary
+
+    @staticmethod
+    def unpack_masks(summary: Dict[str, Any]) -> np.ndarray:
+        """Unpacks the bit masks of `summarize_masks` to a (N, H, W) bool array."""
+        H, W = summary["mask_size"]
+        masks = summary["masks"]
+        if masks is None:
+            raise ValueError("The summary has no masks")
+
+        if masks.ndim == 3:
+            return masks
+
+        return np.unpackbits(masks, axis=1, count=H * W).reshape(-1, H, W).view(bool)
+
+    def get_empty_prediction(self) -> Dict:
+        """
+        Builds a prediction with zero rows, returned when no slot is occupied.
+
+        Returns
+        -------
+        prediction : Dict
+            A dictionary with the same keys as `track_all_objects`, holding empty tensors.
+
+        """
+
+        low_res_size = self.image_size // 4
+
+        prediction = {"point_inputs": None,
+                      "mask_inputs": None,
+                      "pred_masks": torch.zeros((0, 1, low_res_size, low_res_size), device=self.device),
+                      "pred_masks_high_res": torch.zeros((0, 1, self.image_size, self.image_size), device=self.device),
+                      "obj_ptr": torch.zeros((0, self.hidden_dim), device=self.device),
+                      "object_score_logits": torch.zeros((0, 1), device=self.device),
+                      "ious": torch.zeros((0,), device=self.device),
+                      "kf_ious": torch.zeros((0,), device=self.device),
+                      "maskmem_features": None,
+                      "maskmem_pos_enc": None,
+                      "obj_ids": [],
+                      }
+
+        return prediction
+
     def get_mask_inputs(self, mask: np.ndarray) -> torch.Tensor:
         """
         Process and prepare mask inputs for the model, resizing them if necessary
@@ -860,8 +1537,8 @@ class SAM2ObjectTracker(SAM2Base):
         Returns
         -------
         mask_inputs : torch.Tensor
-            A tensor of shape (num_objects, 1, image_size, image_size) containing
-            the processed mask inputs, ready for the model.
+            A tensor of shape (n, 1, image_size, image_size) containing
+            the processed mask inputs of the new objects, ready for the model.
 
         """
 
@@ -875,7 +1552,7 @@ class SAM2ObjectTracker(SAM2Base):
             # Case: Multiple masks (n, height, width)
             mask = mask[:, None]  # Add channel dimension -> (n, 1, height, width)
 
-        num_masks, mask_H, mask_W = mask.shape[0], mask.shape[2], mask.shape[3]
+        mask_H, mask_W = mask.shape[2], mask.shape[3]
 
         # resize the mask if it doesn't match the model's image size
         if mask_H != self.image_size or mask_W != self.image_size:
@@ -886,14 +1563,8 @@ class SAM2ObjectTracker(SAM2Base):
                                                    antialias=True,  # use antialias for downsampling
                                                    )
             mask = mask >= 0.5
-            mask = mask.to(self.device, dtype=torch.bfloat16, non_blocking=True)
-
-        mask_inputs = torch.zeros((self.num_objects, 1, mask.shape[2], mask.shape[3]),
-                                  device=self.device,
-                                  dtype=torch.bfloat16
-                                  )
 
-        mask_inputs[self.curr_obj_idx:self.curr_obj_idx + num_masks] = mask
+        mask_inputs = mask.to(self.device, dtype=torch.bfloat16, non_blocking=True)
 
         return mask_inputs
 
@@ -916,9 +1587,9 @@ class SAM2ObjectTracker(SAM2Base):
         -------
         point_inputs : Dict
             A dictionary with the following keys:
-            - "point_coords": A tensor of shape (num_objects, k, 2) containing point coordinates
+            - "point_coords": A tensor of shape (n, k, 2) containing point coordinates
               scaled to the model's image size.
-            - "point_labels": A tensor of shape (num_objects, l) containing point labels.
+            - "point_labels": A tensor of shape (n, l) containing point labels.
 
         """
 
@@ -944,18 +1615,10 @@ class SAM2ObjectTracker(SAM2Base):
 
         point = point.to(device=self.device, dtype=torch.float32, non_blocking=True)
 
-        # Allocate tensors outside of the conditional block
-        points = torch.zeros((self.num_objects, point.shape[1], point.shape[2]), device=self.device, dtype=torch.float32)
-        labels = torch.zeros((self.num_objects, label.shape[1]), device=self.device, dtype=torch.int32)
-
-        # Assign values to the current index
-        points[self.curr_obj_idx:self.curr_obj_idx + points.shape[0]] = point
-        labels[self.curr_obj_idx:self.curr_obj_idx + label.shape[0]] = label
-
         # Scale the (normalized) coordinates by the model's internal image size
-        points = points * self.image_size
+        points = point * self.image_size
 
-        point_inputs = {"point_coords": points, "point_labels": labels}
+        point_inputs = {"point_coords": points, "point_labels": label}
 
         return point_inputs
 
@@ -965,7 +1628,8 @@ class SAM2ObjectTracker(SAM2Base):
                          img: Union[np.ndarray, torch.Tensor],
                          points: Optional[np.ndarray] = None,
                          box: Optional[np.ndarray] = None,
-                         mask: Optional[np.ndarray] = None
+                         mask: Optional[np.ndarray] = None,
+                         bgr: bool = False
                          ) -> Dict:
 
         """
@@ -986,6 +1650,9 @@ class SAM2ObjectTracker(SAM2Base):
         mask : np.ndarray, optional
             Array of masks, shape (n, height, width).
 
+        bgr : bool, optional
+            Whether a NumPy image is in BGR channel order (e.g. straight from OpenCV).
+
         Returns
         -------
         prediction : Dict[str, torch.Tensor]
@@ -995,34 +1662,51 @@ class SAM2ObjectTracker(SAM2Base):
             - "pred_masks": Predicted masks for the new objects.
             - "obj_ptr": Object pointers for the tracked objects.
             - "object_score_logits": Object score logits.
+            - "obj_ids": Object ids assigned to the new objects, one per row.
+
+        Notes
+        -----
+        Only the new objects are computed. They are encoded without memory conditioning
+        (like an initial frame) and their slots are appended to the memory bank. Prompts are
+        always encoded at the model's native `image_size`.
 
         """
 
         if isinstance(img, np.ndarray):
             img_height, img_width = img.shape[0:2]
-            img = self.preprocess_image(img=img)
+            img = self.preprocess_image(img=img, bgr=bgr)
 
         else:
             img_height, img_width = img.shape[-2:]
+            if img.shape[-1] != self.image_size:
+                raise ValueError(f"New objects must be prompted on a {self.image_size}x{self.image_size} "
+                                 f"input, got {tuple(img.shape[-2:])}")
 
         num_new_objects = 0
 
         if mask is not None:
-            num_new_objects += mask.shape[0]
+            num_new_objects += mask.shape[0] if mask.ndim == 3 else 1
 
             mask_inputs = self.get_mask_inputs(mask=mask)
             point_inputs = None
 
         else:
-            num_new_objects += box.shape[0] if box is not None else points.shape[0]
+            num_new_objects += (box.shape[0] if box.ndim == 3 else 1) if box is not None else \
+                (points.shape[0] if points.ndim == 3 else 1)
 
             mask_inputs = None
             point_inputs = self.get_point_inputs(box=box, points=points)
             normalization = torch.tensor([img_width, img_height], device=self.device)
             point_inputs['point_coords'] = point_inputs['point_coords'] / normalization
 
+        if self.curr_obj_idx + num_new_objects > self.num_objects:
+            raise ValueError(f"Cannot track {num_new_objects} new object(s): "
+                             f"{self.curr_obj_idx}/{self.num_objects} slots are already occupied")
+
+        new_obj_ids = list(range(self.next_obj_id, self.next_obj_id + num_new_objects))
+
         """Run tracking on a single frame based on current inputs and previous memory."""
-        current_vision_feats, current_vision_pos_embeds, feat_sizes = self.get_image_features(img)
+        current_vision_feats, current_vision_pos_embeds, feat_sizes = self.get_image_features(img, num_rows=num_new_objects)
         prediction = self.inference(current_vision_feats=current_vision_feats,
                                     current_vision_pos_embeds=current_vision_pos_embeds,
                                     feat_sizes=feat_sizes,
@@ -1030,17 +1714,28 @@ class SAM2ObjectTracker(SAM2Base):
                                     mask_inputs=mask_inputs,
                                     run_mem_encoder=True,
                                     prev_sam_mask_logits=None,
+                                    obj_ids=new_obj_ids,
+                                    use_memory=False,
                                     )
 
-        self.curr_obj_idx += num_new_objects
+        self.add_objects_to_memory_bank(prediction=prediction)
+
+        self.obj_ids.extend(new_obj_ids)
+        self.next_obj_id += num_new_objects
+        self.curr_obj_idx = len(self.obj_ids)
 
-        self.update_memory_bank(prediction=prediction)
+        prediction["obj_ids"] = new_obj_ids
 
         return prediction
 
 
     @torch.inference_mode()
-    def track_all_objects(self, img: Union[np.ndarray, torch.Tensor]) -> Dict:
+    def track_all_objects(self,
+                          img: Union[np.ndarray, torch.Tensor],
+                          bgr: bool = False,
+                          backbone_out: Optional[Dict] = None,
+                          input_size: Optional[int] = None
+                          ) -> Dict:
         """
         Tracks all objects in a given image and updates the memory bank with the predicted results.
 
@@ -1050,6 +1745,17 @@ class SAM2ObjectTracker(SAM2Base):
             The input image to be processed. It can be a NumPy array (H, W, C) or a preprocessed
             torch.Tensor (1, C, H, W). If a NumPy array is provided, it will be preprocessed.
 
+        bgr : bool, optional
+            Whether a NumPy image is in BGR channel order (e.g. straight from OpenCV).
+
+        backbone_out : Dict, optional
+            A precomputed `forward_image` output for this frame, see `get_image_features`.
+
+        input_size : int, optional
+            Square input size a NumPy image is resized to. Defaults to `select_input_size()`,
+            which is `image_size` unless the adaptive resolution mode is enabled. Region-of-interest
+            tracking is only used when the input size is not given.
+
         Returns
         -------
         prediction : Dict[str, torch.Tensor]
@@ -1059,45 +1765,88 @@ class SAM2ObjectTracker(SAM2Base):
             - "pred_masks": Predicted masks for all tracked objects.
             - "obj_ptr": Object pointers for the tracked objects.
             - "object_score_logits": Object score logits.
+            - "obj_ids": Object id of each row.
 
-        """
-
-        start_time = time.time()
-
-        # Prepare image for inference
-        if isinstance(img, np.ndarray):
-            img = self.preprocess_image(img=img)
+            Only the occupied slots are computed, so all tensors have `curr_obj_idx` rows.
+            The masks have the input resolution of the frame (`input_size`, or a quarter of it
+            for "pred_masks"). The masks of a cropped frame are mapped back to the full frame
+            at `image_size`.
 
-        preprocess_time = time.time() - start_time
-        start_time = time.time()
+        """
 
-        # Retrieve image features
-        current_vision_feats, current_vision_pos_embeds, feat_sizes = self.get_image_features(img)
+        frame_start_time = time.time()
 
-        image_embedding_time = time.time() - start_time
-        start_time = time.time()
+        if self.verbose and not self.profiler.enabled:
+            self.enable_profiling()
 
-        prediction = self.inference(current_vision_feats=current_vision_feats,
-                                    current_vision_pos_embeds=current_vision_pos_embeds,
-                                    feat_sizes=feat_sizes,
-                                    point_inputs=None,
-                                    mask_inputs=None,
-                                    run_mem_encoder=True,
-                                    prev_sam_mask_logits=None
-                                    )
+        profiler = self.profiler
 
-        inference_time = time.time() - start_time
-        start_time = time.time()
+        # Prepare image for inference, either a crop around the objects or the full frame
+        input_box = None
+        with profiler.span('preprocess'):
+            if isinstance(img, np.ndarray):
+                if input_size is None:
+                    input_box = self.select_roi_window()
 
-        self.update_memory_bank(prediction=prediction)
+                if input_box is not None:
+                    img = self.preprocess_image(img=self.crop_frame(img, input_box),
+                                                bgr=bgr,
+                                                size=input_box[2] - input_box[0]
+                                                )
 
-        memory_bank_time = time.time() - start_time
+                else:
+                    input_size = self.select_input_size() if input_size is None else input_size
+                    img = self.preprocess_image(img=img, bgr=bgr, size=input_size)
+
+        if self.curr_obj_idx == 0:
+            # nothing to track, still run the backbone (e.g. for warm-up)
+            if backbone_out is None:
+                with profiler.span('backbone'):
+                    self.get_backbone_out(img)
+            profiler.end_frame()
+            return self.get_empty_prediction()
+
+        # Retrieve image features, the backbone feature cache only holds full frames
+        with profiler.span('backbone'):
+            if input_box is not None:
+                backbone_out = self.forward_image(img)
+
+            current_vision_feats, current_vision_pos_embeds, feat_sizes = self.get_image_features(img,
+                                                                                               backbone_out=backbone_out
+                                                                                               )
+
+        with profiler.span('inference'):
+            prediction = self.inference(current_vision_feats=current_vision_feats,
+                                        current_vision_pos_embeds=current_vision_pos_embeds,
+                                        feat_sizes=feat_sizes,
+                                        point_inputs=None,
+                                        mask_inputs=None,
+                                        run_mem_encoder=True,
+                                        prev_sam_mask_logits=None,
+                                        input_box=input_box
+                                        )
+
+        with profiler.span('memory_bank'):
+            self.update_memory_bank(prediction=prediction, input_box=input_box)
+            self.update_roi_state(prediction=prediction, input_box=input_box)
+
+            if input_box is not None:
+                self.paste_roi_masks(prediction=prediction, input_box=input_box)
+
+        prediction["obj_ids"] = list(self.obj_ids)
+
+        # frames and wall time per input resolution (full frames) or crop size, e.g. to report
+        # the FPS of every adaptive mode
+        stats_table = self.input_size_stats if input_box is None else self.roi_stats
+        stats = stats_table.setdefault(img.shape[-1], {'frames': 0, 'time': 0.0})
+        stats['frames'] += 1
+        stats['time'] += time.time() - frame_start_time
+
+        profiler.end_frame()
 
         if self.verbose:
-            print(f'SAM2 Tracking: {preprocess_time * 1000:.1f}ms preprocess, '
-                  f'{image_embedding_time * 1000:.1f}ms image embedding, '
-                  f'{inference_time * 1000:.1f}ms inference, '
-                  f'{memory_bank_time * 1000:.1f}ms memory bank'
+            # waits for the CUDA spans of this frame
+            print(f'SAM2 Tracking: {format_timings(profiler.last_timings(), self.PROFILER_SPANS)}'
                   f' per image at shape {img.shape}'
                   )
 
@@ -12,7 +12,12 @@ import torch
 from tqdm import tqdm
 
 from sam2.modeling.sam2_base import NO_OBJ_SCORE, SAM2Base
-from sam2.utils.misc import concat_points, fill_holes_in_mask_scores, load_video_frames
+from sam2.utils.misc import (
+    concat_points,
+    fill_holes_in_mask_scores,
+    load_video_frames,
+    StreamingVideoFrameLoader,
+)
 
 
 class SAM2VideoPredictor(SAM2Base):
@@ -47,8 +52,17 @@ class SAM2VideoPredictor(SAM2Base):
         offload_video_to_cpu=False,
         offload_state_to_cpu=False,
         async_loading_frames=False,
+        streaming_frames=False,
+        max_cached_frames=64,
+        prefetch_frames=16,
     ):
-        """Initialize an inference state."""
+        """
+        Initialize an inference state.
+
+        With `streaming_frames`, the video is not decoded up front: frames are decoded on
+        demand into an LRU cache of `max_cached_frames` uint8 frames and prefetched ahead of
+        propagation, so memory stays bounded for long videos.
+        """
         compute_device = self.device  # device of the model
         images, video_height, video_width = load_video_frames(
             video_path=video_path,
@@ -56,6 +70,9 @@ class SAM2VideoPredictor(SAM2Base):
             offload_video_to_cpu=offload_video_to_cpu,
             async_loading_frames=async_loading_frames,
             compute_device=compute_device,
+            streaming_frames=streaming_frames,
+            max_cached_frames=max_cached_frames,
+            prefetch_frames=prefetch_frames,
         )
         inference_state = {}
         inference_state["images"] = images
@@ -699,6 +716,7 @@ class SAM2VideoPredictor(SAM2Base):
                 start_frame_idx + max_frame_num_to_track, num_frames - 1
             )
             processing_order = range(start_frame_idx, end_frame_idx + 1)
+        self._set_frame_prefetch_order(inference_state, processing_order)
 
         for frame_idx in tqdm(processing_order, desc="propagate in video"):
             # We skip those frames already in consolidated outputs (these are frames
@@ -744,6 +762,111 @@ class SAM2VideoPredictor(SAM2Base):
             )
             yield frame_idx, obj_ids, video_res_masks
 
+    @torch.inference_mode()
+    def propagate_in_video_sparse(self, inference_state, target_frame_inds, stride=1):
+        """
+        Propagate the input prompts forward and only output masks on `target_frame_inds`
+        (e.g. the 8 frames sampled for DAM).
+
+        Tracking runs on every `stride`-th frame from the first conditioning frame, plus the
+        target and conditioning frames, up to the last target frame. The tracked frames are
+        treated as consecutive frames of a lower frame-rate video, so memory attention still
+        sees `num_maskmem` recent memories, and the memory encoder only runs on the frames
+        whose memory is attended by a later tracked frame. `stride="auto"` keeps about four
+        tracked frames between consecutive target frames.
+
+        The outputs are kept in a separate output dict, so the tracking results in
+        `inference_state` are not modified. Target frames before the first conditioning
+        frame are not reachable by forward propagation and are skipped.
+        """
+        self.propagate_in_video_preflight(inference_state)
+
+        cond_outputs = inference_state["output_dict"]["cond_frame_outputs"]
+        obj_ids = inference_state["obj_ids"]
+        batch_size = self._get_obj_num(inference_state)
+        if len(cond_outputs) == 0:
+            raise RuntimeError("No points are provided; please add points first")
+
+        start_frame_idx = min(cond_outputs)
+        num_frames = inference_state["num_frames"]
+        target_frame_inds = sorted(
+            {int(t) for t in target_frame_inds if start_frame_idx <= t < num_frames}
+        )
+        if len(target_frame_inds) == 0:
+            return
+        if stride == "auto":
+            gaps = [
+                b - a
+                for a, b in zip([start_frame_idx] + target_frame_inds, target_frame_inds)
+                if b > a
+            ]
+            stride = max(1, min(gaps) // 4) if len(gaps) > 0 else 1
+
+        end_frame_idx = target_frame_inds[-1]
+        processing_order = sorted(
+            set(range(start_frame_idx, end_frame_idx + 1, stride))
+            | set(target_frame_inds)
+            | {t for t in cond_outputs if t <= end_frame_idx}
+        )
+
+        # tracked frames are indexed consecutively for memory selection
+        sparse_output_dict = {
+            "cond_frame_outputs": {
+                i: cond_outputs[t]
+                for i, t in enumerate(processing_order)
+                if t in cond_outputs
+            },
+            "non_cond_frame_outputs": {},
+        }
+        memory_frame_inds = self._get_attended_memory_frames(len(processing_order))
+        self._set_frame_prefetch_order(inference_state, processing_order)
+        target_frame_inds = set(target_frame_inds)
+
+        progress = tqdm(processing_order, desc="sparse propagate in video")
+        for i, frame_idx in enumerate(progress):
+            if i in sparse_output_dict["cond_frame_outputs"]:
+                pred_masks = sparse_output_dict["cond_frame_outputs"][i]["pred_masks"]
+            else:
+                current_out, pred_masks = self._run_single_frame_inference(
+                    inference_state=inference_state,
+                    output_dict=sparse_output_dict,
+                    frame_idx=frame_idx,
+                    batch_size=batch_size,
+                    is_init_cond_frame=False,
+                    point_inputs=None,
+                    mask_inputs=None,
+                    reverse=False,
+                    run_mem_encoder=i in memory_frame_inds,
+                    track_frame_idx=i,
+                    num_frames=len(processing_order),
+                )
+                sparse_output_dict["non_cond_frame_outputs"][i] = current_out
+
+            if frame_idx in target_frame_inds:
+                _, video_res_masks = self._get_orig_video_res_output(
+                    inference_state, pred_masks
+                )
+                yield frame_idx, obj_ids, video_res_masks
+
+    def _get_attended_memory_frames(self, num_frames):
+        """
+        Indices of the frames whose memory is attended by a later frame when tracking
+        `num_frames` consecutive frames forward (mirrors the memory frame selection in
+        `_prepare_memory_conditioned_features`).
+        """
+        stride = self.memory_temporal_stride_for_eval
+        attended = set()
+        for frame_idx in range(num_frames):
+            for t_rel in range(1, self.num_maskmem):
+                if t_rel == 1:
+                    prev_frame_idx = frame_idx - 1
+                else:
+                    prev_frame_idx = ((frame_idx - 2) // stride) * stride
+                    prev_frame_idx = prev_frame_idx - (t_rel - 2) * stride
+                if 0 <= prev_frame_idx < frame_idx:
+                    attended.add(prev_frame_idx)
+        return attended
+
     def _add_output_per_object(
         self, inference_state, frame_idx, current_out, storage_key
     ):
@@ -876,6 +999,12 @@ class SAM2VideoPredictor(SAM2Base):
         inference_state["tracking_has_started"] = False
         inference_state["frames_already_tracked"].clear()
 
+    def _set_frame_prefetch_order(self, inference_state, processing_order):
+        """Let a streaming frame loader decode the frames ahead of tracking."""
+        images = inference_state["images"]
+        if isinstance(images, StreamingVideoFrameLoader):
+            images.set_prefetch_order(processing_order)
+
     def _get_image_feature(self, inference_state, frame_idx, batch_size):
         """Compute the image features on a given frame."""
         # Look up in the cache first
@@ -921,8 +1050,16 @@ class SAM2VideoPredictor(SAM2Base):
         reverse,
         run_mem_encoder,
         prev_sam_mask_logits=None,
+        track_frame_idx=None,
+        num_frames=None,
     ):
-        """Run tracking on a single frame based on current inputs and previous memory."""
+        """
+        Run tracking on a single frame based on current inputs and previous memory.
+
+        `track_frame_idx` and `num_frames` override the frame index and the number of frames
+        used for memory selection (e.g. in sparse propagation); by default they are the
+        video frame index and length.
+        """
         # Retrieve correct image features
         (
             _,
@@ -935,7 +1072,7 @@ class SAM2VideoPredictor(SAM2Base):
         # point and mask should not appear as input simultaneously on the same frame
         assert point_inputs is None or mask_inputs is None
         current_out = self.track_step(
-            frame_idx=frame_idx,
+            frame_idx=frame_idx if track_frame_idx is None else track_frame_idx,
             is_init_cond_frame=is_init_cond_frame,
             current_vision_feats=current_vision_feats,
             current_vision_pos_embeds=current_vision_pos_embeds,
@@ -943,7 +1080,7 @@ class SAM2VideoPredictor(SAM2Base):
             point_inputs=point_inputs,
             mask_inputs=mask_inputs,
             output_dict=output_dict,
-            num_frames=inference_state["num_frames"],
+            num_frames=inference_state["num_frames"] if num_frames is None else num_frames,
             track_in_reverse=reverse,
             run_mem_encoder=run_mem_encoder,
             prev_sam_mask_logits=prev_sam_mask_logits,
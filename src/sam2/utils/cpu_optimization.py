@@ -0,0 +1,92 @@
+import logging
+from typing import Optional
+
+import torch
+import torch.nn as nn
+
+# transformer blocks whose Linear layers dominate CPU time
+QUANTIZED_SUBMODULES = ("image_encoder", "memory_attention", "sam_mask_decoder.transformer")
+
+# convolution stacks run in channels-last; the mask decoder is left contiguous because it
+# reshapes its upscaled conv output with .view()
+CHANNELS_LAST_SUBMODULES = ("image_encoder", "memory_encoder")
+
+
+def configure_cpu_threads(num_threads: Optional[int] = None, num_interop_threads: Optional[int] = None):
+    """
+    Sets the intra-op / inter-op thread counts and oneDNN options for CPU inference.
+
+    `torch.set_num_interop_threads` can only be called once per process, before any inter-op work,
+    so failures are logged and ignored.
+
+    """
+
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+
+    if num_interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError as e:
+            logging.warning(f"Could not set inter-op threads: {e}")
+
+    # oneDNN kernels for convolutions, and no denormal slow paths
+    torch.backends.mkldnn.enabled = True
+    torch.set_flush_denormal(True)
+
+
+def optimize_for_cpu(model: nn.Module,
+                     quantize: bool = True,
+                     channels_last: bool = True,
+                     num_threads: Optional[int] = None,
+                     num_interop_threads: Optional[int] = None
+                     ) -> nn.Module:
+    """
+    Prepares an eval-mode SAM2 model for CPU-only inference.
+
+    Parameters
+    ----------
+    model : nn.Module
+        The SAM2 model, already on the CPU and in eval mode.
+
+    quantize : bool, optional
+        Apply dynamic INT8 quantization (int8 weights, activations quantized per batch at runtime)
+        to the Linear layers of the image encoder, memory attention and mask decoder transformer.
+
+    channels_last : bool, optional
+        Convert the convolution weights of the image and memory encoders to channels-last memory
+        format, which the oneDNN convolution kernels prefer. Input images are converted by the tracker.
+
+    num_threads : int, optional
+        Intra-op thread count, e.g. the number of physical cores.
+
+    num_interop_threads : int, optional
+        Inter-op thread count.
+
+    Returns
+    -------
+    nn.Module
+        The optimized model (modified in place).
+
+    """
+
+    configure_cpu_threads(num_threads, num_interop_threads)
+
+    if channels_last:
+        for name in CHANNELS_LAST_SUBMODULES:
+            submodule = getattr(model, name, None)
+            if submodule is not None:
+                submodule.to(memory_format=torch.channels_last)
+        model.channels_last = True
+
+    if quantize:
+        for name in QUANTIZED_SUBMODULES:
+            parent, _, attr = name.rpartition(".")
+            owner = model.get_submodule(parent) if parent else model
+            submodule = getattr(owner, attr, None)
+            if submodule is None:
+                continue
+            quantized = torch.ao.quantization.quantize_dynamic(submodule, {nn.Linear}, dtype=torch.qint8)
+            setattr(owner, attr, quantized)
+
+    return model
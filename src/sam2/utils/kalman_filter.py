@@ -84,6 +84,45 @@ class KalmanFilter(object):
         covariance = np.diag(np.square(std))
         return mean, covariance
 
+    @staticmethod
+    def _batched_diag(values):
+        """Stack the rows of an NxD matrix into N diagonal DxD matrices."""
+        n, d = values.shape
+        out = np.zeros((n, d, d), dtype=values.dtype)
+        out[:, np.arange(d), np.arange(d)] = values
+        return out
+
+    def multi_initiate(self, measurements):
+        """Create tracks from unassociated measurements (Vectorized version).
+
+        Parameters
+        ----------
+        measurements : ndarray
+            The Nx4 dimensional matrix of bounding box coordinates (x, y, a, h).
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the Nx8 dimensional mean matrix and the Nx8x8 dimensional
+            covariance matrices of the new tracks.
+
+        """
+        measurements = np.asarray(measurements, dtype=np.float64)
+        mean = np.concatenate([measurements, np.zeros_like(measurements)], axis=1)
+
+        h = measurements[:, 3]
+        std = np.stack([
+            2 * self._std_weight_position * h,
+            2 * self._std_weight_position * h,
+            1e-2 * np.ones_like(h),
+            2 * self._std_weight_position * h,
+            10 * self._std_weight_velocity * h,
+            10 * self._std_weight_velocity * h,
+            1e-5 * np.ones_like(h),
+            10 * self._std_weight_velocity * h], axis=1)
+        covariance = self._batched_diag(np.square(std))
+        return mean, covariance
+
     def predict(self, mean, covariance):
         """Run Kalman filter prediction step.
 
@@ -151,6 +190,34 @@ class KalmanFilter(object):
             self._update_mat, covariance, self._update_mat.T))
         return mean, covariance + innovation_cov
 
+    def multi_project(self, mean, covariance):
+        """Project state distributions to measurement space (Vectorized version).
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional mean matrix of the object states.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices of the object states.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the Nx4 projected means and Nx4x4 covariance matrices.
+
+        """
+        h = mean[:, 3]
+        std = np.stack([
+            self._std_weight_position * h,
+            self._std_weight_position * h,
+            1e-1 * np.ones_like(h),
+            self._std_weight_position * h], axis=1)
+        innovation_cov = self._batched_diag(np.square(std))
+
+        mean = np.dot(mean, self._update_mat.T)
+        covariance = self._update_mat @ covariance @ self._update_mat.T
+        return mean, covariance + innovation_cov
+
     def multi_predict(self, mean, covariance):
         """Run Kalman filter prediction step (Vectorized version).
         Parameters
@@ -179,10 +246,7 @@ class KalmanFilter(object):
             self._std_weight_velocity * mean[:, 3]]
         sqr = np.square(np.r_[std_pos, std_vel]).T
 
-        motion_cov = []
-        for i in range(len(mean)):
-            motion_cov.append(np.diag(sqr[i]))
-        motion_cov = np.asarray(motion_cov)
+        motion_cov = self._batched_diag(sqr)
 
         mean = np.dot(mean, self._motion_mat.T)
         left = np.dot(self._motion_mat, covariance).transpose((1, 0, 2))
@@ -224,6 +288,35 @@ class KalmanFilter(object):
             kalman_gain, projected_cov, kalman_gain.T))
         return new_mean, new_covariance
 
+    def multi_update(self, mean, covariance, measurement):
+        """Run Kalman filter correction step (Vectorized version).
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional mean matrix of the predicted states.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices of the states.
+        measurement : ndarray
+            The Nx4 dimensional matrix of measurements (x, y, a, h).
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the measurement-corrected state distributions.
+
+        """
+        projected_mean, projected_cov = self.multi_project(mean, covariance)
+
+        # K = P H^T S^-1, solved for all states at once
+        kalman_gain = np.linalg.solve(
+            projected_cov, (covariance @ self._update_mat.T).transpose(0, 2, 1)).transpose(0, 2, 1)
+        innovation = measurement - projected_mean
+
+        new_mean = mean + np.einsum('nij,nj->ni', kalman_gain, innovation)
+        new_covariance = covariance - kalman_gain @ projected_cov @ kalman_gain.transpose(0, 2, 1)
+        return new_mean, new_covariance
+
     def gating_distance(self, mean, covariance, measurements,
                         only_position=False, metric='maha'):
         """Compute gating distance between state distribution and measurements.
@@ -305,6 +398,48 @@ class KalmanFilter(object):
         iou = intersection_area / union_area if union_area != 0 else 0
         return iou
 
+    def multi_compute_iou(self, pred_bboxes, bboxes):
+        """
+        Compute the IoU between each predicted bbox and its candidate bboxes (Vectorized version).
+        Parameters
+        ----------
+        pred_bboxes : ndarray
+            The Nx4 dimensional matrix of predicted boxes in the format (x, y, a, h).
+        bboxes : ndarray
+            The NxMx4 dimensional array of candidate boxes in the format [x1, y1, x2, y2].
+            Empty boxes [0, 0, 0, 0] have an IoU of 0.
+        Returns
+        -------
+        ndarray
+            The NxM dimensional matrix of IoUs.
+        """
+        pred_bboxes = self.multi_xyah_to_xyxy(pred_bboxes)[:, None]
+        bboxes = np.asarray(bboxes, dtype=np.float64)
+
+        x1, y1, x2, y2 = np.moveaxis(pred_bboxes, -1, 0)
+        x1_, y1_, x2_, y2_ = np.moveaxis(bboxes, -1, 0)
+        # Calculate intersection area
+        intersection_area = np.clip(np.minimum(x2, x2_) - np.maximum(x1, x1_), 0, None) * \
+            np.clip(np.minimum(y2, y2_) - np.maximum(y1, y1_), 0, None)
+        # Calculate union area
+        union_area = (x2 - x1) * (y2 - y1) + (x2_ - x1_) * (y2_ - y1_) - intersection_area
+        # Calculate IoU
+        ious = np.divide(intersection_area, union_area, out=np.zeros_like(intersection_area), where=union_area != 0)
+        ious[~bboxes.any(axis=-1)] = 0
+        return ious
+
+    def multi_xyxy_to_xyah(self, bboxes):
+        bboxes = np.asarray(bboxes, dtype=np.float64)
+        x1, y1, x2, y2 = np.moveaxis(bboxes, -1, 0)
+        w = x2 - x1
+        h = y2 - y1
+        h = np.where(h == 0, 1, h)
+        return np.stack([(x1 + x2) / 2, (y1 + y2) / 2, w / h, h], axis=-1)
+
+    def multi_xyah_to_xyxy(self, bboxes):
+        xc, yc, a, h = np.moveaxis(np.asarray(bboxes, dtype=np.float64), -1, 0)
+        return np.stack([xc - a * h / 2, yc - h / 2, xc + a * h / 2, yc + h / 2], axis=-1)
+
     def xyxy_to_xyah(self, bbox):
         x1, y1, x2, y2 = bbox
         xc = (x1 + x2) / 2
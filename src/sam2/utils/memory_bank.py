@@ -0,0 +1,334 @@
+from collections import deque
+from typing import List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+
+
+class MemoryBank(object):
+    """
+    A ring-buffer memory bank for SAM2ObjectTracker backed by preallocated device tensors.
+
+    The short-term and long-term memories share a pool of T = `short_term_size + long_term_size`
+    physical slots. Each slot holds the encoded mask memory and the object pointer of one frame
+    for all objects. Both are stored in a single tensor already laid out as the memory attention
+    input:
+
+        memory[:T * HW]    spatial memory tokens, slot t at rows [t * HW, (t + 1) * HW)
+        memory[T * HW:]    object pointer tokens, slot t at rows [T * HW + t * k, T * HW + (t + 1) * k)
+
+    where k is the number of tokens an object pointer is split into (C // mem_dim). Once every slot
+    is occupied the memory attention input is a view of this tensor; while the bank is filling up
+    it is a single index_select.
+
+    Moving a frame from short-term to long-term memory only moves its slot index between
+    the two deques; the tensors are never copied.
+
+    The spatial memories are stored on the feature grid of the first written frame. Memories
+    encoded at another input resolution are resampled to that grid when written, and read back
+    resampled to the grid of the current frame, so the bank stays consistent when the tracker
+    changes its input resolution.
+
+    Frames encoded from a crop of the full frame at the same pixel density (region-of-interest
+    tracking) use a window (y0, x0, h, w) of the grid instead: their memories are pasted into the
+    window on top of a copy of the newest frame, and read back by slicing the window.
+
+    """
+
+    def __init__(self,
+                 short_term_size: int = 7,
+                 long_term_size: int = 7,
+                 max_objects: int = 10,
+                 long_term_score_threshold: float = 5.0
+                 ):
+
+        self.short_term_size = short_term_size
+        self.long_term_size = long_term_size
+        self.num_slots = short_term_size + long_term_size
+        self.max_objects = max_objects
+        self.long_term_score_threshold = long_term_score_threshold
+
+        # slot indices, oldest first
+        self.short_term = deque()
+        self.long_term = deque()
+        self.free_slots = list(reversed(range(self.num_slots)))
+
+        # number of occupied object rows in every slot
+        self.num_rows = 0
+
+        # lazily allocated on the first write, once shapes / device / dtype are known
+        self.memory = None  # (T * HW + T * k, max_objects, mem_dim)
+        self.object_score_logits = None  # (T, max_objects, 1)
+        self.spatial_pos = None  # (HW, 1, mem_dim), identical for every frame and object
+        self.hw = 0
+        self.feat_size = None  # (H, W) of the stored spatial memories
+        self.ptr_tokens = 0
+
+        self._index_cache = {}
+
+    def __len__(self):
+        return len(self.short_term) + len(self.long_term)
+
+    def is_empty(self) -> bool:
+        return len(self) == 0
+
+    def clear(self):
+        """Drops every stored frame. The buffers are kept for reuse."""
+        self.short_term.clear()
+        self.long_term.clear()
+        self.free_slots = list(reversed(range(self.num_slots)))
+        self.num_rows = 0
+
+    def _allocate(self, maskmem_features: torch.Tensor, maskmem_pos_enc: torch.Tensor, obj_ptr: torch.Tensor):
+        _, mem_dim, H, W = maskmem_features.shape
+        device, dtype = maskmem_features.device, maskmem_features.dtype
+
+        self.hw = H * W
+        self.feat_size = (H, W)
+        self.ptr_tokens = max(obj_ptr.shape[-1] // mem_dim, 1)
+
+        num_tokens = self.num_slots * (self.hw + self.ptr_tokens)
+        self.memory = torch.zeros((num_tokens, self.max_objects, mem_dim), device=device, dtype=dtype)
+        self.object_score_logits = torch.zeros((self.num_slots, self.max_objects, 1), device=device)
+
+        # the memory encoder's sine position encoding only depends on the feature map size
+        self.spatial_pos = maskmem_pos_enc[:1].flatten(2).permute(2, 0, 1).to(device, dtype).contiguous()
+
+    def _write(self, slot: int, rows: slice,
+               maskmem_features: torch.Tensor,
+               obj_ptr: torch.Tensor,
+               object_score_logits: torch.Tensor,
+               window: Optional[Tuple[int, int, int, int]] = None,
+               base_slot: Optional[int] = None
+               ):
+        B, mem_dim = maskmem_features.shape[:2]
+        H, W = self.feat_size
+
+        spatial = self.memory[slot * self.hw:(slot + 1) * self.hw, rows]
+
+        if window is not None:
+            # the frame outside the window is taken from the newest stored frame
+            if base_slot is not None and base_slot != slot:
+                spatial.copy_(self.memory[base_slot * self.hw:(base_slot + 1) * self.hw, rows])
+
+            y0, x0, h, w = window
+            assert tuple(maskmem_features.shape[-2:]) == (h, w), "Window does not match the memory features"
+            spatial.view(H, W, B, mem_dim)[y0:y0 + h, x0:x0 + w].copy_(maskmem_features.permute(2, 3, 0, 1),
+                                                                       non_blocking=True)
+
+        else:
+            if tuple(maskmem_features.shape[-2:]) != self.feat_size:
+                maskmem_features = resize_feature_map(maskmem_features, self.feat_size)
+
+            # (B, C, H, W) => (HW, B, C), written in place into the slot
+            spatial.copy_(maskmem_features.flatten(2).permute(2, 0, 1), non_blocking=True)
+
+        # split a pointer into k tokens: (B, k * C) => (k, B, C)
+        ptr_start = self.num_slots * self.hw + slot * self.ptr_tokens
+        pointer = self.memory[ptr_start:ptr_start + self.ptr_tokens, rows]
+        pointer.copy_(obj_ptr.reshape(B, self.ptr_tokens, mem_dim).permute(1, 0, 2), non_blocking=True)
+
+        self.object_score_logits[slot, rows].copy_(object_score_logits.view(-1, 1), non_blocking=True)
+
+    def append(self,
+               maskmem_features: torch.Tensor,
+               maskmem_pos_enc: List[torch.Tensor],
+               obj_ptr: torch.Tensor,
+               object_score_logits: torch.Tensor,
+               window: Optional[Tuple[int, int, int, int]] = None
+               ):
+        """
+        Adds a frame to short-term memory and, under specific conditions, moves the oldest
+        short-term frame to long-term memory.
+
+        Parameters
+        ----------
+        maskmem_features : torch.Tensor
+            Memory features of shape (B, C, H, W), one row per occupied object slot.
+
+        maskmem_pos_enc : List[torch.Tensor]
+            Positional encodings of the memory features, the last level is used.
+
+        obj_ptr : torch.Tensor
+            Object pointers of shape (B, C).
+
+        object_score_logits : torch.Tensor
+            Object score logits of shape (B, 1).
+
+        window : Tuple[int, int, int, int], optional
+            The (y0, x0, h, w) grid window the memory features were encoded from, for frames
+            cropped around the objects. None for full frames.
+
+        Notes
+        -----
+        - The oldest short-term frame is kept in long-term memory if any of its object score
+          logits is greater than `long_term_score_threshold`, i.e. the objects were not occluded.
+
+        """
+
+        B = maskmem_features.shape[0]
+
+        if self.memory is None:
+            assert window is None, "The first frame of the memory bank must be a full frame"
+            self._allocate(maskmem_features, maskmem_pos_enc[-1], obj_ptr)
+
+        if self.is_empty():
+            self.num_rows = B
+
+        assert B == self.num_rows, f"Expected {self.num_rows} object rows, got {B}"
+        assert window is None or not self.is_empty(), "A cropped frame needs a stored frame to paste into"
+
+        newest = self.short_term[-1] if self.short_term else None
+
+        if len(self.short_term) == self.short_term_size:
+            oldest = self.short_term.popleft()
+            not_occluded = (self.object_score_logits[oldest, :B] > self.long_term_score_threshold).any()
+
+            if not_occluded:
+                if len(self.long_term) == self.long_term_size:
+                    self.free_slots.append(self.long_term.popleft())
+                self.long_term.append(oldest)
+
+            else:
+                self.free_slots.append(oldest)
+
+        slot = self.free_slots.pop()
+        self._write(slot, slice(0, B), maskmem_features, obj_ptr, object_score_logits, window, newest)
+        self.short_term.append(slot)
+
+    def add_rows(self,
+                 maskmem_features: torch.Tensor,
+                 obj_ptr: torch.Tensor,
+                 object_score_logits: torch.Tensor
+                 ):
+        """
+        Scatters the memory of newly added objects into every stored frame.
+
+        The new objects have no history, so their prompted memory is written into the new rows
+        of every occupied slot. The rows of the existing objects are left unchanged.
+
+        """
+
+        n = maskmem_features.shape[0]
+        assert self.num_rows + n <= self.max_objects, "Memory bank has no free object rows"
+
+        rows = slice(self.num_rows, self.num_rows + n)
+        for slot in list(self.long_term) + list(self.short_term):
+            self._write(slot, rows, maskmem_features, obj_ptr, object_score_logits)
+
+        self.num_rows += n
+
+    def remove_row(self, row: int):
+        """Removes an object row from every slot by shifting the following rows up."""
+        B = self.num_rows
+
+        if B == 1:
+            self.clear()
+            return
+
+        self.memory[:, row:B - 1].copy_(self.memory[:, row + 1:B].clone())
+        self.object_score_logits[:, row:B - 1].copy_(self.object_score_logits[:, row + 1:B].clone())
+
+        self.num_rows -= 1
+
+    def memory_slots(self) -> Tuple[List[int], List[int]]:
+        """
+        Returns the occupied slots in physical order and their temporal positions.
+
+        Long-term frames have temporal position 0 and short-term frames 1..len(short_term),
+        oldest first. Memory attention treats every frame as one block of HW tokens with the
+        same RoPE frequencies, so the order of the blocks does not change its output and the
+        physical slot order is used to keep the memory a view.
+
+        """
+
+        t_pos = {slot: 0 for slot in self.long_term}
+        t_pos.update({slot: i + 1 for i, slot in enumerate(self.short_term)})
+        slots = sorted(t_pos)
+
+        return slots, [t_pos[slot] for slot in slots]
+
+    def pointer_slots(self, max_obj_ptrs: int) -> Tuple[List[int], List[int]]:
+        """
+        Returns the slots whose object pointers are used and their pointer positions.
+
+        Short-term pointers are taken newest first (position 1 is the newest frame) up to
+        `max_obj_ptrs - len(long_term)`, followed by all long-term pointers, newest first.
+        Object pointer tokens are excluded from RoPE, so they are also returned in physical order.
+
+        """
+
+        pos = {}
+        num_short = max(0, max_obj_ptrs - len(self.long_term))
+        for p in range(1, min(num_short, len(self.short_term)) + 1):
+            pos[self.short_term[len(self.short_term) - p]] = p
+
+        for p in range(1, len(self.long_term) + 1):
+            pos[self.long_term[len(self.long_term) - p]] = p
+
+        slots = sorted(pos)
+
+        return slots, [pos[slot] for slot in slots]
+
+    def get_memory(self,
+                   slots: List[int],
+                   ptr_slots: List[int],
+                   feat_size: Optional[Tuple[int, int]] = None,
+                   window: Optional[Tuple[int, int, int, int]] = None
+                   ) -> torch.Tensor:
+        """
+        Memory attention input for the given slots, shape (len(slots) * HW + len(ptr_slots) * k, B, C).
+
+        The spatial tokens of `slots` come first, followed by the object pointer tokens of `ptr_slots`.
+        If a (y0, x0, h, w) `window` is given, only the spatial tokens inside it are returned.
+        Otherwise, if `feat_size` differs from the stored grid, the spatial tokens are resampled to it.
+
+        """
+
+        memory = self._gather(slots, ptr_slots)
+        T, B, C = len(slots), memory.shape[1], memory.shape[2]
+        H, W = self.feat_size
+
+        if window is not None:
+            y0, x0, h, w = window
+            spatial = memory[:T * self.hw].view(T, H, W, B, C)[:, y0:y0 + h, x0:x0 + w].reshape(-1, B, C)
+            return torch.cat([spatial, memory[T * self.hw:]], dim=0)
+
+        if feat_size is None or tuple(feat_size) == self.feat_size:
+            return memory
+
+        # (T * H * W, B, C) => (T * B, C, H, W), resample, and back
+        spatial = memory[:T * self.hw].view(T, H, W, B, C).permute(0, 3, 4, 1, 2).reshape(T * B, C, H, W)
+        spatial = resize_feature_map(spatial, feat_size)
+        spatial = spatial.view(T, B, C, -1).permute(0, 3, 1, 2).reshape(-1, B, C)
+
+        return torch.cat([spatial, memory[T * self.hw:]], dim=0)
+
+    def _gather(self, slots: List[int], ptr_slots: List[int]) -> torch.Tensor:
+        memory = self.memory[:, :self.num_rows]
+
+        all_slots = list(range(self.num_slots))
+        if slots == all_slots and ptr_slots in (all_slots, []):
+            num_tokens = self.num_slots * (self.hw + (self.ptr_tokens if ptr_slots else 0))
+            return memory[:num_tokens]
+
+        key = (tuple(slots), tuple(ptr_slots))
+        if key not in self._index_cache:
+            if len(self._index_cache) >= 64:
+                self._index_cache.clear()
+
+            ptr_offset = self.num_slots * self.hw
+            index = [torch.arange(slot * self.hw, (slot + 1) * self.hw) for slot in slots]
+            index += [torch.arange(ptr_offset + slot * self.ptr_tokens, ptr_offset + (slot + 1) * self.ptr_tokens)
+                      for slot in ptr_slots]
+            self._index_cache[key] = torch.cat(index).to(memory.device)
+
+        return memory.index_select(0, self._index_cache[key])
+
+
+def resize_feature_map(x: torch.Tensor, size: Tuple[int, int]) -> torch.Tensor:
+    """Bilinearly resamples a (N, C, H, W) feature map, antialiased when downsampling."""
+    downsampling = size[0] < x.shape[-2] or size[1] < x.shape[-1]
+    resized = F.interpolate(x.float(), size=tuple(size), mode="bilinear", align_corners=False, antialias=downsampling)
+
+    return resized.to(x.dtype)
@@ -6,7 +6,8 @@
 
 import os
 import warnings
-from threading import Thread
+from collections import OrderedDict
+from threading import Condition, Lock, Thread
 
 import numpy as np
 import torch
@@ -169,6 +170,195 @@ class AsyncVideoFrameLoader:
         return len(self.images)
 
 
+class StreamingVideoFrameLoader:
+    """
+    A list of video frames that are decoded on demand with bounded memory.
+
+    Frames are decoded at `image_size` and kept as uint8 in an LRU cache of at most
+    `max_cached_frames` frames; they are converted to float and normalized only when
+    accessed. A background thread decodes up to `prefetch_frames` frames ahead along the
+    order given by `set_prefetch_order` (by default the frames in increasing order), so
+    peak memory does not grow with the video length.
+
+    Both video files (decoded with decord) and JPEG folders (`img_paths`) are supported.
+    """
+
+    def __init__(
+        self,
+        image_size,
+        offload_video_to_cpu,
+        img_mean,
+        img_std,
+        compute_device,
+        video_path=None,
+        img_paths=None,
+        max_cached_frames=64,
+        prefetch_frames=16,
+        decode_batch_size=8,
+    ):
+        assert (video_path is None) != (img_paths is None)
+        self.image_size = image_size
+        self.offload_video_to_cpu = offload_video_to_cpu
+        self.compute_device = compute_device
+        self.img_paths = img_paths
+        self.max_cached_frames = max(max_cached_frames, 2)
+        # the prefetched frames must fit in the cache next to the frame being used
+        self.prefetch_frames = min(prefetch_frames, self.max_cached_frames - 1)
+        self.decode_batch_size = decode_batch_size
+
+        image_device = torch.device("cpu") if offload_video_to_cpu else compute_device
+        self.img_mean = img_mean.to(image_device)
+        self.img_std = img_std.to(image_device)
+
+        if img_paths is not None:
+            self.reader = None
+            self.num_frames = len(img_paths)
+            self.video_width, self.video_height = Image.open(img_paths[0]).size
+        else:
+            import decord
+
+            # Get the original video height and width
+            self.video_height, self.video_width, _ = (
+                decord.VideoReader(video_path).next().shape
+            )
+            self.reader = decord.VideoReader(
+                video_path, width=image_size, height=image_size
+            )
+            self.num_frames = len(self.reader)
+
+        # uint8 frames (3, image_size, image_size) in LRU order, guarded by `self.cond`
+        self.frames = OrderedDict()
+        self.cond = Condition(Lock())
+        # the decoder is not thread-safe
+        self.decode_lock = Lock()
+        self.in_flight = set()
+        # prefetch order and the positions in it of the last accessed and prefetched frames
+        self.order = []
+        self.order_pos = {}
+        self.cursor = -1
+        self.prefetched = -1
+        self.closed = False
+        # catch and raise any exceptions in the prefetch thread
+        self.exception = None
+        self.set_prefetch_order(range(self.num_frames))
+
+        self.thread = Thread(target=self._prefetch_loop, daemon=True)
+        self.thread.start()
+
+    def _decode(self, indices):
+        """Decode the given frames as uint8 tensors (N, 3, image_size, image_size)."""
+        with self.decode_lock:
+            if self.reader is not None:
+                frames = self.reader.get_batch(list(indices))
+                # the decord bridge is thread-local, so the prefetch thread gets a decord
+                # NDArray even if the calling thread set the torch bridge
+                if not isinstance(frames, torch.Tensor):
+                    frames = torch.from_numpy(frames.asnumpy())
+                return frames.permute(0, 3, 1, 2).contiguous()
+
+            frames = []
+            for index in indices:
+                img_pil = Image.open(self.img_paths[index]).convert("RGB")
+                img_np = np.array(img_pil.resize((self.image_size, self.image_size)))
+                frames.append(torch.from_numpy(img_np).permute(2, 0, 1))
+            return torch.stack(frames, dim=0)
+
+    def _insert(self, index, img):
+        # called with `self.cond` held
+        self.frames[index] = img
+        self.frames.move_to_end(index)
+        while len(self.frames) > self.max_cached_frames:
+            self.frames.popitem(last=False)
+
+    def _next_prefetch_batch(self):
+        # called with `self.cond` held
+        start = max(self.prefetched, self.cursor) + 1
+        stop = min(self.cursor + self.prefetch_frames, len(self.order) - 1)
+        batch = []
+        for pos in range(start, stop + 1):
+            if len(batch) == self.decode_batch_size:
+                break
+            self.prefetched = pos
+            if self.order[pos] not in self.frames:
+                batch.append(self.order[pos])
+        return batch
+
+    def _prefetch_loop(self):
+        try:
+            while True:
+                with self.cond:
+                    batch = []
+                    while not self.closed:
+                        batch = self._next_prefetch_batch()
+                        if len(batch) > 0:
+                            break
+                        # everything up to the prefetch horizon is cached
+                        self.cond.wait()
+                    if self.closed:
+                        return
+                    self.in_flight.update(batch)
+
+                frames = self._decode(batch)
+                with self.cond:
+                    for index, img in zip(batch, frames):
+                        self._insert(index, img)
+                    self.in_flight.difference_update(batch)
+                    self.cond.notify_all()
+        except Exception as e:
+            self.exception = e
+            with self.cond:
+                self.in_flight.clear()
+                self.cond.notify_all()
+
+    def set_prefetch_order(self, frame_indices):
+        """Set the order in which the frames are going to be accessed (e.g. by tracking)."""
+        with self.cond:
+            self.order = [int(i) for i in frame_indices]
+            self.order_pos = {index: pos for pos, index in enumerate(self.order)}
+            self.cursor = -1
+            self.prefetched = -1
+            self.cond.notify_all()
+
+    def __getitem__(self, index):
+        if self.exception is not None:
+            raise RuntimeError("Failure in frame loading thread") from self.exception
+
+        with self.cond:
+            pos = self.order_pos.get(index)
+            if pos is not None:
+                self.cursor = pos
+                self.cond.notify_all()
+            # wait for the frame if the prefetch thread is decoding it
+            while index in self.in_flight:
+                self.cond.wait()
+            img = self.frames.get(index)
+            if img is not None:
+                self.frames.move_to_end(index)
+
+        if img is None:
+            img = self._decode([index])[0]
+            with self.cond:
+                self._insert(index, img)
+
+        if not self.offload_video_to_cpu:
+            img = img.to(self.compute_device, non_blocking=True)
+        # normalize by mean and std
+        img = img.float() / 255.0
+        img -= self.img_mean
+        img /= self.img_std
+        return img
+
+    def __len__(self):
+        return self.num_frames
+
+    def close(self):
+        """Stop the prefetch thread and drop the cached frames."""
+        with self.cond:
+            self.closed = True
+            self.frames.clear()
+            self.cond.notify_all()
+
+
 def load_video_frames(
     video_path,
     image_size,
@@ -177,14 +367,32 @@ def load_video_frames(
     img_std=(0.229, 0.224, 0.225),
     async_loading_frames=False,
     compute_device=torch.device("cuda"),
+    frame_indices=None,
+    streaming_frames=False,
+    max_cached_frames=64,
+    prefetch_frames=16,
 ):
     """
     Load the video frames from video_path. The frames are resized to image_size as in
     the model and are loaded to GPU if offload_video_to_cpu=False. This is used by the demo.
+    For video files, `frame_indices` restricts decoding to the given frames.
+    With `streaming_frames`, the frames are decoded on demand with bounded memory
+    (see `StreamingVideoFrameLoader`).
     """
     is_bytes = isinstance(video_path, bytes)
     is_str = isinstance(video_path, str)
     is_mp4_path = is_str and os.path.splitext(video_path)[-1] in [".mp4", ".MP4"]
+    if streaming_frames and frame_indices is None:
+        return load_video_frames_streaming(
+            video_path=video_path,
+            image_size=image_size,
+            offload_video_to_cpu=offload_video_to_cpu,
+            img_mean=img_mean,
+            img_std=img_std,
+            compute_device=compute_device,
+            max_cached_frames=max_cached_frames,
+            prefetch_frames=prefetch_frames,
+        )
     if is_bytes or is_mp4_path:
         return load_video_frames_from_video_file(
             video_path=video_path,
@@ -193,6 +401,7 @@ def load_video_frames(
             img_mean=img_mean,
             img_std=img_std,
             compute_device=compute_device,
+            frame_indices=frame_indices,
         )
     elif is_str and os.path.isdir(video_path):
         return load_video_frames_from_jpg_images(
@@ -240,16 +449,8 @@ def load_video_frames_from_jpg_images(
             "ffmpeg to start the JPEG file from 00000.jpg."
         )
 
-    frame_names = [
-        p
-        for p in os.listdir(jpg_folder)
-        if os.path.splitext(p)[-1] in [".jpg", ".jpeg", ".JPG", ".JPEG"]
-    ]
-    frame_names.sort(key=lambda p: int(os.path.splitext(p)[0]))
-    num_frames = len(frame_names)
-    if num_frames == 0:
-        raise RuntimeError(f"no images found in {jpg_folder}")
-    img_paths = [os.path.join(jpg_folder, frame_name) for frame_name in frame_names]
+    img_paths = _list_jpg_frames(jpg_folder)
+    num_frames = len(img_paths)
     img_mean = torch.tensor(img_mean, dtype=torch.float32)[:, None, None]
     img_std = torch.tensor(img_std, dtype=torch.float32)[:, None, None]
 
@@ -277,6 +478,130 @@ def load_video_frames_from_jpg_images(
     return images, video_height, video_width
 
 
+def _list_jpg_frames(jpg_folder):
+    frame_names = [
+        p
+        for p in os.listdir(jpg_folder)
+        if os.path.splitext(p)[-1] in [".jpg", ".jpeg", ".JPG", ".JPEG"]
+    ]
+    frame_names.sort(key=lambda p: int(os.path.splitext(p)[0]))
+    if len(frame_names) == 0:
+        raise RuntimeError(f"no images found in {jpg_folder}")
+    return [os.path.join(jpg_folder, frame_name) for frame_name in frame_names]
+
+
+def load_video_frames_streaming(
+    video_path,
+    image_size,
+    offload_video_to_cpu,
+    img_mean=(0.485, 0.456, 0.406),
+    img_std=(0.229, 0.224, 0.225),
+    compute_device=torch.device("cuda"),
+    max_cached_frames=64,
+    prefetch_frames=16,
+):
+    """
+    Open a video file or a JPEG folder as a `StreamingVideoFrameLoader`. Nothing but the
+    video size is decoded up front; frames are decoded on first use.
+    """
+    img_mean = torch.tensor(img_mean, dtype=torch.float32)[:, None, None]
+    img_std = torch.tensor(img_std, dtype=torch.float32)[:, None, None]
+    if isinstance(video_path, str) and os.path.isdir(video_path):
+        source = {"img_paths": _list_jpg_frames(video_path)}
+    else:
+        source = {"video_path": video_path}
+    lazy_images = StreamingVideoFrameLoader(
+        image_size,
+        offload_video_to_cpu,
+        img_mean,
+        img_std,
+        compute_device,
+        max_cached_frames=max_cached_frames,
+        prefetch_frames=prefetch_frames,
+        **source,
+    )
+    return lazy_images, lazy_images.video_height, lazy_images.video_width
+
+
+def sample_video_frames(video_path, num_frames=None, frame_indices=None, image_size=None):
+    """
+    Decode only the requested frames of a video file in a single sequential pass.
+
+    Seeking with `CAP_PROP_POS_FRAMES` restarts decoding from the previous keyframe for
+    every sample, so instead the video is read front to back once: non-selected frames
+    are only `grab()`-ed and just the selected ones are `retrieve()`-d (colour conversion
+    and copy). Either `num_frames` (uniformly spaced, as `np.linspace`) or explicit
+    `frame_indices` can be given; without both, all frames are returned.
+
+    Returns:
+    - frames: list of RGB uint8 arrays (resized to image_size x image_size if given)
+    - frame_indices: the indices of the returned frames
+    - (video_height, video_width): the original video size
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video: {video_path}")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    video_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+
+    def _convert(frame):
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if image_size is not None:
+            frame = cv2.resize(frame, (image_size, image_size))
+        return frame
+
+    if frame_count <= 0:
+        # Some containers do not report the frame count: decode everything, then sample.
+        all_frames = []
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            all_frames.append(frame)
+        cap.release()
+        if frame_indices is None:
+            frame_indices = (
+                np.linspace(0, len(all_frames) - 1, num_frames, dtype=int)
+                if num_frames is not None
+                else np.arange(len(all_frames))
+            )
+        frame_indices = np.asarray(frame_indices, dtype=int)
+        frames = [_convert(all_frames[i]) for i in frame_indices if i < len(all_frames)]
+        return frames, frame_indices[: len(frames)], (video_height, video_width)
+
+    if frame_indices is None:
+        frame_indices = (
+            np.linspace(0, frame_count - 1, num_frames, dtype=int)
+            if num_frames is not None
+            else np.arange(frame_count)
+        )
+    frame_indices = np.asarray(frame_indices, dtype=int)
+
+    # The same index may be requested several times (short clips), so decode each one once.
+    wanted = {}
+    for i, idx in enumerate(frame_indices):
+        wanted.setdefault(int(idx), []).append(i)
+    frames = [None] * len(frame_indices)
+    last_index = max(wanted) if wanted else -1
+    for idx in range(last_index + 1):
+        if not cap.grab():
+            break
+        if idx in wanted:
+            ok, frame = cap.retrieve()
+            if not ok:
+                break
+            frame = _convert(frame)
+            for i in wanted[idx]:
+                frames[i] = frame
+    cap.release()
+
+    decoded = [i for i, frame in enumerate(frames) if frame is not None]
+    return [frames[i] for i in decoded], frame_indices[decoded], (video_height, video_width)
+
+
 def load_video_frames_from_video_file(
     video_path,
     image_size,
@@ -284,21 +609,33 @@ def load_video_frames_from_video_file(
     img_mean=(0.485, 0.456, 0.406),
     img_std=(0.229, 0.224, 0.225),
     compute_device=torch.device("cuda"),
+    frame_indices=None,
 ):
-    """Load the video frames from a video file."""
-    import decord
+    """
+    Load the video frames from a video file.
 
+    If `frame_indices` is given, only those frames are decoded (see `sample_video_frames`).
+    """
     img_mean = torch.tensor(img_mean, dtype=torch.float32)[:, None, None]
     img_std = torch.tensor(img_std, dtype=torch.float32)[:, None, None]
-    # Get the original video height and width
-    decord.bridge.set_bridge("torch")
-    video_height, video_width, _ = decord.VideoReader(video_path).next().shape
-    # Iterate over all frames in the video
-    images = []
-    for frame in decord.VideoReader(video_path, width=image_size, height=image_size):
-        images.append(frame.permute(2, 0, 1))
-
-    images = torch.stack(images, dim=0).float() / 255.0
+    if frame_indices is not None:
+        frames, _, (video_height, video_width) = sample_video_frames(
+            video_path, frame_indices=frame_indices, image_size=image_size
+        )
+        images = torch.from_numpy(np.stack(frames, axis=0)).permute(0, 3, 1, 2)
+    else:
+        import decord
+
+        # Get the original video height and width
+        decord.bridge.set_bridge("torch")
+        video_height, video_width, _ = decord.VideoReader(video_path).next().shape
+        # Iterate over all frames in the video
+        images = []
+        for frame in decord.VideoReader(video_path, width=image_size, height=image_size):
+            images.append(frame.permute(2, 0, 1))
+        images = torch.stack(images, dim=0)
+
+    images = images.float() / 255.0
     if not offload_video_to_cpu:
         images = images.to(compute_device)
         img_mean = img_mean.to(compute_device)
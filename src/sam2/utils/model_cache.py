@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Union
+
+import torch
+import torch.nn as nn
+from omegaconf import DictConfig, OmegaConf
+
+# bump when the artifact layout changes, older artifacts are then ignored
+ARTIFACT_CACHE_VERSION = 1
+
+DEFAULT_ARTIFACT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sam2", "artifacts")
+
+# environment variable holding the cache directory, used when the builders are not given one
+ARTIFACT_CACHE_ENV = "SAM2_ARTIFACT_CACHE"
+
+CONFIG_FILENAME = "config.yaml"
+WEIGHTS_FILENAME = "model.pt"
+
+# initializers of the torch.nn layers, skipped while a cached model is instantiated since every
+# parameter is replaced by the cached state dict afterwards
+SKIPPED_INITIALIZERS = ("uniform_", "normal_", "trunc_normal_", "kaiming_uniform_", "kaiming_normal_",
+                        "xavier_uniform_", "xavier_normal_")
+
+
+def resolve_artifact_cache_dir(artifact_cache: Union[bool, str, None] = None) -> Optional[str]:
+    """
+    Directory of the model artifact cache, or None if caching is disabled.
+
+    Parameters
+    ----------
+    artifact_cache : Union[bool, str, None], optional
+        A cache directory, True for the default directory, False to disable the cache, or None to
+        use the directory in the SAM2_ARTIFACT_CACHE environment variable if it is set.
+
+    """
+
+    if artifact_cache is None:
+        artifact_cache = os.environ.get(ARTIFACT_CACHE_ENV) or False
+
+    if artifact_cache is False:
+        return None
+
+    if artifact_cache is True:
+        return DEFAULT_ARTIFACT_CACHE_DIR
+
+    return os.path.expanduser(str(artifact_cache))
+
+
+def artifact_key(config_file: str, hydra_overrides: List[str], ckpt_path: str) -> str:
+    """
+    Cache key of a built model: the config name and overrides, and the checkpoint file identity.
+
+    A rewritten checkpoint (new size or modification time) or another torch version gives a new key.
+
+    """
+
+    stat = os.stat(ckpt_path)
+    payload = {'version': ARTIFACT_CACHE_VERSION,
+               'config_file': config_file,
+               'hydra_overrides': list(hydra_overrides),
+               'ckpt_path': os.path.realpath(ckpt_path),
+               'ckpt_size': stat.st_size,
+               'ckpt_mtime_ns': stat.st_mtime_ns,
+               'torch': torch.__version__,
+               }
+
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+
+
+@contextmanager
+def skip_weight_init():
+    """Turns the torch.nn.init initializers used by the layer constructors into no-ops."""
+    originals = {name: getattr(nn.init, name) for name in SKIPPED_INITIALIZERS}
+
+    def _no_init(tensor, *args, **kwargs):
+        return tensor
+
+    try:
+        for name in SKIPPED_INITIALIZERS:
+            setattr(nn.init, name, _no_init)
+        yield
+    finally:
+        for name, fn in originals.items():
+            setattr(nn.init, name, fn)
+
+
+def load_model_artifact(cache_dir: str, key: str) -> Optional[Tuple[DictConfig, Dict[str, torch.Tensor]]]:
+    """
+    Loads the resolved config and the state dict of a cached model.
+
+    The weights are memory-mapped instead of read into memory when the torch version supports it,
+    so only the pages that are used are read and they are shared between processes through the
+    page cache.
+
+    Returns
+    -------
+    Optional[Tuple[DictConfig, Dict[str, torch.Tensor]]]
+        The config and state dict, or None if the artifact does not exist or cannot be read.
+
+    """
+
+    path = os.path.join(cache_dir, key)
+    config_path = os.path.join(path, CONFIG_FILENAME)
+    weights_path = os.path.join(path, WEIGHTS_FILENAME)
+    if not (os.path.isfile(config_path) and os.path.isfile(weights_path)):
+        return None
+
+    try:
+        cfg = OmegaConf.load(config_path)
+        try:
+            state_dict = torch.load(weights_path, map_location="cpu", weights_only=True, mmap=True)
+        except TypeError:
+            # torch < 2.1 has no memory-mapped loading
+            state_dict = torch.load(weights_path, map_location="cpu", weights_only=True)
+
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable model artifact {path}: {e}")
+        return None
+
+    return cfg, state_dict
+
+
+def save_model_artifact(cache_dir: str, key: str, cfg: DictConfig, model: nn.Module):
+    """
+    Saves the resolved config and the state dict of a built model.
+
+    The artifact is written to a temporary directory and renamed into place, so concurrent processes
+    never read a partial artifact. Failures are logged and ignored.
+
+    """
+
+    path = os.path.join(cache_dir, key)
+    if os.path.isdir(path):
+        return
+
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix=f".{key}-", dir=cache_dir)
+        OmegaConf.save(cfg, os.path.join(tmp_path, CONFIG_FILENAME))
+        state_dict = {name: tensor.detach().cpu() for name, tensor in model.state_dict().items()}
+        torch.save(state_dict, os.path.join(tmp_path, WEIGHTS_FILENAME))
+        os.rename(tmp_path, path)
+        tmp_path = None
+        logging.info(f"Saved model artifact {path}")
+
+    except OSError as e:
+        # another process may have saved the same artifact first
+        if not os.path.isdir(path):
+            logging.warning(f"Could not save model artifact {path}: {e}")
+
+    finally:
+        if tmp_path is not None:
+            shutil.rmtree(tmp_path, ignore_errors=True)
@@ -0,0 +1,181 @@
+import json
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+
+class StageProfiler(object):
+    """
+    Named timing spans for the stages of SAM2ObjectTracker.
+
+    On CUDA, a span records a pair of CUDA events instead of synchronizing, and the elapsed times are
+    resolved once the events have completed (polled at the end of every frame, or all at once when
+    the timings are read). On the CPU, spans are timed with `time.perf_counter`.
+
+    The last `window` durations of every span are kept for rolling statistics. If `trace` is enabled,
+    the spans are also recorded as Chrome trace events (chrome://tracing, Perfetto).
+
+    A disabled profiler returns a shared no-op context from `span` and records nothing.
+
+    """
+
+    def __init__(self,
+                 enabled: bool = False,
+                 device: Optional[torch.device] = None,
+                 window: int = 300,
+                 trace: bool = False,
+                 max_trace_events: int = 100000
+                 ):
+
+        self.enabled = enabled
+        self.device = torch.device('cpu') if device is None else torch.device(device)
+        self.window = window
+        self.trace = trace
+        self.max_trace_events = max_trace_events
+
+        self.durations = defaultdict(lambda: deque(maxlen=self.window))  # span name => ms
+        self.last = {}  # span name => ms of the newest resolved span
+        self.trace_events = []
+
+        self._pending = deque()  # (name, start event, end event, start timestamp in us, depth)
+        self._depth = 0
+        self._origin = time.perf_counter()
+
+    @property
+    def use_cuda_events(self) -> bool:
+        return self.device.type == 'cuda' and torch.cuda.is_available()
+
+    @contextmanager
+    def _timed_span(self, name: str):
+        depth = self._depth
+        self._depth += 1
+        start_us = (time.perf_counter() - self._origin) * 1e6
+
+        if self.use_cuda_events:
+            start = torch.cuda.Event(enable_timing=True)
+            end = torch.cuda.Event(enable_timing=True)
+            start.record()
+            try:
+                yield
+            finally:
+                end.record()
+                self._depth -= 1
+                self._pending.append((name, start, end, start_us, depth))
+
+        else:
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                self._record(name, (time.perf_counter() - self._origin) * 1e3 - start_us / 1e3, start_us, depth)
+
+    def span(self, name: str):
+        """Context manager timing the enclosed stage under `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+
+        return self._timed_span(name)
+
+    def _record(self, name: str, ms: float, start_us: float, depth: int):
+        self.durations[name].append(ms)
+        self.last[name] = ms
+
+        if self.trace and len(self.trace_events) < self.max_trace_events:
+            self.trace_events.append({'name': name,
+                                      'ph': 'X',
+                                      'ts': start_us,
+                                      'dur': ms * 1e3,
+                                      'pid': 0,
+                                      'tid': depth,
+                                      'cat': self.device.type,
+                                      })
+
+    def resolve(self, wait: bool = False):
+        """
+        Moves completed CUDA spans into the statistics, in the order they were recorded.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Wait for the pending spans instead of stopping at the first one that has not completed.
+
+        """
+
+        while self._pending:
+            name, start, end, start_us, depth = self._pending[0]
+            if wait:
+                end.synchronize()
+            elif not end.query():
+                break
+
+            self._pending.popleft()
+            self._record(name, start.elapsed_time(end), start_us, depth)
+
+    def end_frame(self):
+        """Called once per frame, resolves the CUDA spans that have completed without blocking."""
+        if self.enabled and self._pending:
+            self.resolve(wait=False)
+
+    def summary(self, percentiles: Sequence[float] = (50, 90, 99)) -> Dict[str, Dict[str, float]]:
+        """
+        Rolling statistics of every span over the last `window` occurrences.
+
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            For every span name: "count", "mean" and one "p<q>" entry per percentile, in milliseconds.
+
+        """
+
+        self.resolve(wait=True)
+
+        summary = {}
+        for name, values in self.durations.items():
+            values = np.fromiter(values, dtype=np.float64)
+            stats = {'count': len(values), 'mean': float(values.mean())}
+            for q, value in zip(percentiles, np.percentile(values, percentiles)):
+                stats[f'p{q:g}'] = float(value)
+
+            summary[name] = stats
+
+        return summary
+
+    def last_timings(self) -> Dict[str, float]:
+        """Durations in milliseconds of the newest occurrence of every span."""
+        self.resolve(wait=True)
+        return dict(self.last)
+
+    def export_chrome_trace(self, path: str):
+        """Writes the recorded spans as a Chrome trace JSON file."""
+        self.resolve(wait=True)
+
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events, 'displayTimeUnit': 'ms'}, f)
+
+    def reset(self):
+        """Drops all recorded timings and trace events."""
+        self.resolve(wait=True)
+        self.durations.clear()
+        self.last = {}
+        self.trace_events = []
+
+
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def format_timings(timings: Dict[str, float], names: Optional[List[str]] = None) -> str:
+    """Formats span durations as "name 1.2ms, ..." for log lines."""
+    names = list(timings) if names is None else [name for name in names if name in timings]
+    return ', '.join(f'{timings[name]:.1f}ms {name}' for name in names)
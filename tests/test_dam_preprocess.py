@@ -0,0 +1,72 @@
+"""
+DescribeAnythingModel 배치 전처리 (get_image_tensors_batched) 가 프레임별 PIL 경로 (get_image_tensor) 와
+같은 텐서를 만드는지 SigLIP / CLIP 이미지 프로세서 각각에 대해 확인 (LLM 없이 전처리 메서드만 사용)
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+transformers = pytest.importorskip("transformers")
+Image = pytest.importorskip("PIL.Image")
+
+from dam import DescribeAnythingModel  # noqa: E402
+from dam.model.multimodal_encoder.siglip.image_processing_siglip import SiglipImageProcessor  # noqa: E402
+
+IMAGE_SIZE = 336
+
+
+def make_dam(processor):
+    config = SimpleNamespace(image_processor=processor, image_aspect_ratio="resize")
+    dam = DescribeAnythingModel.__new__(DescribeAnythingModel)
+    torch.nn.Module.__init__(dam)
+    dam.model = SimpleNamespace(config=config, device=torch.device("cpu"))
+    return dam
+
+
+def make_clip(num_frames=3, width=320, height=240):
+    """보간 차이가 작도록 부드러운 그라디언트 프레임과 움직이는 사각형 마스크"""
+    ys, xs = np.mgrid[0:height, 0:width]
+    frames, masks = [], []
+    for i in range(num_frames):
+        frame = np.stack([xs * 255 // width, ys * 255 // height, np.full_like(xs, 40 * i)], axis=-1).astype(np.uint8)
+        frames.append(Image.fromarray(frame))
+        mask = np.zeros((height, width), dtype=np.uint8)
+        mask[60:180, 40 + 20 * i:140 + 20 * i] = 255
+        masks.append(Image.fromarray(mask))
+    return frames, masks
+
+
+PROCESSORS = {
+    "siglip": lambda: SiglipImageProcessor(size={"height": IMAGE_SIZE, "width": IMAGE_SIZE}),
+    "clip": lambda: transformers.CLIPImageProcessor(size={"shortest_edge": IMAGE_SIZE},
+                                                    crop_size={"height": IMAGE_SIZE, "width": IMAGE_SIZE}),
+}
+
+
+@pytest.mark.parametrize("processor_name", sorted(PROCESSORS))
+@pytest.mark.parametrize("crop_modes", [("full", "focal_crop"), ("full", "crop"), ("full", None)])
+def test_batched_matches_per_frame(processor_name, crop_modes):
+    dam = make_dam(PROCESSORS[processor_name]())
+    frames, masks = make_clip()
+    crop_mode, crop_mode2 = crop_modes
+    assert dam.supports_batched_preprocess(frames, masks, crop_modes)
+
+    per_frame = torch.cat([dam.get_image_tensor(f, m, crop_mode, crop_mode2) for f, m in zip(frames, masks)], dim=0)
+    batched = dam.get_image_tensors_batched(frames, masks, crop_mode, crop_mode2)
+
+    assert batched.shape == per_frame.shape
+    assert batched.dtype == per_frame.dtype
+    # PIL (bicubic) 와 roi_align (bilinear) 의 보간 차이만 허용, 정규화 단위
+    diff = (batched.float() - per_frame.float()).abs()
+    assert diff.mean().item() < 0.05
+
+
+def test_clip_with_mismatched_shortest_edge_falls_back():
+    processor = transformers.CLIPImageProcessor(size={"shortest_edge": 224},
+                                                crop_size={"height": IMAGE_SIZE, "width": IMAGE_SIZE})
+    dam = make_dam(processor)
+    frames, masks = make_clip()
+    assert not dam.supports_batched_preprocess(frames, masks, ("full", "focal_crop"))